@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The package modules import each other as top-level modules (`from utils import db`), as when run from their directory
+PACKAGE_DIR = Path(__file__).parents[2] / 'texas_result_scraper'
+if str(PACKAGE_DIR) not in sys.path:
+    sys.path.insert(0, str(PACKAGE_DIR))
@@ -0,0 +1,60 @@
+"""
+Stage benchmarks over the recorded or synthetic responses in `fixtures/`, replayed with `load_raw` so
+nothing is fetched.
+
+    pytest tests/benchmarks --benchmark-autosave
+
+`--benchmark-autosave` saves the run as JSON under `.benchmarks/`, and two saved runs compare with
+`pytest-benchmark compare 0001 0002`. Without it the timings are only printed.
+"""
+from pathlib import Path
+
+import pytest
+
+from tests.benchmarks.record import FIXTURES_DIR, load, payload
+
+
+RECORDINGS = sorted(x.name for x in FIXTURES_DIR.iterdir() if x.is_dir())
+
+
+@pytest.fixture(scope='session', params=RECORDINGS)
+def recording(request) -> str:
+    """Fixture directory name, `tx-<election_id>-<version_id>`"""
+    return request.param
+
+
+@pytest.fixture(scope='session')
+def recorded(recording):
+    """`pipeline.Payload` of one recorded version"""
+    return payload(load(FIXTURES_DIR / recording))
+
+
+@pytest.fixture(scope='session')
+def election_id(recording) -> int:
+    return int(recording.split('-')[1])
+
+
+@pytest.fixture
+def ticker(recorded, election_id):
+    from texas_result_scraper.scraper import ElectionResultTicker
+    return ElectionResultTicker(election_id=election_id).create_file().load_raw(
+        recorded['version'], recorded['county'], recorded['statewide']
+    )
+
+
+@pytest.fixture
+def built(ticker):
+    """The ticker with the recorded version built into models"""
+    return ticker.create_models()
+
+
+@pytest.fixture
+def output(built, tmp_path: Path):
+    from texas_result_scraper.flat_file import GitHubFile
+    return GitHubFile(built, directory=tmp_path).use(built.version_no)
+
+
+def pytest_generate_tests(metafunc):
+    if 'scale' in metafunc.fixturenames:
+        _scales = [int(x) for x in metafunc.config.getoption('scales').split(',')]
+        metafunc.parametrize('scale', _scales, ids=[f'{x}x' for x in _scales], scope='module')
@@ -0,0 +1,154 @@
+"""
+Record the raw responses the benchmarks replay, one directory per election version:
+
+    python -m tests.benchmarks.record 49664
+    python -m tests.benchmarks.record 49664 --from-csv 1012 --election-date 11052024
+
+The first fetches the newest Version.json, County.json and OfficeSummary.json as served. The second
+rebuilds them from the CSV outputs of a version already in `texas_result_scraper/data`.
+"""
+from typing import Dict, Optional
+from pathlib import Path
+from collections import defaultdict
+import argparse
+import csv
+
+from tests.benchmarks import PACKAGE_DIR
+from texas_result_scraper.recording import ReplayScraper, load, payload, recording_dir, responses, save
+
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+PARTY_COLORS = {
+    'Republican': '#FF0000', 'R': '#FF0000',
+    'Democrat': '#0000FF', 'D': '#0000FF',
+    'Libertarian': '#FFD700', 'L': '#FFD700',
+}
+OTHER_COLOR = '#808080'
+
+
+def fixture_dir(election_id: int, version_id: int) -> Path:
+    return recording_dir(FIXTURES_DIR, election_id, version_id)
+
+
+def record(election_id: int) -> Path:
+    """Fetch the newest version of an election from the results site"""
+    from texas_result_scraper.scraper import ElectionResultTicker
+
+    ticker = ElectionResultTicker(election_id=election_id)
+    version = ticker.fetch_version()
+    county = ticker.fetch_county_data(version['___versionNo'])
+    statewide = ticker.fetch_statewide_data(version['___versionNo'])
+    return save(
+        fixture_dir(election_id, version['___versionNo']),
+        responses({'version': version, 'county': county, 'statewide': statewide})
+    )
+
+
+def _read(path: Path):
+    with open(path, newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def _int(value: str) -> Optional[int]:
+    return int(value) if value else None
+
+
+def from_csv(election_id: int, version_id: int, election_date: str, data_dir: Optional[Path] = None) -> Path:
+    """
+    Rebuild the responses of a version from its race, county and statewide CSV outputs.
+
+    The CSVs hold every reported value except the site's ids, colors and ballot order, so office and
+    candidate ids are numbered in name order, colors follow the party and ballot order follows the CSV.
+    Race CSVs written by the old `flatten`, which reused one row dict, hold each race in a single county,
+    and a version rebuilt from them does too; use a recording or `synthetic.generate` for a full one.
+    """
+    data_dir = data_dir or PACKAGE_DIR / 'data'
+    _prefix = f'tx-{election_id}-{version_id}'
+    race_rows = list(_read(data_dir / f'{_prefix}-race-results.csv'))
+    statewide_rows = list(_read(data_dir / f'{_prefix}-statewide-results.csv'))
+    office_ids = {x: i for i, x in enumerate(sorted({r['office'] for r in race_rows + statewide_rows}), start=1)}
+    candidate_ids = {
+        x: i for i, x in enumerate(sorted({(r['office'], r['candidate']) for r in race_rows}), start=1)
+    }
+
+    counties = {}
+    for row in _read(data_dir / f'{_prefix}-county-results.csv'):
+        counties[row['county_name']] = {
+            'N': row['county_name'],
+            'TV': _int(row['registered_voters']),
+            'C': OTHER_COLOR,
+            'Summary': {
+                'PRR': _int(row['precincts_reporting']),
+                'PRP': _int(row['total_precincts']),
+                'P': float(row['percent_reporting']),
+                'RV': _int(row['registered_voters']),
+                'VC': _int(row['voted_counted']),
+                'VT': float(row['turnout_percent']),
+                'NPL': _int(row['poll_locations']),
+                'PLR': _int(row['poll_locations_reporting']),
+                'PLP': float(row['poll_locations_percent']),
+            },
+            'Races': {},
+        }
+
+    by_county_race = defaultdict(list)
+    for row in race_rows:
+        by_county_race[(row['county'], row['office'])].append(row)
+    for (county, office), rows in by_county_race.items():
+        _county = counties[county]
+        _candidates = {}
+        for order, row in enumerate(rows, start=1):
+            candidate_id = candidate_ids[(office, row['candidate'])]
+            _candidates[str(candidate_id)] = {
+                'id': candidate_id,
+                'N': row['candidate'],
+                'P': row['party'],
+                'C': PARTY_COLORS.get(row['party'], OTHER_COLOR),
+                'EV': int(row['early_votes']),
+                'V': int(row['total_votes']),
+                'PE': float(row['percent_votes']),
+                'O': order,
+            }
+        _county['Races'][str(office_ids[office])] = {
+            'OID': office_ids[office],
+            'ON': office,
+            'T': sum(x['V'] for x in _candidates.values()),
+            'O': len(_county['Races']) + 1,
+            'PR': _county['Summary']['PRR'],
+            'OTRV': _county['TV'],
+            'TPR': _county['Summary']['PRP'],
+            'C': _candidates,
+        }
+
+    offices = {}
+    for row in statewide_rows:
+        _office = offices.setdefault(row['office'], {'OID': office_ids[row['office']], 'ON': row['office'], 'C': []})
+        _office['C'].append({
+            'N': row['candidate'],
+            'P': row['party'],
+            'C': PARTY_COLORS.get(row['party'], OTHER_COLOR),
+            'T': int(row['total_votes']),
+            'O': len(_office['C']) + 1,
+        })
+
+    return save(
+        fixture_dir(election_id, version_id),
+        {
+            'Version': {'___versionNo': version_id, 'elecDate': election_date},
+            'County': counties,
+            'OfficeSummary': {'OS': list(offices.values())},
+        }
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('election_id', type=int)
+    parser.add_argument('--from-csv', type=int, metavar='VERSION_ID', help="rebuild from this version's CSV outputs")
+    parser.add_argument('--election-date', default='', help="elecDate for --from-csv, as MMDDYYYY")
+    args = parser.parse_args()
+    if args.from_csv is None:
+        print(record(args.election_id))
+    else:
+        print(from_csv(args.election_id, args.from_csv, args.election_date))
@@ -0,0 +1,172 @@
+"""
+Synthetic Version/County/OfficeSummary responses of any size, in the key schema `scraper.py` reads.
+
+    python -m tests.benchmarks.synthetic 49664 --scale 10
+
+writes a `fixtures/`-style directory that `record.load` reads like a recording.
+"""
+from typing import Dict, List
+from dataclasses import dataclass, replace
+from pathlib import Path
+import argparse
+import random
+
+from tests.benchmarks.record import PARTY_COLORS, OTHER_COLOR, fixture_dir, save
+
+
+PARTIES = ('Republican', 'Democrat', 'Libertarian', 'Green', 'Write-In')
+
+STATEWIDE_OFFICES = (
+    'PRESIDENT/VICE-PRESIDENT',
+    'U. S. SENATOR',
+    'RAILROAD COMMISSIONER',
+    'CHIEF JUSTICE, SUPREME COURT',
+    'JUSTICE, SUPREME COURT, PLACE {n}',
+    'JUDGE, COURT OF CRIMINAL APPEALS, PLACE {n}',
+)
+DISTRICT_OFFICES = (
+    'U. S. REPRESENTATIVE DISTRICT {n}',
+    'STATE SENATOR, DISTRICT {n}',
+    'STATE REPRESENTATIVE DISTRICT {n}',
+    'MEMBER, STATE BOARD OF EDUCATION, DISTRICT {n}',
+    'DISTRICT JUDGE, {n}TH JUDICIAL DISTRICT',
+    'JUSTICE, {n}TH COURT OF APPEALS DISTRICT, PLACE 1',
+)
+
+
+@dataclass(frozen=True)
+class ElectionShape:
+    """
+    Size of a synthetic election. Every county votes in each of the `statewide_races`; each of the other
+    `races` is spread over `spread` neighbouring counties. Each race has `candidates` candidates.
+    """
+    counties: int = 254
+    races: int = 600
+    statewide_races: int = 15
+    candidates: int = 3
+    spread: int = 4
+    seed: int = 0
+    version_id: int = 1
+    election_date: str = '11052024'
+
+    def scaled(self, factor: int) -> 'ElectionShape':
+        """`factor` times as many counties and district races, so county results grow `factor` times"""
+        return replace(
+            self,
+            counties=self.counties * factor,
+            races=self.statewide_races + (self.races - self.statewide_races) * factor
+        )
+
+    @property
+    def county_results(self) -> int:
+        """Candidate county results the shape produces"""
+        _district = (self.races - self.statewide_races) * min(self.spread, self.counties)
+        return (self.statewide_races * self.counties + _district) * self.candidates
+
+
+# A Texas general election: 254 counties, around 600 offices and 18k candidate results across counties
+GENERAL = ElectionShape()
+# A primary: the same counties with fewer contested offices and most district races uncontested
+PRIMARY = ElectionShape(races=300, statewide_races=10, candidates=2, spread=3)
+
+
+def _office(templates, i: int) -> str:
+    template = templates[i % len(templates)]
+    return template.format(n=i // len(templates) + 1)
+
+
+def generate(shape: ElectionShape = GENERAL) -> Dict[str, Dict]:
+    """Responses keyed by file name, as `record.load` returns them"""
+    rnd = random.Random(shape.seed)
+    counties = [f'COUNTY {i:05d}' for i in range(shape.counties)]
+    registered = {x: rnd.randint(500, 2_500_000) for x in counties}
+
+    # Race id -> (office name, counties voting in it)
+    races: Dict[int, tuple] = {}
+    for i in range(shape.races):
+        if i < shape.statewide_races:
+            races[i + 1] = (_office(STATEWIDE_OFFICES, i), counties)
+        else:
+            _first = rnd.randrange(shape.counties)
+            _spread = [counties[(_first + k) % shape.counties] for k in range(min(shape.spread, shape.counties))]
+            races[i + 1] = (_office(DISTRICT_OFFICES, i - shape.statewide_races), _spread)
+
+    county_races: Dict[str, Dict[str, Dict]] = {x: {} for x in counties}
+    statewide: List[Dict] = []
+    candidate_id = 0
+    for race_id, (office, race_counties) in races.items():
+        _candidates = []
+        for order in range(1, shape.candidates + 1):
+            candidate_id += 1
+            party = PARTIES[(order - 1) % len(PARTIES)]
+            _candidates.append({
+                'id': candidate_id,
+                'N': f'CANDIDATE {race_id}-{order}',
+                'P': party,
+                'C': PARTY_COLORS.get(party, OTHER_COLOR),
+                'T': 0,
+                'O': order,
+            })
+        for county in race_counties:
+            votes = [rnd.randint(0, registered[county] // (2 * shape.candidates)) for _ in _candidates]
+            total = sum(votes)
+            _results = {}
+            for candidate, v in zip(_candidates, votes):
+                candidate['T'] += v
+                _results[str(candidate['id'])] = {
+                    'id': candidate['id'],
+                    'N': candidate['N'],
+                    'P': candidate['P'],
+                    'C': candidate['C'],
+                    'EV': rnd.randint(0, v),
+                    'V': v,
+                    'PE': round(100 * v / total, 2) if total else 0.0,
+                    'O': candidate['O'],
+                }
+            county_races[county][str(race_id)] = {
+                'OID': race_id,
+                'ON': office,
+                'T': total,
+                'O': len(county_races[county]) + 1,
+                'PR': 1,
+                'OTRV': registered[county],
+                'TPR': 1,
+                'C': _results,
+            }
+        statewide.append({'OID': race_id, 'ON': office, 'C': _candidates})
+
+    return {
+        'Version': {'___versionNo': shape.version_id, 'elecDate': shape.election_date},
+        'County': {
+            name: {
+                'N': name,
+                'TV': registered[name],
+                'C': OTHER_COLOR,
+                'Summary': {
+                    'PRR': 1,
+                    'PRP': 1,
+                    'P': 100.0,
+                    'RV': registered[name],
+                    'VC': None,
+                    'VT': round(rnd.uniform(20, 80), 2),
+                    'NPL': 1,
+                    'PLR': 1,
+                    'PLP': 100.0,
+                },
+                'Races': county_races[name],
+            } for name in counties
+        },
+        'OfficeSummary': {'OS': statewide},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('election_id', type=int)
+    parser.add_argument('--scale', type=int, default=1, help="multiple of a general election")
+    parser.add_argument('--primary', action='store_true', help="scale a primary instead")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, help="fixture directory, by default fixtures/tx-<election_id>-1")
+    args = parser.parse_args()
+    _shape = replace(PRIMARY if args.primary else GENERAL, seed=args.seed).scaled(args.scale)
+    print(save(args.out or fixture_dir(args.election_id, _shape.version_id), generate(_shape)))
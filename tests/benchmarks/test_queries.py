@@ -0,0 +1,57 @@
+"""
+The lookups dashboards make against the result tables, on a SQLite file loaded with a recorded version.
+Each query must be answered from an index rather than a scan of its table.
+"""
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+
+QUERIES = {
+    'results_by_county': 'SELECT * FROM candidatecountyresults WHERE county = :county',
+    'results_by_candidate': 'SELECT * FROM candidatecountyresults WHERE candidate_id = :candidate_id',
+    'results_of_race_county': (
+        'SELECT * FROM candidatecountyresults WHERE election_id = :election_id AND race_id = :race_id AND county = :county'
+    ),
+    'changed_at_version': 'SELECT * FROM candidatecountyresults WHERE version_id = :version_id',
+    'county_race_details': 'SELECT * FROM countyracedetails WHERE county = :county',
+    'latest_version': 'SELECT MAX(version_id) FROM resultversionnumber WHERE election_id = :election_id',
+}
+
+
+@pytest.fixture(scope='module')
+def loaded(tmp_path_factory, recorded, election_id):
+    """An engine on a file holding one recorded version, and query parameters taken from that version"""
+    from texas_result_scraper.scraper import ElectionResultTicker
+    from texas_result_scraper.db_writer import BulkWriter
+    from utils import db
+
+    version_no = ElectionResultTicker(election_id=election_id).create_file().load_raw(
+        recorded['version'], recorded['county'], recorded['statewide']
+    ).create_models().version_no
+    _path: Path = tmp_path_factory.mktemp('queries') / 'results.db'
+    engine = db.create_db_engine(db.DBSettings(url=f'sqlite:///{_path}'))
+    writer = BulkWriter(engine)
+    writer.create_tables()
+    writer.write(version_no)
+    race = version_no.races[0]
+    params = {
+        'election_id': election_id,
+        'version_id': version_no.version_id,
+        'race_id': race.race_id,
+        'candidate_id': race.candidates[0].candidate_id,
+        'county': race.candidates[0].county_results[0].county,
+    }
+    return engine, params
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_query(benchmark, loaded, query):
+    engine, params = loaded
+    sql = QUERIES[query]
+    with engine.connect() as conn:
+        plan = ' '.join(x[-1] for x in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params))
+        assert plan.startswith('SEARCH') and 'INDEX' in plan, plan
+        rows = benchmark(lambda: conn.execute(text(sql), params).all())
+    assert rows
@@ -0,0 +1,74 @@
+"""
+Build and load synthetic elections at multiples of general-election size, one round each.
+
+    pytest tests/benchmarks/test_scaling.py --scales 1,10,100
+
+Compare the time per county result across scales to see where a stage stops scaling linearly.
+"""
+from pathlib import Path
+
+import pytest
+
+from tests.benchmarks.record import payload, ReplayScraper
+from tests.benchmarks.synthetic import GENERAL, generate
+
+
+@pytest.fixture(scope='module')
+def shape(scale):
+    return GENERAL.scaled(scale)
+
+
+@pytest.fixture(scope='module')
+def synthetic(shape):
+    return generate(shape)
+
+
+def _info(benchmark, shape) -> None:
+    benchmark.extra_info.update(counties=shape.counties, races=shape.races, county_results=shape.county_results)
+
+
+def _count(version_no) -> int:
+    return sum(len(x.county_results) for race in version_no.races for x in race.candidates)
+
+
+def test_file_ticker(benchmark, shape, synthetic):
+    from texas_result_scraper.scraper import ElectionResultTicker
+
+    _payload = payload(synthetic)
+    ticker = ElectionResultTicker(election_id=1).create_file()
+    _info(benchmark, shape)
+    benchmark.pedantic(
+        lambda: ticker.load_raw(_payload['version'], _payload['county'], _payload['statewide']).create_models(),
+        rounds=1
+    )
+    assert _count(ticker.version_no) == shape.county_results
+
+
+def test_db_load(benchmark, shape, synthetic, tmp_path: Path):
+    from texas_result_scraper.scraper import ElectionResultTicker
+    from texas_result_scraper.db_writer import BulkWriter
+    from utils import db
+
+    _payload = payload(synthetic)
+    ticker = ElectionResultTicker(election_id=1).create_file()
+    ticker.load_raw(_payload['version'], _payload['county'], _payload['statewide']).create_models()
+    writer = BulkWriter(db.create_db_engine(db.DBSettings(url=f'sqlite:///{tmp_path / "results.db"}')))
+    writer.create_tables()
+    _info(benchmark, shape)
+    written = benchmark.pedantic(writer.write, args=(ticker.version_no,), rounds=1)
+    assert written['candidatecountyresults'] == shape.county_results
+
+
+@pytest.mark.xfail(
+    raises=AttributeError, strict=True,
+    reason="The DB models are not table models, so the relationships DataBaseTickerFuncs appends to do not exist"
+)
+def test_database_ticker(benchmark, shape, synthetic):
+    from texas_result_scraper.scraper import DataBaseTickerFuncs
+
+    ticker = DataBaseTickerFuncs(election_id=1)
+    ticker.scraper = ReplayScraper(synthetic)
+    # The caches are class attributes; start from empty ones so earlier runs are not reused
+    ticker.race_cache, ticker.candidate_cache = {}, {}
+    _info(benchmark, shape)
+    benchmark.pedantic(lambda: ticker._get_newest_version().create_models(), rounds=1)
@@ -0,0 +1,131 @@
+"""Each stage timed on its own, from parsing a recorded version to loading it into the result tables"""
+from pathlib import Path
+
+import pytest
+
+from texas_result_scraper.manifest import OutputManifest
+
+
+ROUNDS = 10
+
+
+def _reset(ticker, recorded):
+    """Start a build over, as `create_models` does for each new version"""
+    ticker.counties = {}
+    ticker.races = {}
+    ticker._set_version(recorded['version'])
+
+
+def test_parse_version(benchmark, ticker, recorded):
+    version_no = benchmark(lambda: ticker._set_version(recorded['version']).version_no)
+    assert version_no.version_id == recorded['version']['___versionNo']
+
+
+def test_setup_county_data(benchmark, ticker, recorded):
+    benchmark.pedantic(
+        ticker._setup_county_data,
+        setup=lambda: _reset(ticker, recorded),
+        rounds=ROUNDS
+    )
+    assert len(ticker.version_no.county) == len(recorded['county'])
+
+
+def test_setup_statewide_data(benchmark, ticker, recorded):
+    def setup():
+        _reset(ticker, recorded)
+        ticker._setup_county_data()
+
+    benchmark.pedantic(ticker._setup_statewide_data, setup=setup, rounds=ROUNDS)
+    assert len(ticker.version_no.statewide) == len(recorded['statewide'])
+
+
+@pytest.mark.parametrize('flatten', ['flatten_races', 'flatten_counties', 'flatten_statewide'])
+def test_flatten(benchmark, built, flatten):
+    rows = benchmark(getattr(built.version_no, flatten))
+    assert rows
+
+
+def test_query_lookup(benchmark, built):
+    """A lookup on the held index costs microseconds, well under a scan of the races it replaces"""
+    from timeit import repeat
+
+    version_no = built.version_no
+    county = next(iter(version_no.county))
+    version_no.query
+
+    def lookup():
+        return version_no.query.races('HD', county=county)
+
+    def scan():
+        return [x for x in version_no.races if x.office_type == 'HD' and any(c.county == county for c in x.counties)]
+
+    assert benchmark(lookup) == scan()
+    _lookup = min(repeat(lookup, number=1000, repeat=5)) / 1000
+    assert _lookup < 100e-6
+    assert _lookup < min(repeat(scan, number=100, repeat=5)) / 100
+
+
+def test_create_csv_files(benchmark, output, tmp_path: Path):
+    def setup():
+        # An empty manifest each round, so every output is hashed and written
+        (tmp_path / 'manifest.json').unlink(missing_ok=True)
+        output.manifest = OutputManifest(tmp_path / 'manifest.json')
+        output.written_file_names.clear()
+
+    benchmark.pedantic(output.create_csv_files, setup=setup, rounds=ROUNDS)
+    assert len(output.written_file_names) == 3
+
+
+def test_write(benchmark, output, tmp_path: Path):
+    benchmark(output.write)
+    assert (tmp_path / output.file_name).exists()
+
+
+def test_read(benchmark, output):
+    output.write()
+    version_no = benchmark(output.read)
+    assert len(version_no.races) == len(output.data.races)
+
+
+def test_db_load(benchmark, built, tmp_path: Path):
+    from texas_result_scraper.db_writer import BulkWriter
+    from utils import db
+
+    writer = BulkWriter(db.create_db_engine(db.DBSettings(url=f'sqlite:///{tmp_path / "results.db"}')))
+    writer.create_tables()
+    written = benchmark.pedantic(writer.write, args=(built.version_no,), rounds=ROUNDS)
+    assert written['candidatecountyresults'] == sum(len(x.county_results) for r in built.version_no.races for x in r.candidates)
+
+
+def test_endorsement_join(benchmark, built, tmp_path: Path):
+    import csv
+    from texas_result_scraper.endorsements import EndorsementIndex, iter_candidates
+
+    # Every district race candidate endorsed, as a sheet lists them
+    _path = tmp_path / 'endorsements.csv'
+    with open(_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            'Candidate First Name', 'Candidate Last Name', 'District Type', 'District Number', 'Abbott Endorsed'
+        ])
+        for x in iter_candidates(built.version_no):
+            if x[0] == 'race' and x[4] and x[7]:
+                writer.writerow([x[7], x[8], x[3], x[4], 'TRUE'])
+
+    def join():
+        # A fresh index each round, so the join is not served from its cache
+        return EndorsementIndex.from_csv(_path).join(built.version_no)
+
+    joined = benchmark.pedantic(join, rounds=ROUNDS)
+    assert joined['abbott'].all()
+
+
+def test_publish(benchmark, built):
+    from texas_result_scraper.api import ResultAPI
+
+    def publish():
+        # A fresh API each round, so every body is compressed
+        return ResultAPI().publish(built.version_no)
+
+    compressed = benchmark.pedantic(publish, rounds=ROUNDS)
+    assert compressed == len(built.version_no.races) + len(built.version_no.county) + 2
@@ -0,0 +1,43 @@
+import sys
+from typing import Optional
+from pathlib import Path
+
+import pytest
+
+# The package modules import each other as top-level modules (`from utils import db`), as when run from their directory
+PACKAGE_DIR = Path(__file__).parents[1] / 'texas_result_scraper'
+if str(PACKAGE_DIR) not in sys.path:
+    sys.path.insert(0, str(PACKAGE_DIR))
+
+# `synthetic.generate(GENERAL)`: 254 counties, statewide races in all of them and district races in four each
+FIXTURE = Path(__file__).parent / 'benchmarks' / 'fixtures' / 'tx-49664-1'
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--scales', default='1',
+        help="comma separated multiples of a general election for the scaling benchmarks, e.g. 1,10,100"
+    )
+
+
+def pytest_ignore_collect(collection_path: Path, config) -> Optional[bool]:
+    """The benchmarks need pytest-benchmark's `benchmark` fixture; without the plugin only the tests run"""
+    if collection_path == Path(__file__).parent / 'benchmarks' and not config.pluginmanager.hasplugin('benchmark'):
+        return True
+    return None
+
+
+@pytest.fixture(scope='session')
+def fixture_payload():
+    """`pipeline.Payload` of the general election sized fixture version"""
+    from texas_result_scraper import recording
+    return recording.payload(recording.load(FIXTURE))
+
+
+@pytest.fixture
+def fixture_ticker(fixture_payload):
+    """A ticker with the fixture version built into models"""
+    from texas_result_scraper.scraper import ElectionResultTicker
+    return ElectionResultTicker(election_id=49664).create_file().load_raw(
+        fixture_payload['version'], fixture_payload['county'], fixture_payload['statewide']
+    ).create_models()
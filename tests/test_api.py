@@ -0,0 +1,115 @@
+import gzip
+import json
+from http.client import HTTPConnection
+
+import pytest
+
+from texas_result_scraper.api import ResultAPI, race_path
+
+
+@pytest.fixture
+def api():
+    _api = ResultAPI()
+    server = _api.serve(port=0)
+    yield _api, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def _request(port: int, path: str, method: str = 'GET', **headers):
+    connection = HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        connection.request(method, path, headers=headers)
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_not_ready_until_published_then_not_found(api, fixture_ticker):
+    _api, port = api
+    status, _, body = _request(port, '/')
+    assert status == 503
+    assert json.loads(body) == {'error': 'no version published yet'}
+
+    _api.publish(fixture_ticker.version_no)
+    status, headers, body = _request(port, '/races/0')
+    assert status == 404
+    assert 'ETag' not in headers
+    assert json.loads(body) == {'error': 'not found'}
+
+
+def test_race_totals_are_summed_and_stable(api, fixture_ticker):
+    _api, port = api
+    version_no = fixture_ticker.version_no
+    race = max(version_no.races, key=lambda x: len(x.counties))
+    _api.publish(version_no)
+    status, headers, body = _request(port, race_path(race.race_id))
+    assert status == 200
+
+    served = json.loads(body)
+    assert served['total_votes'] == sum(x.county_total_votes for x in race.counties) > 0
+    assert served['precincts_reporting'] == sum(x.county_precincts_reporting for x in race.counties) > 0
+    assert served['registered_voters'] == sum(x.county_registered_voters for x in race.counties) > 0
+
+    # The same version again reuses every body and so every ETag
+    assert _api.publish(version_no) == 0
+    assert _request(port, race_path(race.race_id))[1]['ETag'] == headers['ETag']
+
+
+def test_if_none_match(api, fixture_ticker):
+    _api, port = api
+    _api.publish(fixture_ticker.version_no)
+    _, headers, _ = _request(port, '/statewide')
+
+    status, revalidated, body = _request(port, '/statewide', **{'If-None-Match': f'"other", W/{headers["ETag"]}'})
+    assert status == 304
+    assert revalidated['ETag'] == headers['ETag']
+    assert body == b''
+    assert _request(port, '/statewide', **{'If-None-Match': '"other"'})[0] == 200
+
+
+@pytest.mark.parametrize('accept', ['gzip', 'gzip;q=abc', 'br;q=0, gzip;q=0.5'])
+def test_gzip(api, fixture_ticker, accept):
+    _api, port = api
+    _api.publish(fixture_ticker.version_no)
+    _, _, raw = _request(port, '/statewide')
+
+    status, headers, body = _request(port, '/statewide', **{'Accept-Encoding': accept})
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(body) == raw
+
+
+def test_identity_when_no_coding_is_accepted(api, fixture_ticker):
+    _api, port = api
+    _api.publish(fixture_ticker.version_no)
+    status, headers, body = _request(port, '/statewide', **{'Accept-Encoding': 'gzip;q=0'})
+    assert status == 200
+    assert 'Content-Encoding' not in headers
+    assert json.loads(body)['version_id'] == fixture_ticker.version_no.version_id
+
+
+def test_brotli_is_preferred(api, fixture_ticker):
+    brotli = pytest.importorskip('brotli')
+    _api, port = api
+    _api.publish(fixture_ticker.version_no)
+    _, _, raw = _request(port, '/statewide')
+
+    status, headers, body = _request(port, '/statewide', **{'Accept-Encoding': 'gzip, br'})
+    assert status == 200
+    assert headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(body) == raw
+
+
+def test_head(api, fixture_ticker):
+    _api, port = api
+    _api.publish(fixture_ticker.version_no)
+    _, get_headers, body = _request(port, '/')
+
+    status, headers, empty = _request(port, '/', method='HEAD')
+    assert status == 200
+    assert empty == b''
+    assert headers['ETag'] == get_headers['ETag']
+    assert int(headers['Content-Length']) == len(body)
@@ -0,0 +1,51 @@
+import pytest
+
+from texas_result_scraper import recording
+from texas_result_scraper.cli import main, parser
+from tests.conftest import FIXTURE
+
+
+def test_parser_options():
+    args = parser().parse_args([
+        'export', '49664', '--version-id', '1012', '--version-id', '1013', '--format', 'csv,parquet', '--workers', '2'
+    ])
+    assert args.election_ids == [49664]
+    assert args.versions == [1012, 1013]
+    assert args.format == ['csv', 'parquet']
+    assert args.workers == 2
+    assert parser().parse_args(['watch', '49664', '--serve', '8080']).serve == ('127.0.0.1', 8080)
+
+
+@pytest.mark.parametrize('argv', [
+    ['export', '49664', '--format', 'csv,xml'],
+    ['watch', '49664', '--serve', 'localhost:http'],
+    ['export', '49664', '--format', 'endorsements'],
+    ['watch', '49664', '--serve', '8080', '--processes'],
+])
+def test_invalid_arguments_exit(argv):
+    with pytest.raises(SystemExit):
+        main(argv)
+
+
+def test_build_replays_a_recording(capsys):
+    assert main(['build', '--replay', str(FIXTURE)]) == 0
+    election_id, version_id, *sizes = capsys.readouterr().out.strip().split('\t')
+    assert (int(election_id), int(version_id)) == recording.ids(FIXTURE)
+    assert sizes[0] == 'counties=254'
+
+
+def test_export_writes_each_format(tmp_path):
+    assert main(['export', '--replay', str(FIXTURE.parent), '--format', 'csv,delta,cube', '--output', str(tmp_path)]) == 0
+    names = {x.name for x in tmp_path.iterdir()}
+    _prefix = 'tx-{}-{}'.format(*recording.ids(FIXTURE))
+    assert {
+        f'{_prefix}-race-results.csv', f'{_prefix}-race-results.checkpoint.csv', f'{_prefix}-cube.json', 'manifest.json',
+    } <= names
+
+
+def test_fetch_saves_recordings(tmp_path):
+    assert main(['fetch', '--replay', str(FIXTURE), '--output', str(tmp_path)]) == 0
+    election_id, version_id = recording.ids(FIXTURE)
+    saved = recording.recording_dir(str(tmp_path), election_id, version_id)
+    assert recording.is_recording(str(saved))
+    assert recording.load(str(saved)) == recording.load(FIXTURE)
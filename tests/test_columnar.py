@@ -0,0 +1,57 @@
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import pytest
+
+from texas_result_scraper import columnar
+from texas_result_scraper.flat_file import GitHubFile, statewide_totals
+from texas_result_scraper.models import bases as base
+
+
+_MARGIN = base.STATEWIDE_COLUMNS.index('winner_margin')
+_OFFICE = base.STATEWIDE_COLUMNS.index('office')
+
+
+def _read(path):
+    if path.suffix == '.parquet':
+        return pq.read_table(path)
+    with ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+@pytest.mark.parametrize('arrow', [False, True], ids=['parquet', 'arrow'])
+def test_columnar_outputs_match_the_csv(fixture_ticker, tmp_path, arrow):
+    version_no = fixture_ticker.version_no
+    output = GitHubFile(ticker=fixture_ticker, directory=tmp_path).use(version_no)
+    output.create_csv_files().create_parquet_files(arrow=arrow)
+    _suffix = 'arrow' if arrow else 'parquet'
+
+    for name, schema in columnar.SCHEMAS.items():
+        csv_path, path = output._set_file_name(name), output._set_file_name(name, _suffix)
+        table = _read(path)
+        assert table.schema.equals(schema)
+        compared = columnar.compare_formats(csv_path, path, repeat=1)
+        assert compared[path.name]['rows'] == compared[csv_path.name]['rows'] == table.num_rows > 0
+
+
+def test_float_winner_margins_land_in_the_int_column(fixture_ticker, tmp_path):
+    """An office without a margin yet turns the others' into floats, which are stored as int64 all the same"""
+    rows = list(fixture_ticker.version_no.iter_statewide())
+    _office = rows[0][_OFFICE]
+    rows = [x[:_MARGIN] + (None,) + x[_MARGIN + 1:] if x[_OFFICE] == _office else x for x in rows]
+    totals = list(statewide_totals(rows))
+    margins = {x[0]: x[-1] for x in totals}
+    assert margins[_office] is None
+    assert {type(x) for k, x in margins.items() if k != _office} == {float}
+
+    table = pq.read_table(columnar.write_parquet(tmp_path / 'statewide.parquet', columnar.STATEWIDE_TOTAL_SCHEMA, totals))
+    assert table.schema.field('winner_margin').type == pa.int64()
+    assert table.column('winner_margin').to_pylist() == [None if x[-1] is None else int(x[-1]) for x in totals]
+
+
+def test_record_batches_split_at_the_batch_size():
+    schema = pa.schema([('county_name', pa.string()), ('registered_voters', pa.int32())])
+    batches = list(columnar.record_batches(schema, ((f'COUNTY {i}', i) for i in range(5)), batch_size=2))
+    assert [x.num_rows for x in batches] == [2, 2, 1]
+    assert all(x.schema.equals(schema) for x in batches)
+    assert list(columnar.record_batches(schema, [])) == []
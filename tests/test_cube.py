@@ -0,0 +1,60 @@
+from dataclasses import replace
+
+import pandas as pd
+
+from tests.benchmarks import synthetic
+from texas_result_scraper import recording
+from texas_result_scraper.cube import ResultCube
+from texas_result_scraper.scraper import ElectionResultTicker
+
+
+SHAPE = synthetic.ElectionShape(counties=8, races=12, statewide_races=2, spread=3)
+
+
+def _version(shape):
+    _payload = recording.payload(synthetic.generate(shape))
+    ticker = ElectionResultTicker(election_id=77).create_file()
+    return ticker.load_raw(_payload['version'], _payload['county'], _payload['statewide']).create_models().version_no
+
+
+def test_cube_matches_crosstab(fixture_ticker):
+    version_no = fixture_ticker.version_no
+    cube = ResultCube()
+    cube.update(version_no)
+    races = pd.DataFrame(version_no.flatten_races())
+    expected = pd.crosstab(
+        index=[races.office_type, races.office, races.candidate, races.party],
+        columns=races.county,
+        values=races.total_votes,
+        aggfunc='sum',
+        margins=True,
+    )
+    pd.testing.assert_frame_equal(cube.to_frame(), expected, check_names=False, check_dtype=False)
+
+
+def test_updated_cube_matches_a_fresh_one():
+    first = _version(SHAPE)
+    # Another seed moves every count and a smaller shape drops counties and races
+    for shape in (replace(SHAPE, version_id=2, seed=1), replace(SHAPE, version_id=3, counties=5, races=8)):
+        cube = ResultCube()
+        cube.update(first)
+        second = _version(shape)
+        changed = cube.update(second)
+
+        fresh = ResultCube()
+        fresh.update(second)
+        assert changed
+        assert cube.version_id == fresh.version_id
+        assert cube.by_county == fresh.by_county
+        assert cube.row_totals == fresh.row_totals
+        assert cube.county_totals == fresh.county_totals
+        assert cube.total == fresh.total
+        assert cube.rollup() == fresh.rollup()
+        pd.testing.assert_frame_equal(cube.to_frame(), fresh.to_frame())
+
+
+def test_unchanged_version_touches_nothing():
+    version_no = _version(SHAPE)
+    cube = ResultCube()
+    assert cube.update(version_no) == set(version_no.county)
+    assert cube.update(version_no) == set()
@@ -0,0 +1,47 @@
+import logging
+
+import pytest
+
+from texas_result_scraper import daemon as daemon_module
+from texas_result_scraper.daemon import ResultDaemon
+
+
+def _daemon(ticker, payload, monkeypatch, sink, stop_when):
+    monkeypatch.setattr(daemon_module, 'fetch_payload', lambda ticker, version: payload)
+    _daemon = ResultDaemon(ticker, {'flaky': lambda ticker: sink}, interval=0.01)
+
+    def fetch_version():
+        if stop_when(_daemon) or _daemon.polls > 500:
+            _daemon.stop()
+        return payload['version']
+    monkeypatch.setattr(ticker, 'fetch_version', fetch_version)
+    return _daemon
+
+
+def test_failed_version_is_retried(fixture_ticker, fixture_payload, monkeypatch, caplog):
+    calls = []
+
+    def sink(version_no):
+        calls.append(version_no.version_id)
+        if len(calls) == 1:
+            raise OSError('disk full')
+
+    runner = _daemon(fixture_ticker, fixture_payload, monkeypatch, sink, lambda x: x.processed)
+    with caplog.at_level(logging.ERROR, logger='texas_result_scraper.daemon'):
+        assert runner.run() == [fixture_payload['version']['___versionNo']]
+    assert len(calls) == 2
+    assert runner.last_version == calls[0]
+    assert not runner.failures
+    # Logged when it happened, not only when the run ended
+    assert 'disk full' in caplog.text
+
+
+def test_version_still_failing_at_exit_raises(fixture_ticker, fixture_payload, monkeypatch):
+    def sink(version_no):
+        raise OSError('disk full')
+
+    runner = _daemon(fixture_ticker, fixture_payload, monkeypatch, sink, lambda x: x.polls > 20)
+    with pytest.raises(OSError):
+        runner.run()
+    assert runner.last_version is None
+    assert 'disk full' in runner.failures[fixture_payload['version']['___versionNo']][0]
@@ -0,0 +1,21 @@
+from utils.db_conn import DBSettings
+
+
+def _config(path, pool_size):
+    path.write_text(f'[database]\npool_size = {pool_size}\n')
+    return path
+
+
+def test_explicit_config_file_wins_over_the_environment(tmp_path):
+    explicit = _config(tmp_path / 'explicit.toml', 3)
+    environ = {'TX_RESULTS_DB_CONFIG': str(_config(tmp_path / 'env.toml', 7))}
+    assert DBSettings.load(explicit, environ=environ).pool_size == 3
+    assert DBSettings.load(environ=environ).pool_size == 7
+
+
+def test_environment_overrides_config_values(tmp_path):
+    settings = DBSettings.load(
+        _config(tmp_path / 'db.toml', 3),
+        environ={'TX_RESULTS_DB_POOL_SIZE': '9', 'TX_RESULTS_DB_URL': 'sqlite://', 'TX_RESULTS_DB_ECHO': 'yes'}
+    )
+    assert (settings.pool_size, settings.url, settings.echo) == (9, 'sqlite://', True)
@@ -0,0 +1,183 @@
+import csv
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+
+from texas_result_scraper import db_writer
+from texas_result_scraper.db_writer import BulkWriter, migrate, table_rows, upsert
+
+
+POSTGRES_URL = os.environ.get('TX_RESULTS_TEST_POSTGRES_URL')
+
+
+def _sqlite(tmp_path):
+    return create_engine(f'sqlite:///{tmp_path / "results.db"}')
+
+
+def test_version_ids_repeat_across_elections(fixture_ticker, tmp_path):
+    engine = _sqlite(tmp_path)
+    writer = BulkWriter(engine)
+    writer.create_tables()
+    version_no = fixture_ticker.version_no
+    writer.write(version_no)
+    writer.write(version_no.model_copy(update={'election_id': version_no.election_id + 1}))
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(db_writer.versions.c.election_id, db_writer.versions.c.version_id)).all()
+    assert sorted(rows) == [
+        (version_no.election_id, version_no.version_id), (version_no.election_id + 1, version_no.version_id)
+    ]
+
+
+
+_RACE_TOTALS = {
+    'total_votes': 'county_total_votes',
+    'precincts_reporting': 'county_precincts_reporting',
+    'registered_voters': 'county_registered_voters',
+    'total_precincts': 'county_precincts',
+}
+
+
+def _race_totals(engine):
+    """Stored race totals beside the sums of their county rows, by race_id"""
+    _races, _counties = db_writer.races, db_writer.county_races
+    with engine.connect() as conn:
+        stored = {
+            x.race_id: tuple(getattr(x, k) for k in _RACE_TOTALS)
+            for x in conn.execute(select(_races))
+        }
+        summed = {}
+        for x in conn.execute(select(_counties)):
+            _sums = summed.get(x.race_id, (0,) * len(_RACE_TOTALS))
+            summed[x.race_id] = tuple(a + getattr(x, v) for a, v in zip(_sums, _RACE_TOTALS.values()))
+    return stored, summed
+
+
+def test_race_totals_are_the_sums_of_their_counties(fixture_ticker, tmp_path):
+    engine = _sqlite(tmp_path)
+    writer = BulkWriter(engine)
+    writer.create_tables()
+    writer.write(fixture_ticker.version_no)
+
+    stored, summed = _race_totals(engine)
+    assert stored == summed
+    assert all(all(x) for x in stored.values())
+
+
+def test_refresh_updates_race_totals_when_only_votes_change(fixture_ticker, tmp_path):
+    engine = _sqlite(tmp_path)
+    writer = BulkWriter(engine)
+    writer.create_tables()
+    version_no = fixture_ticker.version_no
+    writer.write(version_no)
+
+    # A later poll where one county reports more votes for one candidate and nothing else moves
+    race = max(version_no.races, key=lambda x: len(x.counties))
+    county = race.counties[0]
+    result = next(x for x in race.candidates[0].county_results if x.county == county.county)
+    result.total_votes += 10
+    county.county_total_votes += 10
+    before = _race_totals(engine)[0][race.race_id]
+
+    written = writer.refresh(version_no)
+    assert written['racedetails'] == written['countyracedetails'] == written['candidatecountyresults'] == 1
+    stored, summed = _race_totals(engine)
+    assert stored == summed
+    assert stored[race.race_id][0] == before[0] + 10
+
+def test_migrate_rekeys_a_versions_table_keyed_on_version_alone(tmp_path):
+    engine = _sqlite(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE resultversionnumber '
+            '(version_id INTEGER PRIMARY KEY, election_id INTEGER NOT NULL, election_date DATE)'
+        ))
+        conn.execute(text("INSERT INTO resultversionnumber VALUES (1012, 49664, '2024-11-05')"))
+    migrate(engine)
+
+    assert inspect(engine).get_pk_constraint('resultversionnumber')['constrained_columns'] == ['election_id', 'version_id']
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT election_id, version_id FROM resultversionnumber')).all() == [(49664, 1012)]
+
+
+class _Cursor:
+    def __init__(self, copied: list):
+        self.copied = copied
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+    def copy_expert(self, sql: str, buffer: io.StringIO) -> None:
+        self.copied.append((sql, buffer.read()))
+
+
+class _Connection:
+    """Records the statements and COPY data `upsert` sends on a PostgreSQL connection"""
+    dialect = SimpleNamespace(name='postgresql')
+
+    def __init__(self):
+        self.statements, self.copied = [], []
+        self.connection = SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=lambda: _Cursor(self.copied)))
+
+    def execute(self, statement, *_):
+        self.statements.append(str(statement))
+
+
+def test_postgres_upsert_copies_through_a_staging_table(fixture_ticker):
+    table = db_writer.candidate_results
+    rows = table_rows(fixture_ticker.version_no)[table]
+    conn = _Connection()
+    assert upsert(conn, table, rows + rows[:1]) == len(rows)
+
+    (sql, data), = conn.copied
+    _columns = [x.name for x in table.columns]
+    assert sql == f"COPY _staging_{table.name} ({', '.join(_columns)}) FROM STDIN WITH (FORMAT csv)"
+    copied = list(csv.reader(io.StringIO(data)))
+    assert len(copied) == len(rows)
+    assert copied[0] == ['' if rows[0][x] is None else str(rows[0][x]) for x in _columns]
+
+    create, merge, truncate = conn.statements
+    assert create.startswith(f'CREATE TEMP TABLE IF NOT EXISTS _staging_{table.name} (LIKE {table.name})')
+    assert f'INSERT INTO {table.name}' in merge
+    assert 'ON CONFLICT (election_id, race_id, candidate_id, county) DO UPDATE SET' in merge
+    assert truncate == f'TRUNCATE _staging_{table.name}'
+
+
+@pytest.mark.skipif(POSTGRES_URL is None, reason="set TX_RESULTS_TEST_POSTGRES_URL to a scratch database")
+def test_postgres_matches_sqlite(fixture_ticker, tmp_path):
+    version_no = fixture_ticker.version_no
+    postgres = create_engine(POSTGRES_URL)
+    with postgres.begin() as conn:
+        for table in reversed(db_writer.RESULT_TABLES + db_writer.AGGREGATE_TABLES):
+            table.drop(conn, checkfirst=True)
+    written = {}
+    for name, engine in (('postgres', postgres), ('sqlite', _sqlite(tmp_path))):
+        writer = BulkWriter(engine)
+        writer.create_tables()
+        written[name] = writer.write(version_no)
+        # A second write of the same version goes through ON CONFLICT for every row
+        writer.write(version_no)
+    assert written['postgres'] == written['sqlite']
+    with postgres.connect() as conn:
+        _count = conn.execute(select(db_writer.candidate_results.c.county)).all()
+    assert len(_count) == written['sqlite']['candidatecountyresults']
+
+
+def test_migrate_drops_indexes_the_primary_keys_cover(tmp_path):
+    engine = _sqlite(tmp_path)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE UNIQUE INDEX ix_candidatecountyresults_race_county_candidate '
+            'ON candidatecountyresults (election_id, race_id, county, candidate_id)'
+        ))
+    assert migrate(engine) == []
+    _names = {x['name'] for x in inspect(engine).get_indexes('candidatecountyresults')}
+    assert 'ix_candidatecountyresults_race_county_candidate' not in _names
+    assert 'ix_candidatecountyresults_county' in _names
@@ -0,0 +1,74 @@
+import csv
+import hashlib
+from pathlib import Path
+from types import SimpleNamespace
+
+from texas_result_scraper.endorsements import EndorsementIndex, read_endorsements
+from texas_result_scraper.validator import CandidateEndorsements
+
+
+HEADER = ['Candidate First Name', 'Candidate Last Name', 'District Type', 'District Number', 'Abbott Endorsed']
+# As a sheet spells them; the last is the House candidate under a district they do not stand in
+ROWS = [
+    ['Candidate', '120-1', 'House', '018', 'TRUE'],
+    ['Candidate', '203-2', 'State Senate', '32', 'yes'],
+    ['Candidate', '120-1', 'Senate', '18', 'TRUE'],
+]
+
+
+def _csv(path: Path, rows) -> Path:
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return path
+
+
+def _validator_id(first: str, last: str, district: str, number: str) -> int:
+    # The model cannot be built as is (its after validator assigns a field under `validate_assignment` and
+    # recurses), so its id method is given the values the model coerces to: upper-cased strings and an int
+    return CandidateEndorsements.generate_endorsement_id(SimpleNamespace(
+        candidate_first_name=first.strip().upper(),
+        candidate_last_name=last.strip().upper(),
+        district=district.strip().upper(),
+        district_number=int(number),
+    )).id
+
+
+def test_ids_match_the_validator(tmp_path: Path):
+    frame = read_endorsements(_csv(tmp_path / 'endorsements.csv', [
+        [' Dawn ', 'Richardson', 'House', '012', ''],
+        ['Matt', 'Johnson', 'Chief Justice', '10', ''],
+    ]))
+    assert frame['endorsement_id'].tolist() == [
+        _validator_id('Dawn', 'Richardson', 'House', '012'),
+        _validator_id('Matt', 'Johnson', 'Chief Justice', '10'),
+    ]
+    assert frame['endorsement_id'][0] == int(hashlib.sha256(b'DAWNRICHARDSONHOUSE12').hexdigest(), 16) % 10 ** 8
+
+
+def test_join_maps_district_types_and_statewide_candidates(fixture_ticker, tmp_path: Path):
+    joined = EndorsementIndex.from_csv(_csv(tmp_path / 'endorsements.csv', ROWS)).join(fixture_ticker.version_no)
+    matched = {(x.source, x.office_type, x.candidate) for x in joined.itertuples()}
+
+    # 'House' '018' is the HD 18 race, both as a race and as its statewide summary
+    assert matched == {
+        ('race', 'HD', 'CANDIDATE 120-1'),
+        ('statewide', 'HD', 'CANDIDATE 120-1'),
+        ('race', 'SD', 'CANDIDATE 203-2'),
+        ('statewide', 'SD', 'CANDIDATE 203-2'),
+    }
+    assert joined['abbott'].all()
+
+
+def test_join_is_cached_until_the_candidates_change(fixture_ticker, tmp_path: Path):
+    version_no = fixture_ticker.version_no
+    index = EndorsementIndex.from_csv(_csv(tmp_path / 'endorsements.csv', ROWS))
+    joined = index.join(version_no)
+    assert index.join(version_no) is joined
+
+    # The HD 18 race leaves the ballot
+    version_no.races = [x for x in version_no.races if x.race_id != 120]
+    rejoined = index.join(version_no)
+    assert rejoined is not joined
+    assert set(rejoined['source'][rejoined['candidate'] == 'CANDIDATE 120-1']) == {'statewide'}
@@ -0,0 +1,45 @@
+import csv
+import io
+
+import pandas as pd
+
+from texas_result_scraper.flat_file import DELTA_KEYS, GitHubFile, STATEWIDE_TOTAL_COLUMNS, statewide_totals
+
+
+def _csv(rows) -> list:
+    _buffer = io.StringIO()
+    csv.writer(_buffer).writerows(rows)
+    return list(csv.reader(io.StringIO(_buffer.getvalue())))
+
+
+def test_statewide_totals_match_pandas_groupby(fixture_ticker):
+    """The streamed roll-up writes what the `groupby().agg()` it replaced wrote"""
+    version_no = fixture_ticker.version_no
+    expected = pd.DataFrame(version_no.flatten_statewide()).groupby(['office', 'candidate', 'party']).agg({
+        'early_votes': 'sum',
+        'election_day_votes': 'sum',
+        'total_votes': 'sum',
+        'percent': 'mean',
+        'winner_margin': 'first'
+    }).reset_index()
+    _expected = list(csv.reader(io.StringIO(expected.to_csv(index=False))))
+    assert _csv([STATEWIDE_TOTAL_COLUMNS, *statewide_totals(version_no.iter_statewide())]) == _expected
+
+
+def test_delta_rows_of_races_sharing_an_office_stay_apart(fixture_ticker, tmp_path):
+    """A second race with the same office, candidates and counties is its own set of delta rows"""
+    version_no = fixture_ticker.version_no
+    race = version_no.races[0]
+    version_no.races.append(race.model_copy(update={'race_id': race.race_id + 10 ** 6}))
+
+    output = GitHubFile(ticker=fixture_ticker, directory=tmp_path).use(version_no).create_delta_files()
+    rows = output.deltas.rebuild('race-results', DELTA_KEYS['race-results'])
+    assert len(rows) == len(list(version_no.iter_races()))
+
+    # Dropping the copy again deletes only its rows
+    version_no.races.pop()
+    version_no.version_id += 1
+    output.use(version_no).create_delta_files()
+    with open(output.deltas.path('race-results', version_no.version_id, 'delta'), newline='') as f:
+        ops = [row[:2] for row in csv.reader(f)][1:]
+    assert ops and all(op == ['D', str(race.race_id + 10 ** 6)] for op in ops)
@@ -0,0 +1,78 @@
+import pytest
+
+from texas_result_scraper import indexed_snapshot, snapshot
+from texas_result_scraper.flat_file import GitHubFile
+from texas_result_scraper.indexed_snapshot import IndexedSnapshot
+
+
+@pytest.fixture
+def indexed(fixture_ticker, tmp_path):
+    output = GitHubFile(ticker=fixture_ticker, directory=tmp_path).use(fixture_ticker.version_no)
+    output.write_indexed_snapshot()
+    with IndexedSnapshot.latest(tmp_path, fixture_ticker.election_id) as _snapshot:
+        yield fixture_ticker.version_no, _snapshot
+
+
+def test_races_by_office_type_and_district(indexed):
+    version_no, index = indexed
+    race = next(x for x in version_no.races if x.office_type == 'HD')
+
+    assert [x.model_dump() for x in index.races('HD', race.office_district)] == [
+        x.model_dump() for x in version_no.races if x.office_type == 'HD' and x.office_district == race.office_district
+    ]
+    assert sorted(x.race_id for x in index.races('HD')) == sorted(
+        x.race_id for x in version_no.races if x.office_type == 'HD'
+    )
+    assert index.race(race.race_id).model_dump() == race.model_dump()
+    assert index.races('HD', 'NO SUCH DISTRICT') == []
+    assert index.races('NO SUCH TYPE') == []
+
+
+def test_county_is_looked_up_in_any_case(indexed):
+    version_no, index = indexed
+    name = next(iter(version_no.county))
+    county, races = index.county(name.lower())
+
+    assert county.model_dump() == version_no.county[name].model_dump()
+    expected = [x for x in version_no.races if any(c.county == name for c in x.counties)]
+    assert [x.race_id for x in races] == [x.race_id for x in expected]
+    for race in races:
+        assert {x.county for x in race.counties} == {name}
+        assert {r.county for x in race.candidates for r in x.county_results} == {name}
+
+
+def test_office_and_version(indexed):
+    version_no, index = indexed
+    office_id, office = next(iter(version_no.statewide.items()))
+    assert index.office(office_id).model_dump() == office.model_dump()
+    assert index.version.version_id == version_no.version_id
+    assert sorted(index.race_ids) == sorted(x.race_id for x in version_no.races)
+    assert sorted(index.county_names) == sorted(version_no.county)
+
+
+def test_missing_keys_raise(indexed):
+    _, index = indexed
+    with pytest.raises(KeyError):
+        index.race(-1)
+    with pytest.raises(KeyError):
+        index.county('NO SUCH COUNTY')
+    with pytest.raises(KeyError):
+        index.office(-1)
+    with pytest.raises(FileNotFoundError):
+        IndexedSnapshot.latest(index.path.parent, 1)
+
+
+def test_bad_header_is_rejected(fixture_ticker, tmp_path):
+    path = indexed_snapshot.write(tmp_path / 'good.idx', fixture_ticker.version_no)
+    data = path.read_bytes()
+    _, _, toc_offset = indexed_snapshot.HEADER.unpack_from(data)
+
+    # A plain snapshot is not an indexed one
+    (tmp_path / 'plain.idx').write_bytes(snapshot.dumps(fixture_ticker.version_no))
+    with pytest.raises(ValueError, match='Not a result snapshot'):
+        IndexedSnapshot(tmp_path / 'plain.idx')
+
+    newer = indexed_snapshot.HEADER.pack(indexed_snapshot.MAGIC, snapshot.SCHEMA_VERSION + 1, toc_offset)
+    (tmp_path / 'newer.idx').write_bytes(newer + data[indexed_snapshot.HEADER.size:])
+    with pytest.raises(ValueError, match='newer than supported'):
+        IndexedSnapshot(tmp_path / 'newer.idx')
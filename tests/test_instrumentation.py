@@ -0,0 +1,46 @@
+from time import sleep
+
+import pytest
+
+from texas_result_scraper.flat_file import GitHubFile
+from texas_result_scraper.instrumentation import Metrics, metrics
+
+
+def _spans(report, name):
+    return {x['labels'].get('output'): x for x in report['spans'] if x['name'] == name}
+
+
+def test_timed_leaves_out_the_consumer():
+    _metrics = Metrics(enabled=True)
+
+    def rows():
+        for i in range(3):
+            sleep(0.01)
+            yield i
+    for _ in _metrics.timed('flatten', rows(), output='races'):
+        sleep(0.05)
+
+    (span,) = _spans(_metrics.report(), 'flatten').values()
+    assert span['count'] == 1
+    assert 0.03 <= span['seconds'] < 0.1
+
+
+def test_timed_is_a_pass_through_when_disabled():
+    rows = iter([1, 2])
+    assert Metrics().timed('flatten', rows) is rows
+
+
+@pytest.fixture
+def enabled():
+    _enabled = metrics.enabled
+    metrics.reset().enabled = True
+    yield metrics
+    metrics.reset().enabled = _enabled
+
+
+def test_csv_outputs_report_flatten_spans(enabled, fixture_ticker, tmp_path):
+    GitHubFile(ticker=fixture_ticker, directory=tmp_path).use(fixture_ticker.version_no).create_csv_files()
+    report = enabled.report()
+    # Each output's rows are streamed once, hashed as they are written
+    assert {k: v['count'] for k, v in _spans(report, 'flatten').items()} == {'races': 1, 'counties': 1, 'statewide': 1}
+    assert set(_spans(report, 'write')) == {'race-results.csv', 'county-results.csv', 'statewide-results.csv'}
@@ -0,0 +1,50 @@
+from texas_result_scraper.manifest import OutputManifest, hash_rows
+
+
+COLUMNS = ('county_name', 'registered_voters')
+
+
+def test_unchanged_needs_the_output_file(tmp_path):
+    digest = hash_rows(COLUMNS, [('TRAVIS', 900000)])
+    output = tmp_path / 'tx-77-1-county-results.csv'
+    output.write_text('county_name,registered_voters\nTRAVIS,900000\n')
+    manifest = OutputManifest(tmp_path / 'manifest.json')
+    manifest.record(77, 'county-results.csv', digest, 1, output)
+
+    reloaded = OutputManifest(tmp_path / 'manifest.json')
+    assert reloaded.unchanged(77, 'county-results.csv', digest)
+    assert not reloaded.unchanged(77, 'county-results.csv', hash_rows(COLUMNS, [('TRAVIS', 900001)]))
+    assert not reloaded.unchanged(78, 'county-results.csv', digest)
+
+    # A deleted output is written again even though its rows did not change
+    output.unlink()
+    assert not reloaded.unchanged(77, 'county-results.csv', digest)
+
+
+def test_rows_are_built_once_and_unchanged_outputs_leave_no_file(fixture_ticker, tmp_path):
+    from texas_result_scraper.flat_file import GitHubFile, kept_file, write_csv
+
+    output = GitHubFile(ticker=fixture_ticker, directory=tmp_path).use(fixture_ticker.version_no)
+    builds = []
+
+    def rows():
+        builds.append(1)
+        yield ('TRAVIS', 900000)
+
+    path = tmp_path / 'counties.csv'
+    _write = kept_file(path, lambda _path, _rows: write_csv(_path, COLUMNS, _rows))
+    assert output._write_if_changed('counties.csv', COLUMNS, rows, _write) == path
+    written = path.stat().st_mtime_ns
+
+    assert output._write_if_changed('counties.csv', COLUMNS, rows, _write) is None
+    assert len(builds) == 2
+    assert output.skipped_file_names == ['counties.csv']
+    assert path.stat().st_mtime_ns == written
+    assert sorted(x.name for x in tmp_path.iterdir()) == ['counties.csv', 'manifest.json']
+
+    # The delta of an unchanged version is not written either
+    output.create_delta_files()
+    _files = set(tmp_path.iterdir())
+    output.use(fixture_ticker.version_no.model_copy(update={'version_id': fixture_ticker.version_no.version_id + 1}))
+    output.create_delta_files()
+    assert set(tmp_path.iterdir()) == _files
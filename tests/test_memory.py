@@ -0,0 +1,29 @@
+import json
+
+from texas_result_scraper.instrumentation import metrics
+from texas_result_scraper.memory import MemoryProfiler, profile_version
+
+
+def test_nested_stage_keeps_the_outer_peak():
+    with MemoryProfiler() as profiler:
+        with profiler.stage('outer'):
+            _block = bytearray(8 * 2 ** 20)
+            del _block
+            with profiler.stage('inner'):
+                _small = bytearray(2 ** 10)
+    inner, outer = profiler.stages
+    assert (inner['stage'], outer['stage']) == ('inner', 'outer')
+    assert inner['traced_peak'] < 2 ** 20
+    assert outer['traced_peak'] >= 8 * 2 ** 20
+
+
+def test_profile_version_leaves_global_metrics_alone(fixture_ticker, fixture_payload, tmp_path):
+    assert not metrics.enabled
+    _spans, _hooks = dict(metrics.spans), list(metrics.hooks)
+    path = profile_version(fixture_ticker, fixture_payload, directory=tmp_path)
+
+    assert path.is_file()
+    assert not metrics.enabled
+    assert metrics.spans == _spans and metrics.hooks == _hooks
+    stages = {x['stage'] for x in json.loads(path.read_text())['stages']}
+    assert {'county_build', 'statewide_build', 'write:race-results.csv'} <= stages
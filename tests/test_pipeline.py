@@ -0,0 +1,38 @@
+import os
+from threading import Thread
+
+from texas_result_scraper import pipeline
+from texas_result_scraper.pipeline import ResultPipeline
+
+
+def _dying_sink(ticker):
+    def write(version_no):
+        os._exit(3)
+    return write
+
+
+def test_dead_sink_process_fails_the_run(fixture_ticker, fixture_payload):
+    """Building must not block for good on the queue of a sink process that has exited"""
+    runner = ResultPipeline(fixture_ticker, {'dies': _dying_sink}, maxsize=1, processes=True)
+    raised = []
+
+    def run():
+        try:
+            runner.run([fixture_payload] * 4)
+        except RuntimeError as e:
+            raised.append(e)
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+    assert not thread.is_alive()
+    assert raised
+    assert any('exited' in str(x) for x in runner.errors)
+
+
+def test_live_polls_wait_the_interval(fixture_ticker, fixture_payload, monkeypatch):
+    waits = []
+    monkeypatch.setattr(pipeline, 'fetch_payload', lambda ticker: fixture_payload)
+    monkeypatch.setattr(pipeline, 'sleep', waits.append)
+    version_id = fixture_payload['version']['___versionNo']
+    assert ResultPipeline(fixture_ticker, {}).run(polls=3, interval=30) == [version_id] * 3
+    assert waits == [30, 30]
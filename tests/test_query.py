@@ -0,0 +1,43 @@
+def test_query_index_is_reused_until_the_version_changes(fixture_ticker):
+    version_no = fixture_ticker.version_no
+    index = version_no.query
+    assert version_no.query is index
+
+    # A race added, or the races replaced wholesale, is seen without scanning them
+    race = version_no.races[0]
+    version_no.races.append(race.model_copy(update={'race_id': race.race_id + 10 ** 6}))
+    assert version_no.query is not index
+    assert version_no.query.race(race.race_id + 10 ** 6) is version_no.races[-1]
+
+    index = version_no.query
+    version_no.races = version_no.races[1:]
+    assert version_no.query is not index
+    assert version_no.query.race(race.race_id) is None
+
+    # As is a new version id on the same models
+    index = version_no.query
+    version_no.version_id += 1
+    assert version_no.query is not index
+
+
+def test_races_replaced_in_place_need_invalidating(fixture_ticker):
+    version_no = fixture_ticker.version_no
+    index = version_no.query
+    race = version_no.races[0]
+    version_no.races[0] = race.model_copy(update={'race_id': race.race_id + 10 ** 6})
+    assert version_no.query is index
+
+    version_no.invalidate_query()
+    assert version_no.query.race(race.race_id + 10 ** 6) is version_no.races[0]
+    assert version_no.query.race(race.race_id) is None
+
+
+def test_rebuilt_version_gets_a_new_index(fixture_ticker):
+    index = fixture_ticker.version_no.query
+    fixture_ticker.create_models()
+    assert fixture_ticker.version_no.query is not index
+
+    # Invalidated explicitly for changes the signature does not cover
+    index = fixture_ticker.version_no.query
+    fixture_ticker.version_no.invalidate_query()
+    assert fixture_ticker.version_no.query is not index
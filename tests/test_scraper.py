@@ -0,0 +1,28 @@
+from dataclasses import replace
+
+from tests.benchmarks import synthetic
+from texas_result_scraper import recording
+from texas_result_scraper.scraper import ElectionResultTicker
+
+
+SHAPE = synthetic.ElectionShape(counties=6, races=12, statewide_races=2, spread=3)
+
+
+def _build(ticker, shape):
+    _payload = recording.payload(synthetic.generate(shape))
+    return ticker.load_raw(_payload['version'], _payload['county'], _payload['statewide']).create_models()
+
+
+def test_reused_ticker_builds_each_version_from_scratch():
+    ticker = ElectionResultTicker(election_id=77).create_file()
+    _build(ticker, SHAPE)
+    second = replace(SHAPE, version_id=2, seed=1)
+    _build(ticker, second)
+
+    fresh = _build(ElectionResultTicker(election_id=77).create_file(), second)
+    assert ticker.version_no.version_id == 2
+    assert len(ticker.version_no.races) == SHAPE.races
+    assert len({x.race_id for x in ticker.version_no.races}) == SHAPE.races
+    # Every row comes from the second version alone, as if a new ticker had built it
+    assert list(ticker.version_no.iter_races()) == list(fresh.version_no.iter_races())
+    assert list(ticker.version_no.iter_statewide()) == list(fresh.version_no.iter_statewide())
@@ -0,0 +1,33 @@
+import pytest
+
+from texas_result_scraper import snapshot
+from texas_result_scraper.flat_file import GitHubFile
+
+
+def test_snapshot_round_trip(fixture_ticker, tmp_path):
+    version_no = fixture_ticker.version_no
+    output = GitHubFile(ticker=fixture_ticker, directory=tmp_path).use(version_no)
+    output.write_snapshot()
+    expected = version_no.model_dump()
+    assert expected['races'][0]['total_votes'] > 0
+
+    assert output.read_snapshot(trusted=True).model_dump() == expected
+
+    # Validating upper-cases strings, which built models skip for the office types `set_office_type` fills in
+    for office in [*expected['races'], *expected['statewide'].values()]:
+        office['office_type'] = office['office_type'] and office['office_type'].upper()
+    assert output.read_snapshot(trusted=False).model_dump() == expected
+
+
+def test_header_is_checked(fixture_ticker):
+    data = snapshot.dumps(fixture_ticker.version_no)
+    assert data[:4] == snapshot.MAGIC
+    assert snapshot.HEADER.unpack_from(data) == (snapshot.MAGIC, snapshot.SCHEMA_VERSION)
+
+    with pytest.raises(ValueError, match='Not a result snapshot'):
+        snapshot.loads(b'JSON' + data[4:])
+    with pytest.raises(ValueError, match='newer than supported'):
+        snapshot.loads(snapshot.HEADER.pack(snapshot.MAGIC, snapshot.SCHEMA_VERSION + 1) + data[snapshot.HEADER.size:])
+    # Older schema versions are still read
+    older = snapshot.HEADER.pack(snapshot.MAGIC, 0) + data[snapshot.HEADER.size:]
+    assert snapshot.loads(older).version_id == fixture_ticker.version_no.version_id
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from texas_result_scraper.cube import ResultCube
+from texas_result_scraper.sparse import SparseResultMatrix
+
+
+def _cube(version_no) -> ResultCube:
+    cube = ResultCube()
+    cube.update(version_no)
+    return cube
+
+
+def test_dense_view_matches_the_cube(fixture_ticker):
+    cube = _cube(fixture_ticker.version_no)
+    matrix = SparseResultMatrix.from_cube(cube)
+
+    pd.testing.assert_frame_equal(matrix.to_dense(), cube.to_frame(margins=False))
+    assert len(matrix.data) == sum(len(x) for x in cube.by_county.values())
+    assert 0 < matrix.density < 1
+
+    row = matrix.rows[0]
+    assert matrix.row(row) == {c: v for c, cells in cube.by_county.items() if (v := cells.get(row)) is not None}
+    assert matrix.to_long().groupby('county', observed=True)['total_votes'].sum().to_dict() == cube.county_totals
+
+
+def test_npz_round_trip(fixture_ticker, tmp_path):
+    matrix = SparseResultMatrix.from_cube(_cube(fixture_ticker.version_no))
+    loaded = SparseResultMatrix.load(matrix.save(tmp_path / 'matrix.npz'))
+
+    assert loaded.rows == matrix.rows
+    assert loaded.counties == matrix.counties
+    for name in ('indptr', 'indices', 'data'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(matrix, name))
+        assert getattr(loaded, name).dtype == getattr(matrix, name).dtype
+    pd.testing.assert_frame_equal(loaded.to_dense(), matrix.to_dense())
@@ -0,0 +1,68 @@
+from dataclasses import replace
+from functools import partial
+from itertools import islice
+
+import pytest
+
+from tests.benchmarks import synthetic
+from texas_result_scraper import recording, timeseries
+from texas_result_scraper.pipeline import ResultPipeline, timeseries_sink
+from texas_result_scraper.scraper import ElectionResultTicker
+from texas_result_scraper.timeseries import ResultTimeSeries, iter_cells
+
+
+SHAPE = synthetic.ElectionShape(counties=8, races=12, statewide_races=2, spread=3)
+
+
+def _version(shape):
+    _payload = recording.payload(synthetic.generate(shape))
+    ticker = ElectionResultTicker(election_id=77).create_file()
+    return ticker.load_raw(_payload['version'], _payload['county'], _payload['statewide']).create_models().version_no
+
+
+def _first_cell(version_no):
+    (race_id, candidate_id, county), early, total = next(iter_cells(version_no))
+    return race_id, candidate_id, county, early, total
+
+
+def test_older_version_is_not_recorded(fixture_ticker, tmp_path):
+    version_no = fixture_ticker.version_no
+    race_id, candidate_id, county, early, total = _first_cell(version_no)
+    series = ResultTimeSeries(tmp_path / 'history.db')
+    assert series.append(version_no) > 0
+
+    older = version_no.model_copy(update={'version_id': version_no.version_id - 1})
+    assert series.append(older) == 0
+    assert [x[0] for x in series.versions()] == [version_no.version_id]
+    (_, _, _early, _total), = series.candidate_totals(candidate_id, race_id, county)
+    assert (_early, _total) == (early, total)
+
+
+def test_pipeline_appends_to_the_history(fixture_ticker, fixture_payload, tmp_path):
+    """The sink is opened on the calling thread and written from the pipeline's"""
+    pipeline = ResultPipeline(fixture_ticker, {'timeseries': partial(timeseries_sink, directory=tmp_path)})
+    assert pipeline.run([fixture_payload]) == [fixture_ticker.version_no.version_id]
+
+    series = ResultTimeSeries.for_election(tmp_path, fixture_ticker.election_id)
+    assert [x[0] for x in series.versions()] == [fixture_ticker.version_no.version_id]
+
+
+def test_failed_write_leaves_nothing_behind(tmp_path, monkeypatch):
+    first, second = _version(SHAPE), _version(replace(SHAPE, version_id=2, seed=1))
+    series = ResultTimeSeries(tmp_path / 'history.db')
+    series.append(first)
+
+    def failing(version_no):
+        yield from islice(iter_cells(version_no), 10)
+        raise OSError('disk full')
+
+    monkeypatch.setattr(timeseries, 'iter_cells', failing)
+    with pytest.raises(OSError):
+        series.append(second)
+    monkeypatch.undo()
+    assert [x[0] for x in series.versions()] == [1]
+
+    # The retry is diffed against what the first version stored, so every cell ends at the second's counts
+    assert series.append(second) > 0
+    for (race_id, candidate_id, county), early, total in iter_cells(second):
+        assert series.candidate_totals(candidate_id, race_id, county)[-1][2:] == (early, total)
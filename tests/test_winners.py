@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from texas_result_scraper.models import bases as base
+from texas_result_scraper.winners import WinnerCalculator, WINNER_COLUMNS
+
+
+def _office(office_id, *votes):
+    candidates = [
+        SimpleNamespace(name=f'CANDIDATE {i}', party=('Republican', 'Democrat', 'Libertarian')[i % 3], total_votes=v)
+        for i, v in enumerate(votes)
+    ]
+    return SimpleNamespace(
+        office_id=office_id, candidates=candidates,
+        winner=None, winner_party=None, winner_margin=None, winner_percent=None
+    )
+
+
+def _winner(office):
+    return {x: getattr(office, x) for x in WINNER_COLUMNS}
+
+
+@pytest.mark.parametrize('votes', [
+    pytest.param((120, 80), id='two candidates'),
+    pytest.param((50, 50, 10), id='tie goes to the first listed'),
+    pytest.param((10, 50, 50), id='tie after a lower candidate'),
+    pytest.param((0, 0), id='no votes counted'),
+    pytest.param((40, 35, 25), id='runoff, no majority'),
+    pytest.param((75,), id='uncontested'),
+    pytest.param((0,), id='uncontested, no votes'),
+])
+def test_matches_check_for_winner(votes):
+    expected = _office(1, *votes)
+    base.StatewideOfficeSummaryBase.check_for_winner(expected)
+    batch = _office(1, *votes)
+    WinnerCalculator().update([batch])
+    assert _winner(batch) == pytest.approx(_winner(expected))
+
+
+def test_matches_check_for_winner_across_offices():
+    offices = [_office(i, *votes) for i, votes in enumerate([(3, 9, 9), (0, 0, 0), (7,), (5, 4), (1, 2, 3, 4)])]
+    expected = [_office(x.office_id, *(c.total_votes for c in x.candidates)) for x in offices]
+    for office in expected:
+        base.StatewideOfficeSummaryBase.check_for_winner(office)
+    WinnerCalculator().update(offices)
+    assert [_winner(x) for x in offices] == [pytest.approx(_winner(x)) for x in expected]
+
+
+def test_only_changed_offices_are_recomputed():
+    calculator = WinnerCalculator()
+    assert calculator.update([_office(1, 10, 5), _office(2, 3, 4)]) == {1, 2}
+    offices = [_office(1, 10, 5), _office(2, 3, 9)]
+    assert calculator.update(offices) == {2}
+    # Unchanged offices still get their winner fields set from the cache
+    assert offices[0].winner == 'CANDIDATE 0' and offices[0].winner_margin == 5
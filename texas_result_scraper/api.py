@@ -0,0 +1,254 @@
+"""
+Local JSON API over the latest built version, for dashboards polling during an election night.
+
+    GET /                  version, election and the paths below
+    GET /statewide         statewide offices with their candidates
+    GET /races/<race_id>   one race with its candidates and county results
+    GET /counties/<name>   one county's summary and its race result rows
+
+Bodies are serialized and compressed once when a version is published, not per request. Every response
+carries an ETag of its body, so a client polling with `If-None-Match` gets a 304 until what it asked for
+changes, including across versions that left it unchanged.
+"""
+from typing import Callable, Dict, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from collections import defaultdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import quote, unquote, urlsplit
+import gzip
+import hashlib
+import json
+import logging
+
+from sqlmodel import SQLModel
+
+from texas_result_scraper.models import bases as base
+from texas_result_scraper.instrumentation import metrics
+
+try:
+    import brotli
+except ImportError:  # optional; responses are then gzip or identity only
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+# Brotli's default of 11 takes seconds over a full version; 5 still beats gzip on size
+BROTLI_QUALITY = 5
+# Bodies smaller than this are sent as is
+MIN_COMPRESS = 256
+
+_COUNTY = base.RACE_COLUMNS.index('county')
+
+
+def etag(raw: bytes) -> str:
+    return '"{}"'.format(hashlib.blake2b(raw, digest_size=12).hexdigest())
+
+
+@dataclass(frozen=True)
+class Body:
+    """One response body in each encoding it is served in"""
+    raw: bytes
+    etag: str
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    @classmethod
+    def of(cls, raw: bytes, tag: Optional[str] = None) -> 'Body':
+        tag = tag or etag(raw)
+        if len(raw) < MIN_COMPRESS:
+            return cls(raw, tag)
+        return cls(
+            raw,
+            tag,
+            gzip=gzip.compress(raw, GZIP_LEVEL, mtime=0),
+            br=brotli.compress(raw, quality=BROTLI_QUALITY) if brotli is not None else None,
+        )
+
+    def encoded(self, accept_encoding: str) -> Tuple[Optional[str], bytes]:
+        """(Content-Encoding, bytes) for a request's Accept-Encoding, preferring brotli over gzip"""
+        accepted = accepted_encodings(accept_encoding)
+        if self.br is not None and 'br' in accepted:
+            return 'br', self.br
+        if self.gzip is not None and 'gzip' in accepted:
+            return 'gzip', self.gzip
+        return None, self.raw
+
+
+def accepted_encodings(header: Optional[str]) -> Set[str]:
+    """Codings an Accept-Encoding header allows, leaving out those given `q=0`"""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and _quality(params) != 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _quality(params: str) -> float:
+    """The `q` of a coding's parameters; one that is missing or cannot be read counts as 1"""
+    for param in params.split(';'):
+        name, _, value = param.strip().partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                return float(value)
+            except ValueError:
+                return 1.0
+    return 1.0
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(',', ':'), default=str).encode()
+
+
+def race_path(race_id: int) -> str:
+    return f'/races/{race_id}'
+
+
+def county_path(name: str) -> str:
+    return f'/counties/{quote(name.upper())}'
+
+
+def county_rows(version_no: SQLModel) -> Dict[str, list]:
+    """`RACE_COLUMNS` rows of each county, grouped in one pass over the races"""
+    rows = defaultdict(list)
+    for row in metrics.timed('flatten', version_no.iter_races(), output='races'):
+        rows[row[_COUNTY]].append(dict(zip(base.RACE_COLUMNS, row)))
+    return rows
+
+
+def version_bodies(version_no: SQLModel) -> Dict[str, bytes]:
+    """Serialized JSON of every path for one `ResultVersionNumberPublic`"""
+    bodies = {
+        '/statewide': version_no.model_dump_json(
+            include={'version_id', 'election_id', 'election_date', 'updated_at', 'statewide'}, exclude_none=True
+        ).encode(),
+    }
+    for race in version_no.races:
+        # The totals are only summed from the counties when read through a computed field, which the dump
+        # does after the fields themselves; without this the first dump of a race has them all at 0
+        race.update_counts()
+        bodies[race_path(race.race_id)] = race.model_dump_json(exclude_none=True).encode()
+    _rows = county_rows(version_no)
+    for name, county in version_no.county.items():
+        bodies[county_path(name)] = b''.join([
+            b'{"county":', county.model_dump_json(exclude_none=True).encode(),
+            b',"results":', _dumps(_rows.get(county.name, [])), b'}',
+        ])
+    bodies['/'] = _dumps({
+        'version_id': version_no.version_id,
+        'election_id': version_no.election_id,
+        'election_date': version_no.election_date,
+        'updated_at': version_no.updated_at,
+        'statewide': '/statewide',
+        'races': {str(x.race_id): race_path(x.race_id) for x in version_no.races},
+        'counties': {x: county_path(x) for x in version_no.county},
+    })
+    return bodies
+
+
+@dataclass
+class ResultAPI:
+    """
+    Prebuilt responses for the latest published version.
+
+    `publish` builds every body of a new version, compressing only those whose JSON changed since the last
+    one, then swaps the whole set in at once; requests in flight keep reading the set they started with.
+    `sink` makes it a pipeline or daemon sink, so each built version is published as it is written.
+    """
+    bodies: Dict[str, Body] = field(default_factory=dict)
+    version_id: Optional[int] = None
+
+    def publish(self, version_no: SQLModel) -> int:
+        """Serve `version_no` from now on, returning how many bodies had to be compressed"""
+        with metrics.span('publish'):
+            _previous = {x.etag: x for x in self.bodies.values()}
+            bodies = {}
+            compressed = 0
+            for path, raw in version_bodies(version_no).items():
+                _tag = etag(raw)
+                if _tag in _previous:
+                    bodies[path] = _previous[_tag]
+                else:
+                    bodies[path] = Body.of(raw, _tag)
+                    compressed += 1
+            self.bodies, self.version_id = bodies, version_no.version_id
+        metrics.count('bodies_compressed', compressed)
+        logger.info("Serving version %s: %s bodies, %s compressed", self.version_id, len(bodies), compressed)
+        return compressed
+
+    def sink(self, ticker) -> Callable[[SQLModel], int]:
+        """A `pipeline.SinkFactory`; the API must live in the process that builds, so not with `processes=True`"""
+        return self.publish
+
+    def get(self, path: str) -> Optional[Body]:
+        path = unquote(urlsplit(path).path).rstrip('/') or '/'
+        if path.startswith('/counties/'):
+            path = county_path(path.removeprefix('/counties/'))
+        return self.bodies.get(path)
+
+    def server(self, host: str = '127.0.0.1', port: int = 8000) -> ThreadingHTTPServer:
+        handler = type('Handler', (ResultHandler,), {'api': self})
+        return ThreadingHTTPServer((host, port), handler)
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8000) -> ThreadingHTTPServer:
+        """Start serving on a background thread; stop it with `shutdown()` on the returned server"""
+        _server = self.server(host, port)
+        Thread(target=_server.serve_forever, name='api', daemon=True).start()
+        logger.info("Serving results on http://%s:%s/", *_server.server_address[:2])
+        return _server
+
+
+_NOT_FOUND = Body.of(_dumps({'error': 'not found'}))
+_NOT_READY = Body.of(_dumps({'error': 'no version published yet'}))
+
+
+class ResultHandler(BaseHTTPRequestHandler):
+    api: ResultAPI
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status: HTTPStatus, body: Body, head: bool = False) -> None:
+        encoding, content = body.encoded(self.headers.get('Accept-Encoding'))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Vary', 'Accept-Encoding')
+        if status == HTTPStatus.OK:
+            self.send_header('ETag', body.etag)
+            # Clients may keep a copy but must revalidate it on every poll
+            self.send_header('Cache-Control', 'no-cache')
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(content)
+
+    def _not_modified(self, body: Body) -> bool:
+        _tags = self.headers.get('If-None-Match')
+        if _tags is None:
+            return False
+        return _tags.strip() == '*' or body.etag in (x.strip().removeprefix('W/') for x in _tags.split(','))
+
+    def do_GET(self, head: bool = False) -> None:
+        if self.api.version_id is None:
+            return self._send(HTTPStatus.SERVICE_UNAVAILABLE, _NOT_READY, head)
+        body = self.api.get(self.path)
+        if body is None:
+            return self._send(HTTPStatus.NOT_FOUND, _NOT_FOUND, head)
+        if self._not_modified(body):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', body.etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        self._send(HTTPStatus.OK, body, head)
+
+    def do_HEAD(self) -> None:
+        self.do_GET(head=True)
+
+    def log_message(self, format: str, *args) -> None:
+        # One line per request would flood the log with thousands of pollers
+        logger.debug(format, *args)
@@ -0,0 +1,450 @@
+"""
+Fetch, build and export election results: `tx-results <command> [election ids] [options]`.
+
+    tx-results fetch 49664 --output recordings/
+    tx-results build 49664 --replay recordings/ --profile cpu
+    tx-results export 49664 49681 --format csv,parquet,db --workers 2 --cache recordings/
+    tx-results watch 49664 --interval 30 --until 03:00 --format csv,db --metrics metrics/
+    tx-results watch 49664 --serve 8080
+
+Only the standard library is imported up front; each command imports the modules it needs, so `--help`
+and argument errors return at once.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from pathlib import Path
+from functools import partial
+import argparse
+import logging
+import sys
+
+
+PACKAGE_DIR = Path(__file__).parent
+# The package modules import each other as top-level modules (`from utils import db`), as when run from their
+# directory; set this at import so sink worker processes can load them too
+if str(PACKAGE_DIR) not in sys.path:
+    sys.path.insert(0, str(PACKAGE_DIR))
+
+FORMATS = (
+    'csv', 'parquet', 'arrow', 'delta', 'json', 'snapshot', 'indexed', 'cube', 'sparse', 'db', 'endorsements',
+    'timeseries'
+)
+DEFAULT_OUTPUT = PACKAGE_DIR / 'data'
+
+logger = logging.getLogger('texas_result_scraper')
+
+
+def _formats(value: str) -> List[str]:
+    formats = [x.strip() for x in value.split(',') if x.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown format {', '.join(sorted(unknown))}; choose from {', '.join(FORMATS)}")
+    return formats
+
+
+def output_sink(
+        ticker,
+        formats: Sequence[str],
+        directory: Path,
+        db_url: Optional[str] = None,
+        endorsements: Optional[Path] = None) -> Callable:
+    """
+    A pipeline sink writing each version in `formats`; outputs of one election share a manifest, cube, DB writer,
+    endorsement join and vote history.
+    """
+    from texas_result_scraper.flat_file import GitHubFile
+    from texas_result_scraper.cube import ResultCube
+    from texas_result_scraper.sparse import SparseResultMatrix
+    from texas_result_scraper.pipeline import db_sink, timeseries_sink
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    output = GitHubFile(ticker, directory=directory)
+    cube = ResultCube() if {'cube', 'sparse'} & set(formats) else None
+    to_db = db_sink(ticker, db_url) if 'db' in formats else None
+    history = timeseries_sink(ticker, directory) if 'timeseries' in formats else None
+    endorsed = None
+    if 'endorsements' in formats:
+        from texas_result_scraper.endorsements import EndorsementIndex
+        endorsed = EndorsementIndex.from_csv(endorsements)
+
+    def write(version_no) -> GitHubFile:
+        output.use(version_no)
+        if 'csv' in formats:
+            output.create_csv_files()
+        if 'parquet' in formats:
+            output.create_parquet_files()
+        if 'arrow' in formats:
+            output.create_parquet_files(arrow=True)
+        if 'delta' in formats:
+            output.create_delta_files()
+        if 'json' in formats:
+            output.write()
+        if 'snapshot' in formats:
+            output.write_snapshot()
+        if 'indexed' in formats:
+            output.write_indexed_snapshot()
+        if cube is not None:
+            cube.update(version_no)
+            if 'cube' in formats:
+                cube.to_json(output._set_file_name('cube', 'json'))
+            if 'sparse' in formats:
+                SparseResultMatrix.from_cube(cube).save(output._set_file_name('cube', 'npz'))
+        if to_db is not None:
+            to_db(version_no)
+        if endorsed is not None:
+            endorsed.join(version_no).to_csv(output._set_file_name('endorsements', 'csv'), index=False)
+        if history is not None:
+            history(version_no)
+        return output
+    return write
+
+
+def summary_sink(ticker) -> Callable:
+    """A pipeline sink printing what each built version holds"""
+    def write(version_no) -> None:
+        _results = sum(len(x.county_results) for race in version_no.races for x in race.candidates)
+        print(
+            f'{ticker.election_id}\t{version_no.version_id}\tcounties={len(version_no.county)}'
+            f'\traces={len(version_no.races)}\tresults={_results}\tstatewide={len(version_no.statewide)}'
+        )
+    return write
+
+
+def payloads(args: argparse.Namespace, election_id: int, ticker) -> Iterator[Dict[str, Any]]:
+    """
+    Payloads of each requested version, oldest first: from `--replay` recordings, else from the `--cache`
+    directory when a version was fetched before, else fetched and, with `--cache`, saved there.
+    """
+    from texas_result_scraper import recording
+
+    if args.replay is not None:
+        if recording.is_recording(args.replay):
+            yield recording.payload(recording.load(args.replay))
+            return
+        found = list(recording.find(args.replay, [election_id], args.versions))
+        if not found:
+            logger.warning("No recordings for election %s in %s", election_id, args.replay)
+        for _, _, path in found:
+            yield recording.payload(recording.load(path))
+        return
+
+    from texas_result_scraper.pipeline import fetch_payload
+
+    newest = ticker.fetch_version()
+    for version_id in args.versions or [newest['___versionNo']]:
+        cached = recording.recording_dir(args.cache, election_id, version_id) if args.cache else None
+        if cached is not None and recording.is_recording(cached):
+            logger.info("Election %s version %s from cache", election_id, version_id)
+            yield recording.payload(recording.load(cached))
+            continue
+        payload = fetch_payload(ticker, {**newest, '___versionNo': version_id})
+        if cached is not None:
+            recording.save(cached, recording.responses(payload))
+        yield payload
+
+
+def _ticker(election_id: int):
+    from texas_result_scraper.scraper import ElectionResultTicker
+    return ElectionResultTicker(election_id=election_id).create_file()
+
+
+def _profile_memory(args: argparse.Namespace, election_id: int, sink_factory: Callable) -> List[int]:
+    """Build and write one version at a time, saving a memory report per version beside its outputs"""
+    from texas_result_scraper.memory import MemoryProfiler, profiling_spans
+
+    ticker = _ticker(election_id)
+    sink = sink_factory(ticker)
+    built = []
+    for payload in payloads(args, election_id, ticker):
+        with profiling_spans(), MemoryProfiler(top=args.top) as profiler:
+            ticker.load_raw(payload['version'], payload['county'], payload['statewide']).create_models()
+            sink(ticker.version_no)
+        args.output.mkdir(parents=True, exist_ok=True)
+        _path = profiler.write(args.output / f'tx-{election_id}-{ticker.version_no.version_id}-memory.json')
+        logger.info("Memory report %s", _path)
+        built.append(ticker.version_no.version_id)
+    return built
+
+
+def _process(
+        args: argparse.Namespace,
+        election_id: int,
+        sink_factory: Callable,
+        sinks: Optional[Dict[str, Callable]] = None) -> List[int]:
+    """
+    Run every requested version of one election through the pipeline, returning the versions built.
+    `sinks` are further named sink factories run beside the outputs.
+    """
+    if args.profile == 'memory':
+        return _profile_memory(args, election_id, sink_factory)
+
+    from texas_result_scraper.pipeline import ResultPipeline
+
+    ticker = _ticker(election_id)
+    pipeline = ResultPipeline(ticker, {'outputs': sink_factory, **(sinks or {})}, processes=args.processes)
+    return pipeline.run(payloads(args, election_id, ticker))
+
+
+def _election_ids(args: argparse.Namespace) -> List[int]:
+    """The election ids given, or with `--replay` and none given, those recorded"""
+    if args.election_ids or args.replay is None:
+        return args.election_ids
+
+    from texas_result_scraper import recording
+
+    if recording.is_recording(args.replay):
+        return [x[0] for x in [recording.ids(args.replay)] if x]
+    return sorted({x for x, _, _ in recording.find(args.replay)})
+
+
+def _enable_metrics(args: argparse.Namespace, election_id: Optional[int] = None) -> None:
+    """Metrics to the log and to `--metrics`; per-election files, labelled by election, when given an id"""
+    from texas_result_scraper.instrumentation import metrics, json_sink, log_sink, prometheus_sink
+
+    _suffix = '' if election_id is None else f'-{election_id}'
+    args.metrics.mkdir(parents=True, exist_ok=True)
+    metrics.enable(
+        log_sink(),
+        json_sink(args.metrics / f'metrics{_suffix}.json'),
+        prometheus_sink(
+            args.metrics / f'metrics{_suffix}.prom',
+            labels={} if election_id is None else {'election': str(election_id)}
+        ),
+    )
+
+
+def _flush_metrics() -> None:
+    from texas_result_scraper.instrumentation import metrics
+    metrics.flush()
+
+
+def _in_worker(args: argparse.Namespace, func: Callable[[argparse.Namespace, int], Any], election_id: int) -> Any:
+    if args.metrics is not None:
+        _enable_metrics(args, election_id)
+    try:
+        return func(args, election_id)
+    finally:
+        if args.metrics is not None:
+            _flush_metrics()
+
+
+def _each_election(args: argparse.Namespace, func: Callable[[argparse.Namespace, int], Any]) -> Dict[int, Any]:
+    """
+    `func(args, election_id)` for each election. With `--workers` above one, elections run in that many
+    processes: building is CPU bound, and the model classes are not safe to first use from several threads.
+    Profiling runs elections one at a time in this process.
+    """
+    election_ids = _election_ids(args)
+    if not election_ids:
+        raise SystemExit("No election ids given")
+    if args.workers <= 1 or len(election_ids) == 1 or args.profile is not None:
+        if args.metrics is not None:
+            _enable_metrics(args)
+        try:
+            return {x: func(args, x) for x in election_ids}
+        finally:
+            if args.metrics is not None:
+                _flush_metrics()
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(election_ids))) as pool:
+        return dict(zip(election_ids, pool.map(partial(_in_worker, args, func), election_ids)))
+
+
+def _export_sink(args: argparse.Namespace) -> Callable:
+    return partial(
+        output_sink, formats=args.format, directory=args.output, db_url=args.db_url, endorsements=args.endorsements
+    )
+
+
+def fetch_election(args: argparse.Namespace, election_id: int) -> List[Path]:
+    from texas_result_scraper import recording
+
+    saved = []
+    for payload in payloads(args, election_id, _ticker(election_id)):
+        _path = recording.recording_dir(args.output, election_id, payload['version']['___versionNo'])
+        saved.append(recording.save(_path, recording.responses(payload)))
+        print(_path)
+    return saved
+
+
+def build_election(args: argparse.Namespace, election_id: int) -> List[int]:
+    return _process(args, election_id, summary_sink)
+
+
+def export_election(args: argparse.Namespace, election_id: int) -> List[int]:
+    return _process(args, election_id, _export_sink(args))
+
+
+def cmd_fetch(args: argparse.Namespace) -> int:
+    _each_election(args, fetch_election)
+    return 0
+
+
+def cmd_build(args: argparse.Namespace) -> int:
+    _each_election(args, build_election)
+    return 0
+
+
+def _create_tables(args: argparse.Namespace) -> None:
+    """Migrate the database once, before election workers each open a writer on it"""
+    from texas_result_scraper.scraper import db
+    from texas_result_scraper.db_writer import migrate
+
+    settings = db.DBSettings.load() if args.db_url is None else db.DBSettings(url=args.db_url)
+    migrate(db.create_db_engine(settings))
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    args.output.mkdir(parents=True, exist_ok=True)
+    if 'db' in args.format:
+        _create_tables(args)
+    for election_id, versions in _each_election(args, export_election).items():
+        logger.info("Election %s: exported versions %s", election_id, versions)
+    return 0
+
+
+def _address(value: str) -> Tuple[str, int]:
+    """`PORT` or `HOST:PORT`; the host defaults to localhost"""
+    host, _, port = value.rpartition(':')
+    try:
+        return host or '127.0.0.1', int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected PORT or HOST:PORT, got {value!r}")
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    if len(args.election_ids) != 1:
+        raise SystemExit("watch follows exactly one election id")
+    if args.metrics is not None:
+        _enable_metrics(args)
+
+    sinks, server = {}, None
+    if args.serve is not None:
+        from texas_result_scraper.api import ResultAPI
+
+        api = ResultAPI()
+        server = api.serve(*args.serve)
+        sinks['api'] = api.sink
+    try:
+        if args.replay is not None:
+            # Recorded versions stand in for a night of polls
+            _process(args, args.election_ids[0], _export_sink(args), sinks)
+            if server is not None:
+                logger.warning("Serving the last recorded version on port %s until interrupted", args.serve[1])
+                _wait()
+            return 0
+
+        from texas_result_scraper.daemon import ResultDaemon, parse_until
+
+        daemon = ResultDaemon(
+            _ticker(args.election_ids[0]),
+            {'outputs': _export_sink(args), **sinks},
+            interval=args.interval,
+            until=parse_until(args.until) if args.until else None,
+            processes=args.processes,
+        )
+        daemon.run()
+        return 0
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def _wait() -> None:
+    from threading import Event
+
+    try:
+        Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+def parser() -> argparse.ArgumentParser:
+    _parser = argparse.ArgumentParser(
+        prog='tx-results', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    _parser.add_argument('-v', '--verbose', action='count', default=0, help="-v for progress, -vv for debug logs")
+    commands = _parser.add_subparsers(dest='command', required=True)
+
+    source = argparse.ArgumentParser(add_help=False)
+    source.add_argument('election_ids', type=int, nargs='*', metavar='ELECTION_ID')
+    source.add_argument(
+        '--version-id', dest='versions', type=int, action='append', metavar='VERSION_ID',
+        help="a version to process instead of the newest; repeat for several"
+    )
+    source.add_argument('--replay', type=Path, metavar='DIR', help="read recorded payloads instead of fetching")
+    source.add_argument('--cache', type=Path, metavar='DIR', help="reuse and save fetched payloads as recordings")
+    source.add_argument('--workers', type=int, default=1, help="elections processed at once")
+
+    run = argparse.ArgumentParser(add_help=False)
+    run.add_argument('--processes', action='store_true', help="write outputs in worker processes")
+    run.add_argument('--profile', choices=('cpu', 'memory'), help="save a cProfile or per-version memory report")
+    run.add_argument('--top', type=int, default=10, help="allocation sites per stage in memory reports")
+    run.add_argument(
+        '--metrics', type=Path, metavar='DIR',
+        help="write metrics.json and metrics.prom here, or metrics-<election>.* from each of several --workers"
+    )
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('--format', type=_formats, default=['csv'], help=f"comma separated: {', '.join(FORMATS)}")
+    output.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, metavar='DIR')
+    output.add_argument('--db-url', help="database for the db format, by default the configured one")
+    output.add_argument('--endorsements', type=Path, metavar='CSV', help="endorsement sheet for the endorsements format")
+
+    _fetch = commands.add_parser('fetch', parents=[source], help="save payloads as recordings")
+    _fetch.add_argument('--output', type=Path, default=Path('recordings'), metavar='DIR')
+    _fetch.set_defaults(func=cmd_fetch, profile=None, metrics=None)
+
+    _build = commands.add_parser('build', parents=[source, run], help="build models and print their sizes")
+    _build.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, metavar='DIR', help="where reports go")
+    _build.set_defaults(func=cmd_build)
+
+    _export = commands.add_parser('export', parents=[source, run, output], help="build and write outputs")
+    _export.set_defaults(func=cmd_export)
+
+    _watch = commands.add_parser('watch', parents=[source, run, output], help="poll one election for new versions")
+    _watch.add_argument('--interval', type=float, default=60.0, help="seconds between polls")
+    _watch.add_argument('--until', help="stop at an ISO datetime or the next HH:MM")
+    _watch.add_argument(
+        '--serve', type=_address, metavar='[HOST:]PORT', help="serve the latest version as a local JSON API"
+    )
+    _watch.set_defaults(func=cmd_watch)
+    return _parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    _parser = parser()
+    args = _parser.parse_args(argv)
+    if 'endorsements' in getattr(args, 'format', ()) and args.endorsements is None:
+        _parser.error("the endorsements format needs --endorsements CSV")
+    if getattr(args, 'serve', None) is not None and args.processes:
+        _parser.error("--serve publishes from this process and cannot be combined with --processes")
+    logging.basicConfig(
+        level=(logging.WARNING, logging.INFO, logging.DEBUG)[min(args.verbose, 2)],
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    if args.profile == 'cpu':
+        return _profile_cpu(args)
+    return args.func(args)
+
+
+def _profile_cpu(args: argparse.Namespace) -> int:
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(args.func, args)
+    finally:
+        args.output.mkdir(parents=True, exist_ok=True)
+        _path = args.output / f'tx-results-{args.command}.prof'
+        profiler.dump_stats(_path)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+        logger.warning("CPU profile %s", _path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
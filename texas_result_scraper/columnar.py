@@ -0,0 +1,113 @@
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple, Dict, Callable
+from itertools import islice
+from time import perf_counter
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.ipc as ipc
+
+
+BATCH_SIZE = 65_536
+COMPRESSION = 'zstd'
+
+_label = pa.dictionary(pa.int32(), pa.string())
+
+RACE_SCHEMA = pa.schema([
+    ('office', _label),
+    ('office_type', _label),
+    ('office_district', _label),
+    ('candidate', _label),
+    ('party', _label),
+    ('county', _label),
+    ('early_votes', pa.int32()),
+    ('election_day_votes', pa.int32()),
+    ('total_votes', pa.int32()),
+    ('percent_votes', pa.float64()),
+])
+
+COUNTY_SCHEMA = pa.schema([
+    ('county_name', pa.string()),
+    ('precincts_reporting', pa.int32()),
+    ('total_precincts', pa.int32()),
+    ('percent_reporting', pa.float64()),
+    ('registered_voters', pa.int32()),
+    ('voted_counted', pa.int32()),
+    ('turnout_percent', pa.float64()),
+    ('poll_locations', pa.int32()),
+    ('poll_locations_reporting', pa.int32()),
+    ('poll_locations_percent', pa.float64()),
+])
+
+STATEWIDE_TOTAL_SCHEMA = pa.schema([
+    ('office', _label),
+    ('candidate', pa.string()),
+    ('party', _label),
+    ('early_votes', pa.int64()),
+    ('election_day_votes', pa.int64()),
+    ('total_votes', pa.int64()),
+    ('percent', pa.float64()),
+    ('winner_margin', pa.int64()),
+])
+
+SCHEMAS = {
+    'race-results': RACE_SCHEMA,
+    'county-results': COUNTY_SCHEMA,
+    'statewide-results': STATEWIDE_TOTAL_SCHEMA,
+}
+
+
+def record_batches(schema: pa.Schema, rows: Iterable[Tuple], batch_size: int = BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    """Group fixed-width row tuples into typed record batches of at most `batch_size` rows"""
+    rows = iter(rows)
+    while chunk := list(islice(rows, batch_size)):
+        columns = zip(*chunk)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=f.type) for f, values in zip(schema, columns)],
+            schema=schema
+        )
+
+
+def write_parquet(path: Path, schema: pa.Schema, rows: Iterable[Tuple], compression: str = COMPRESSION) -> Path:
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for batch in record_batches(schema, rows):
+            writer.write_batch(batch)
+    return path
+
+
+def write_arrow(path: Path, schema: pa.Schema, rows: Iterable[Tuple], compression: str = COMPRESSION) -> Path:
+    options = ipc.IpcWriteOptions(compression=compression)
+    with ipc.new_file(path, schema, options=options) as writer:
+        for batch in record_batches(schema, rows):
+            writer.write_batch(batch)
+    return path
+
+
+# How downstream consumers load each output into a DataFrame
+READERS: Dict[str, Callable[[Path], pd.DataFrame]] = {
+    'csv': pd.read_csv,
+    'parquet': pd.read_parquet,
+    'arrow': pd.read_feather,
+}
+
+
+def compare_formats(*paths: Path, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    File size and best-of-`repeat` read time for the same output written in different formats.
+    Pass the `.csv`, `.parquet` and/or `.arrow` files written for one version.
+    """
+    results = {}
+    for path in paths:
+        reader = READERS[path.suffix.lstrip('.')]
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            frame = reader(path)
+            timings.append(perf_counter() - start)
+        results[path.name] = {
+            'bytes': path.stat().st_size,
+            'rows': len(frame),
+            'read_seconds': min(timings),
+        }
+    return results
@@ -0,0 +1,131 @@
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from collections import defaultdict
+import json
+
+import pandas as pd
+from sqlmodel import SQLModel
+
+
+INDEX = ('office_type', 'office', 'candidate', 'party')
+MARGIN = 'All'
+MARGIN_ROW = (MARGIN, '', '', '')
+
+Row = Tuple[str, str, str, str]
+
+
+def version_cells(version_no: SQLModel) -> Dict[str, Dict[Row, int]]:
+    """
+    Total votes per (office_type, office, candidate, party) row for each county, read straight off the race
+    models. Rows with a missing value are left out, as crosstab drops them.
+    """
+    cells: Dict[str, Dict[Row, int]] = defaultdict(dict)
+    for race in version_no.races:
+        for candidate in race.candidates:
+            key = (race.office_type, race.office, candidate.full_name, candidate.party)
+            if None in key:
+                continue
+            for result in candidate.county_results:
+                _county = cells[result.county]
+                _county[key] = _county.get(key, 0) + result.total_votes
+    return cells
+
+
+@dataclass
+class ResultCube:
+    """
+    Candidate x county vote totals kept up to date across versions, replacing the `pd.crosstab` in `main.py`.
+
+    Every version is a new set of models, so its county results are read once into cells. Only the cells
+    that differ from the previous version are then applied, and row, county, grand and office_type x county
+    totals are adjusted by their differences instead of being re-summed.
+    """
+    by_county: Dict[str, Dict[Row, int]] = field(default_factory=dict)
+    row_totals: Dict[Row, int] = field(default_factory=dict)
+    row_counties: Dict[Row, int] = field(default_factory=dict)
+    county_totals: Dict[str, int] = field(default_factory=dict)
+    office_type_totals: Dict[str, Dict[str, int]] = field(default_factory=lambda: defaultdict(dict))
+    total: int = 0
+    version_id: Optional[int] = None
+
+    def _apply(self, county: str, old: Dict[Row, int], new: Dict[Row, int]) -> int:
+        """Move the margins from one county's `old` cells to its `new` ones, returning how many cells differed"""
+        changed = 0
+        for row in old.keys() | new.keys():
+            votes = new.get(row, 0) - old.get(row, 0)
+            # Rows enter and leave with the counties reporting them, like they would in crosstab
+            present = (row in new) - (row in old)
+            if not votes and not present:
+                continue
+            changed += 1
+            self.row_counties[row] = self.row_counties.get(row, 0) + present
+            self.row_totals[row] = self.row_totals.get(row, 0) + votes
+            if not self.row_counties[row]:
+                del self.row_totals[row], self.row_counties[row]
+            _office_type = self.office_type_totals[row[0]]
+            _office_type[county] = _office_type.get(county, 0) + votes
+            if present < 0 and not any(x[0] == row[0] for x in new):
+                del _office_type[county]
+            self.total += votes
+        if new:
+            self.county_totals[county] = self.county_totals.get(county, 0) + sum(new.values()) - sum(old.values())
+        else:
+            self.county_totals.pop(county, None)
+        return changed
+
+    def update(self, version_no: SQLModel) -> Set[str]:
+        """Bring the cube up to `version_no` and return the counties whose cells changed"""
+        incoming = version_cells(version_no)
+        changed = set()
+        for county in incoming.keys() | self.by_county.keys():
+            _new = incoming.get(county, {})
+            if _new == self.by_county.get(county):
+                continue
+            if self._apply(county, self.by_county.get(county, {}), _new):
+                changed.add(county)
+            if _new:
+                self.by_county[county] = _new
+            else:
+                self.by_county.pop(county, None)
+        self.version_id = version_no.version_id
+        return changed
+
+    def rollup(self, level: str = 'office_type') -> Dict[str, Dict[str, int]]:
+        """Votes per county summed to `office_type`, with an `All` entry per office_type"""
+        if level != 'office_type':
+            raise ValueError(f"Unsupported rollup level: {level}")
+        return {
+            k: {**dict(sorted(v.items())), MARGIN: sum(v.values())}
+            for k, v in sorted(self.office_type_totals.items()) if v
+        }
+
+    def to_frame(self, margins: bool = True) -> pd.DataFrame:
+        """The dense crosstab view, as `pd.crosstab(..., margins=True)` would have produced it"""
+        rows = sorted(self.row_totals)
+        counties = sorted(self.by_county)
+        frame = pd.DataFrame(
+            [[self.by_county[c].get(r) for c in counties] for r in rows],
+            index=pd.MultiIndex.from_tuples(rows, names=INDEX),
+            columns=pd.Index(counties, name='county'),
+            dtype='float64',
+        )
+        if margins:
+            frame[MARGIN] = [self.row_totals[r] for r in rows]
+            frame.loc[MARGIN_ROW, :] = [float(self.county_totals[c]) for c in counties] + [self.total]
+            frame[MARGIN] = frame[MARGIN].astype('int64')
+        return frame
+
+    def to_json(self, path: Path) -> Path:
+        """Write the same `{county: {"(office_type, office, candidate, party)": votes}}` layout as `DataFrame.to_json`"""
+        rows = sorted(self.row_totals)
+        _keys = [str(r) for r in rows] + [str(MARGIN_ROW)]
+        output = {}
+        for county in sorted(self.by_county):
+            cells = self.by_county[county]
+            values = [float(cells[r]) if r in cells else None for r in rows]
+            output[county] = dict(zip(_keys, values + [float(self.county_totals[county])]))
+        output[MARGIN] = dict(zip(_keys, [self.row_totals[r] for r in rows] + [self.total]))
+        with open(path, 'w') as f:
+            json.dump(output, f, separators=(',', ':'))
+        return path
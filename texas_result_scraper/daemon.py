@@ -0,0 +1,105 @@
+from typing import Dict, Iterator, List, Optional, Set
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from time import monotonic
+import logging
+import signal
+import threading
+
+from texas_result_scraper.scraper import ElectionResultTicker
+from texas_result_scraper.pipeline import Payload, ResultPipeline, SinkFactory, fetch_payload
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_until(value: str, now: Optional[datetime] = None) -> datetime:
+    """An ISO datetime, or a wall-clock time such as `03:00` meaning its next occurrence"""
+    now = now or datetime.now()
+    try:
+        _time = time.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+    until = datetime.combine(now.date(), _time)
+    return until if until > now else until + timedelta(days=1)
+
+
+@dataclass
+class ResultDaemon:
+    """
+    Poll for new versions in one long-running process instead of a cold start per run.
+
+    The ticker, its HTTP session and winner cache, and every sink (the output manifest, the DB writer's
+    stored rows) stay in memory between polls. A poll that finds no new version costs one small request;
+    a new version is built and only its changes are written.
+
+    `last_version` only moves once a version has been built and every sink has written it. A version whose
+    build or any sink failed is logged as soon as it fails and fetched again on the next poll.
+    """
+    ticker: ElectionResultTicker
+    sinks: Dict[str, SinkFactory]
+    interval: float = 60.0
+    until: Optional[datetime] = None
+    processes: bool = False
+    last_version: Optional[int] = None
+    polls: int = 0
+    processed: List[int] = field(default_factory=list)
+    failures: Dict[int, List[str]] = field(default_factory=dict)
+    pipeline: Optional[ResultPipeline] = field(default=None, repr=False)
+    _in_flight: Set[int] = field(default_factory=set, repr=False)
+    _stop: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def stop(self, *_) -> None:
+        self._stop.set()
+
+    @property
+    def finished(self) -> bool:
+        return self._stop.is_set() or (self.until is not None and datetime.now(self.until.tzinfo) >= self.until)
+
+    def version_done(self, version_id: int, errors: List[str]) -> None:
+        """`ResultPipeline.on_version`: move on from a version only once it was written everywhere"""
+        self._in_flight.discard(version_id)
+        if errors:
+            self.failures[version_id] = errors
+            logger.error("Version %s failed, retrying on the next poll: %s", version_id, '; '.join(errors))
+            return
+        self.failures.pop(version_id, None)
+        self.processed.append(version_id)
+        self.last_version = version_id
+
+    def new_versions(self) -> Iterator[Payload]:
+        """Payloads for each version not seen before, checking every `interval` seconds until stopped"""
+        while not self.finished:
+            _start = monotonic()
+            self.polls += 1
+            payload = None
+            try:
+                version = self.ticker.fetch_version()
+                _version_id = version['___versionNo']
+                if _version_id != self.last_version and _version_id not in self._in_flight:
+                    payload = fetch_payload(self.ticker, version)
+                    self._in_flight.add(_version_id)
+            except Exception as e:
+                # A failed request is retried on the next poll rather than ending the run
+                logger.warning("Poll %s failed: %s", self.polls, e)
+            if payload is not None:
+                logger.info("Version %s found on poll %s", payload['version']['___versionNo'], self.polls)
+                yield payload
+            self._stop.wait(max(0.0, self.interval - (monotonic() - _start)))
+
+    def run(self) -> List[int]:
+        """
+        Run until `until` or a SIGINT/SIGTERM, returning the version ids written. The first error is raised at
+        the end only if a version that failed was not written on a later poll.
+        """
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        self.pipeline = ResultPipeline(self.ticker, self.sinks, processes=self.processes, on_version=self.version_done)
+        try:
+            self.pipeline.run(self.new_versions())
+        except Exception:
+            if self.failures:
+                raise
+            logger.warning("Every failed version was written on a later poll")
+        return self.processed
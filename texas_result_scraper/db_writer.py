@@ -0,0 +1,448 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+import csv
+import io
+
+from sqlalchemy import (
+    MetaData, Table, Column, Index, Integer, Float, String, Boolean, Date, Engine, Connection, insert, text, select,
+    and_, bindparam, inspect, func, case, literal
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import SQLModel
+from pydantic_extra_types.color import Color
+
+
+# Current results for each election, one row per natural key. `version_id` is the version that last wrote the row.
+metadata = MetaData()
+
+versions = Table(
+    'resultversionnumber', metadata,
+    # Version numbers are only unique within an election
+    Column('election_id', Integer, primary_key=True),
+    Column('version_id', Integer, primary_key=True),
+    Column('election_date', Date),
+)
+
+county_summaries = Table(
+    'countysummary', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('county_name', String, primary_key=True),
+    Column('precincts_reporting', Integer),
+    Column('total_precincts', Integer),
+    Column('percent_reporting', Float),
+    Column('registered_voters', Integer),
+    Column('voted_counted', Integer),
+    Column('turnout_percent', Float),
+    Column('poll_locations', Integer),
+    Column('poll_locations_reporting', Integer),
+    Column('poll_locations_percent', Float),
+    Column('version_id', Integer, nullable=False),
+    Index('ix_countysummary_version', 'version_id'),
+)
+
+races = Table(
+    'racedetails', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('race_id', Integer, primary_key=True),
+    Column('office', String, nullable=False),
+    Column('office_type', String),
+    Column('office_district', String),
+    Column('total_votes', Integer),
+    Column('precincts_reporting', Integer),
+    Column('registered_voters', Integer),
+    Column('total_precincts', Integer),
+    Column('version_id', Integer, nullable=False),
+    Index('ix_racedetails_office', 'office_type', 'office_district'),
+)
+
+county_races = Table(
+    'countyracedetails', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('race_id', Integer, primary_key=True),
+    Column('county', String, primary_key=True),
+    Column('county_total_votes', Integer),
+    Column('county_ballot_order', Integer),
+    Column('county_precincts_reporting', Integer),
+    Column('county_registered_voters', Integer),
+    Column('county_precincts', Integer),
+    Column('version_id', Integer, nullable=False),
+    Index('ix_countyracedetails_county', 'county'),
+    Index('ix_countyracedetails_version', 'version_id'),
+)
+
+candidates = Table(
+    'candidatename', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('candidate_id', Integer, primary_key=True),
+    Column('race_id', Integer, nullable=False),
+    Column('full_name', String),
+    Column('first_name', String),
+    Column('last_name', String),
+    Column('incumbent', Boolean),
+    Column('party', String),
+    Column('version_id', Integer, nullable=False),
+    Index('ix_candidatename_race', 'race_id'),
+    Index('ix_candidatename_full_name', 'full_name'),
+)
+
+candidate_results = Table(
+    'candidatecountyresults', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('race_id', Integer, primary_key=True),
+    Column('candidate_id', Integer, primary_key=True),
+    Column('county', String, primary_key=True),
+    Column('early_votes', Integer),
+    Column('total_votes', Integer),
+    Column('percent', Float),
+    Column('color', String),
+    Column('ballot_order', Integer),
+    Column('version_id', Integer, nullable=False),
+    # The primary key is the (race, candidate, county) key; these cover lookups that start from the county or candidate
+    Index('ix_candidatecountyresults_county', 'county'),
+    Index('ix_candidatecountyresults_candidate', 'candidate_id'),
+    Index('ix_candidatecountyresults_version', 'version_id'),
+)
+
+statewide_offices = Table(
+    'statewideofficesummary', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('office_id', Integer, primary_key=True),
+    Column('name', String, nullable=False),
+    Column('office_type', String),
+    Column('office_district', String),
+    Column('winner', String),
+    Column('winner_party', String),
+    Column('winner_margin', Integer),
+    Column('winner_percent', Float),
+    Column('version_id', Integer, nullable=False),
+    Index('ix_statewideofficesummary_office_type', 'office_type'),
+    Index('ix_statewideofficesummary_version', 'version_id'),
+)
+
+statewide_candidates = Table(
+    'statewidecandidatesummary', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('office_id', Integer, primary_key=True),
+    Column('name', String, primary_key=True),
+    Column('first_name', String),
+    Column('last_name', String),
+    Column('incumbent', Boolean),
+    Column('party', String),
+    Column('color', String),
+    Column('total_votes', Integer),
+    Column('ballot_order', Integer),
+    Column('version_id', Integer, nullable=False),
+)
+
+# Parents before children, the order rows are loaded in
+RESULT_TABLES = (
+    versions, county_summaries, races, county_races, candidates, candidate_results,
+    statewide_offices, statewide_candidates,
+)
+
+# Aggregates kept in step with the result tables, for dashboards that would otherwise re-aggregate on every read
+result_counts = Table(
+    'result_counts', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('office_type', String, primary_key=True),
+    Column('republican_wins', Integer, nullable=False),
+    Column('democrat_wins', Integer, nullable=False),
+    Column('other_wins', Integer, nullable=False),
+    Column('version_id', Integer, nullable=False),
+)
+
+county_turnout = Table(
+    'county_turnout', metadata,
+    Column('election_id', Integer, primary_key=True),
+    Column('county_name', String, primary_key=True),
+    Column('registered_voters', Integer),
+    Column('voted_counted', Integer),
+    Column('turnout_percent', Float),
+    Column('precincts_reporting', Integer),
+    Column('total_precincts', Integer),
+    Column('version_id', Integer, nullable=False),
+)
+
+AGGREGATE_TABLES = (result_counts, county_turnout)
+
+# Indexes earlier releases declared that the primary keys now cover; `migrate` drops them
+RETIRED_INDEXES = {
+    versions: ('ix_resultversionnumber_election',),
+    candidate_results: ('ix_candidatecountyresults_race_county_candidate',),
+}
+
+REPUBLICAN = ('R', 'REP', 'REPUBLICAN')
+DEMOCRAT = ('D', 'DEM', 'DEMOCRAT')
+
+_COLUMNS = {x: tuple(c.name for c in x.columns) for x in RESULT_TABLES + AGGREGATE_TABLES}
+# Everything but the key and the version that wrote it; two rows with equal content need no write
+_CONTENT = {
+    x: tuple(c.name for c in x.columns if not c.primary_key and c.name != 'version_id') for x in RESULT_TABLES
+}
+_HEX: Dict[Any, str] = {}
+
+
+def _rekey_versions(engine: Engine) -> bool:
+    """Rebuild a `versions` table keyed on version_id alone with the declared key, keeping its rows"""
+    _declared = {x.name for x in versions.primary_key.columns}
+    if set(inspect(engine).get_pk_constraint(versions.name)['constrained_columns']) == _declared:
+        return False
+    with engine.begin() as conn:
+        # One row per version loaded, so the rows are simply held while the table is recreated
+        rows = [dict(x._mapping) for x in conn.execute(select(versions))]
+        versions.drop(conn)
+        versions.create(conn)
+        if rows:
+            conn.execute(insert(versions), _dedupe(versions, rows))
+    return True
+
+
+def migrate(engine: Engine) -> List[str]:
+    """
+    Create missing result tables, then any declared index an existing table lacks, and drop retired indexes.
+    Returns the names of the indexes that were added to existing tables.
+    """
+    existing = set(inspect(engine).get_table_names())
+    if versions.name in existing:
+        _rekey_versions(engine)
+    metadata.create_all(engine)
+    added = []
+    _inspector = inspect(engine)
+    for table in RESULT_TABLES + AGGREGATE_TABLES:
+        if table.name not in existing:
+            continue
+        _present = {x['name'] for x in _inspector.get_indexes(table.name)}
+        _retired = [x for x in RETIRED_INDEXES.get(table, ()) if x in _present]
+        if _retired:
+            with engine.begin() as conn:
+                for name in _retired:
+                    conn.execute(text(f'DROP INDEX {name}'))
+        for index in table.indexes:
+            if index.name not in _present:
+                index.create(engine)
+                added.append(index.name)
+    return added
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, Color):
+        # Every result carries its own Color; the handful of distinct inputs only need converting once
+        _original = value.original()
+        if _original not in _HEX:
+            _HEX[_original] = value.as_hex()
+        return _HEX[_original]
+    return value
+
+
+def _row(table: Table, obj: SQLModel, **values) -> Dict[str, Any]:
+    """A table row from the model attributes named like its columns, with `values` taking precedence"""
+    return {
+        x: values[x] if x in values else _value(getattr(obj, x, None))
+        for x in _COLUMNS[table]
+    }
+
+
+def table_rows(version_no: SQLModel) -> Dict[Table, List[Dict[str, Any]]]:
+    """Flatten a `ResultVersionNumber` tree into row batches for each of `RESULT_TABLES`"""
+    keys = {'election_id': version_no.election_id, 'version_id': version_no.version_id}
+    rows: Dict[Table, List[Dict[str, Any]]] = {x: [] for x in RESULT_TABLES}
+    rows[versions].append(_row(versions, version_no))
+    for county in version_no.county.values():
+        if county.summary is not None:
+            rows[county_summaries].append(_row(county_summaries, county.summary, **keys))
+    for race in version_no.races:
+        # Race totals are only summed from the counties on demand, so sum them before the row is taken
+        race.update_counts()
+        rows[races].append(_row(races, race, **keys))
+        for county in race.counties:
+            rows[county_races].append(_row(county_races, county, **keys))
+        for candidate in race.candidates:
+            rows[candidates].append(_row(candidates, candidate, race_id=race.race_id, **keys))
+            for result in candidate.county_results:
+                rows[candidate_results].append(_row(
+                    candidate_results, result, race_id=race.race_id, candidate_id=candidate.candidate_id, **keys
+                ))
+    for office in version_no.statewide.values():
+        rows[statewide_offices].append(_row(statewide_offices, office, **keys))
+        for candidate in office.candidates:
+            rows[statewide_candidates].append(_row(statewide_candidates, candidate, **keys))
+    return rows
+
+
+def _dedupe(table: Table, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep the last row per primary key; an upsert batch cannot touch the same key twice"""
+    _keys = [x.name for x in table.primary_key.columns]
+    return list({tuple(x[k] for k in _keys): x for x in rows}.values())
+
+
+def _upsert_sqlite(conn: Connection, table: Table, rows: List[Dict[str, Any]]) -> None:
+    stmt = sqlite_insert(table)
+    _keys = [x.name for x in table.primary_key.columns]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=_keys,
+        set_={x.name: stmt.excluded[x.name] for x in table.columns if x.name not in _keys},
+    )
+    conn.execute(stmt, rows)
+
+
+def _upsert_postgres(conn: Connection, table: Table, rows: List[Dict[str, Any]]) -> None:
+    """COPY the batch into a temporary table, then merge it with one INSERT ... ON CONFLICT"""
+    _columns = [x.name for x in table.columns]
+    _keys = [x.name for x in table.primary_key.columns]
+    _staging = f'_staging_{table.name}'
+    _names = ', '.join(_columns)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(tuple(x[k] for k in _columns) for x in rows)
+    buffer.seek(0)
+    conn.execute(text(f'CREATE TEMP TABLE IF NOT EXISTS {_staging} (LIKE {table.name}) ON COMMIT DROP'))
+    with conn.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {_staging} ({_names}) FROM STDIN WITH (FORMAT csv)', buffer)
+    _updates = ', '.join(f'{x} = EXCLUDED.{x}' for x in _columns if x not in _keys)
+    conn.execute(text(
+        f'INSERT INTO {table.name} ({_names}) SELECT {_names} FROM {_staging} '
+        f'ON CONFLICT ({", ".join(_keys)}) DO UPDATE SET {_updates}'
+    ))
+    conn.execute(text(f'TRUNCATE {_staging}'))
+
+
+def upsert(conn: Connection, table: Table, rows: List[Dict[str, Any]]) -> int:
+    """Insert or update `rows` in `table` through the fastest bulk path the connection's dialect offers"""
+    if not rows:
+        return 0
+    rows = _dedupe(table, rows)
+    match conn.dialect.name:
+        case 'sqlite':
+            _upsert_sqlite(conn, table, rows)
+        case 'postgresql':
+            _upsert_postgres(conn, table, rows)
+        case _:
+            conn.execute(insert(table), rows)
+    return len(rows)
+
+
+def delete(conn: Connection, table: Table, keys: Iterable[Tuple]) -> int:
+    """Delete rows by primary key tuple, in primary key column order"""
+    _keys = [x.name for x in table.primary_key.columns]
+    params = [{f'k_{k}': v for k, v in zip(_keys, x)} for x in keys]
+    if params:
+        conn.execute(table.delete().where(and_(*[table.c[k] == bindparam(f'k_{k}') for k in _keys])), params)
+    return len(params)
+
+
+def update_result_counts(
+        conn: Connection, election_id: int, version_id: int, office_types: Optional[Set[str]] = None) -> int:
+    """
+    Recount wins by winner party for the given office types, or all of them, from `statewideofficesummary`.
+    Offices without an office_type are counted under ''.
+    """
+    if office_types is not None and not office_types:
+        return 0
+    o = statewide_offices.c
+    _type = func.coalesce(o.office_type, '')
+    counts = select(
+        o.election_id,
+        _type,
+        func.sum(case((o.winner_party.in_(REPUBLICAN), 1), else_=0)),
+        func.sum(case((o.winner_party.in_(DEMOCRAT), 1), else_=0)),
+        func.sum(case((o.winner_party.is_not(None) & o.winner_party.not_in(REPUBLICAN + DEMOCRAT), 1), else_=0)),
+        literal(version_id),
+    ).where(o.election_id == election_id).group_by(_type)
+    stale = result_counts.delete().where(result_counts.c.election_id == election_id)
+    if office_types is not None:
+        counts = counts.where(_type.in_(office_types))
+        stale = stale.where(result_counts.c.office_type.in_(office_types))
+    conn.execute(stale)
+    return conn.execute(insert(result_counts).from_select(_COLUMNS[result_counts], counts)).rowcount
+
+
+def turnout_rows(summaries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: x[k] for k in _COLUMNS[county_turnout]} for x in summaries]
+
+
+def _key(table: Table, row: Dict[str, Any]) -> Tuple:
+    return tuple(row[x.name] for x in table.primary_key.columns)
+
+
+def _content(table: Table, row: Dict[str, Any]) -> Tuple:
+    return tuple(row[x] for x in _CONTENT[table])
+
+
+@dataclass
+class BulkWriter:
+    """
+    Loads versions into `RESULT_TABLES`, replacing the per-object `session.add` calls of the old `initial_setup`.
+
+    `write` upserts a whole version. `refresh` keeps the stored content of each row in memory, loaded once
+    from the database, and only writes the rows a new version changed or removed, so a poll where a few
+    counties moved costs a few counties' worth of rows. Both update `AGGREGATE_TABLES` in the same transaction.
+    """
+    engine: Engine
+    _stored: Optional[Dict[str, Dict[Tuple, Tuple]]] = field(default=None, repr=False)
+    _election_id: Optional[int] = field(default=None, repr=False)
+
+    def create_tables(self) -> List[str]:
+        return migrate(self.engine)
+
+    def write(self, version_no: SQLModel, rows: Optional[Dict[Table, List[Dict[str, Any]]]] = None) -> Dict[str, int]:
+        """Upsert every row of a version and return the number of rows written per table"""
+        rows = table_rows(version_no) if rows is None else rows
+        with self.engine.begin() as conn:
+            written = {table.name: upsert(conn, table, rows.get(table, [])) for table in RESULT_TABLES}
+            written[result_counts.name] = update_result_counts(conn, version_no.election_id, version_no.version_id)
+            written[county_turnout.name] = upsert(conn, county_turnout, turnout_rows(rows.get(county_summaries, [])))
+        # Rows in the database may now differ from what `refresh` last saw
+        self._stored = None
+        return written
+
+    def _load(self, conn: Connection, election_id: int) -> Dict[str, Dict[Tuple, Tuple]]:
+        stored = {}
+        for table in RESULT_TABLES:
+            if table is versions:
+                continue
+            _keys = [x for x in table.primary_key.columns]
+            _values = [table.c[x] for x in _CONTENT[table]]
+            stored[table.name] = {
+                tuple(x[:len(_keys)]): tuple(x[len(_keys):])
+                for x in conn.execute(select(*_keys, *_values).where(table.c.election_id == election_id))
+            }
+        return stored
+
+    def refresh(self, version_no: SQLModel) -> Dict[str, int]:
+        """Upsert the changed rows and delete the vanished ones; returns the number of rows touched per table"""
+        rows = table_rows(version_no)
+        written = {}
+        with self.engine.begin() as conn:
+            if self._stored is None or self._election_id != version_no.election_id:
+                self._stored = self._load(conn, version_no.election_id)
+                self._election_id = version_no.election_id
+            updated: Dict[str, Dict[Tuple, Tuple]] = {}
+            for table in RESULT_TABLES:
+                if table is versions:
+                    written[table.name] = upsert(conn, table, rows[table])
+                    continue
+                stored = self._stored[table.name]
+                current, changed = {}, []
+                for row in rows[table]:
+                    key, content = _key(table, row), _content(table, row)
+                    current[key] = content
+                    if stored.get(key) != content:
+                        changed.append(row)
+                removed: Set[Tuple] = stored.keys() - current.keys()
+                written[table.name] = upsert(conn, table, changed) + delete(conn, table, removed)
+                updated[table.name] = current
+                if table is statewide_offices:
+                    # An office moving between types or winners changes the counts of its old and new type
+                    _type = _CONTENT[table].index('office_type')
+                    office_types = {stored[_key(table, x)][_type] or '' for x in changed if _key(table, x) in stored}
+                    office_types |= {x['office_type'] or '' for x in changed}
+                    office_types |= {stored[x][_type] or '' for x in removed}
+                    written[result_counts.name] = update_result_counts(
+                        conn, version_no.election_id, version_no.version_id, office_types
+                    )
+                elif table is county_summaries:
+                    written[county_turnout.name] = (
+                        upsert(conn, county_turnout, turnout_rows(changed)) + delete(conn, county_turnout, removed)
+                    )
+        # Only once the transaction has committed does the database hold the new content
+        self._stored.update(updated)
+        return written
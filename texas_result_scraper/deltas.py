@@ -0,0 +1,126 @@
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+import csv
+import re
+
+
+CHECKPOINT = 'checkpoint'
+DELTA = 'delta'
+UPSERT = 'U'
+DELETE = 'D'
+
+Row = Tuple[str, ...]
+
+
+def as_text(row: Sequence) -> Row:
+    """Render a row the way csv.writer would, so rows built in memory compare equal to rows read back from disk"""
+    return tuple('' if v is None else str(v) for v in row)
+
+
+@dataclass
+class DeltaStore:
+    """
+    Append-only output mode: each version is written as the rows added, changed or removed since the
+    previous version, with a full checkpoint every `checkpoint_every` versions.
+
+    Files sit next to the regular outputs as `tx-{election}-{version}-{name}.checkpoint.csv` and
+    `tx-{election}-{version}-{name}.delta.csv`. Delta files carry a leading `op` column: `U` for an
+    added or changed row, `D` for a row that is no longer reported (only its key columns are filled).
+    """
+    directory: Path
+    election_id: int
+    checkpoint_every: int = 12
+    _latest: Dict[str, Tuple[int, Dict[Row, Row]]] = field(default_factory=dict, repr=False)
+
+    def path(self, name: str, version: int, kind: str) -> Path:
+        return self.directory / f'tx-{self.election_id}-{version}-{name}.{kind}.csv'
+
+    def versions(self, name: str) -> List[Tuple[int, str]]:
+        """(version, kind) for every checkpoint and delta file on disk, oldest first"""
+        pattern = re.compile(rf'tx-{self.election_id}-(\d+)-{re.escape(name)}\.({CHECKPOINT}|{DELTA})\.csv$')
+        found = []
+        for path in self.directory.glob(f'tx-{self.election_id}-*-{name}.*.csv'):
+            if match := pattern.match(path.name):
+                found.append((int(match.group(1)), match.group(2)))
+        return sorted(found)
+
+    def rebuild(self, name: str, key_columns: Sequence[str], version: Optional[int] = None) -> Dict[Row, Row]:
+        """Rebuild the rows of `version` (default: the newest on disk) from its checkpoint plus the deltas after it"""
+        files = [x for x in self.versions(name) if version is None or x[0] <= version]
+        checkpoints = [i for i, (_, kind) in enumerate(files) if kind == CHECKPOINT]
+        if not checkpoints:
+            return {}
+        rows: Dict[Row, Row] = {}
+        for _version, kind in files[checkpoints[-1]:]:
+            with open(self.path(name, _version, kind), newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                if kind == DELTA:
+                    header = header[1:]
+                _key = [header.index(x) for x in key_columns]
+                for row in reader:
+                    op = UPSERT
+                    if kind == DELTA:
+                        op, *row = row
+                    key = tuple(row[i] for i in _key)
+                    if op == DELETE:
+                        rows.pop(key, None)
+                    else:
+                        rows[key] = tuple(row)
+        return rows
+
+    def _previous(self, name: str, key_columns: Sequence[str], version: int) -> Tuple[Dict[Row, Row], int]:
+        """Rows of the newest version before `version`, and how many deltas have been written since its checkpoint"""
+        on_disk = [x for x in self.versions(name) if x[0] < version]
+        checkpoints = [i for i, (_, kind) in enumerate(on_disk) if kind == CHECKPOINT]
+        if not checkpoints:
+            return {}, -1
+        since_checkpoint = len(on_disk) - checkpoints[-1] - 1
+        cached = self._latest.get(name)
+        if cached and cached[0] == on_disk[-1][0]:
+            return cached[1], since_checkpoint
+        return self.rebuild(name, key_columns, on_disk[-1][0]), since_checkpoint
+
+    def write(
+            self,
+            name: str,
+            columns: Sequence[str],
+            key_columns: Sequence[str],
+            version: int,
+            rows: Iterable[Sequence],
+            keep: Optional[Callable[[], bool]] = None) -> Optional[Path]:
+        """
+        Write `rows` for `version` as a delta against the previous version, or as a checkpoint when one is due.
+        `keep`, asked once the rows are read and before anything is written, can skip the version.
+        """
+        _key = [list(columns).index(x) for x in key_columns]
+        current: Dict[Row, Row] = {}
+        for row in rows:
+            row = as_text(row)
+            current[tuple(row[i] for i in _key)] = row
+        if keep is not None and not keep():
+            return None
+
+        previous, since_checkpoint = self._previous(name, key_columns, version)
+        if since_checkpoint < 0 or since_checkpoint + 1 >= self.checkpoint_every:
+            path = self.path(name, version, CHECKPOINT)
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(current.values())
+        else:
+            path = self.path(name, version, DELTA)
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('op', *columns))
+                for key, row in current.items():
+                    if previous.get(key) != row:
+                        writer.writerow((UPSERT, *row))
+                for key in previous.keys() - current.keys():
+                    _removed = [''] * len(columns)
+                    for i, v in zip(_key, key):
+                        _removed[i] = v
+                    writer.writerow((DELETE, *_removed))
+        self._latest[name] = (version, current)
+        return path
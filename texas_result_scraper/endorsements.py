@@ -0,0 +1,181 @@
+from typing import Dict, Iterator, Optional, Tuple
+from pathlib import Path
+from dataclasses import dataclass, field
+import hashlib
+import logging
+
+import pandas as pd
+from sqlmodel import SQLModel
+
+from texas_result_scraper.instrumentation import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# CSV header -> column, as the aliases of `validator.CandidateEndorsements`
+COLUMNS = {
+    'Candidate First Name': 'first_name',
+    'Candidate Last Name': 'last_name',
+    'District Type': 'district',
+    'District Number': 'district_number',
+    'Paxton Endorsed': 'paxton',
+    'Abbott Endorsed': 'abbott',
+    'Rick Perry Endorsed': 'perry',
+    'Sid Miller Endorsed': 'miller',
+    'Dan Patrick Endorsed': 'patrick',
+}
+COLUMNS_BY_NAME = {v: k for k, v in COLUMNS.items()}
+REQUIRED = ('first_name', 'last_name', 'district', 'district_number')
+ENDORSERS = ('paxton', 'abbott', 'perry', 'miller', 'patrick')
+# Normalized (last name, first name, district) the two sides are joined on
+KEY = ('last_key', 'first_key', 'district_key')
+CANDIDATE_COLUMNS = ('source', 'office_id', 'office', 'office_type', 'office_district', 'candidate', 'party')
+JOIN_COLUMNS = CANDIDATE_COLUMNS + ('endorsement_id',) + ENDORSERS
+
+# Spellings of a district type in endorsement sheets -> `funcs.set_office_type` codes, both normalized
+DISTRICT_TYPES = {
+    'HOUSE': 'HD',
+    'STATEHOUSE': 'HD',
+    'STATEREPRESENTATIVE': 'HD',
+    'SENATE': 'SD',
+    'STATESENATE': 'SD',
+    'STATESENATOR': 'SD',
+    'CONGRESS': 'CD',
+    'CONGRESSIONAL': 'CD',
+    'USREPRESENTATIVE': 'CD',
+}
+_BOOLS = {'TRUE': True, 'YES': True, 'Y': True, 'X': True, '1': True, 'FALSE': False, 'NO': False, 'N': False, '0': False}
+
+CandidateKey = Tuple[str, int, str]
+
+
+def _normalize(values: pd.Series) -> pd.Series:
+    """Upper case letters and digits only, so punctuation and spacing differences still join"""
+    return values.fillna('').astype(str).str.upper().str.replace(r'[^A-Z0-9]', '', regex=True)
+
+
+def _district_number(values: pd.Series) -> pd.Series:
+    """The first run of digits without leading zeros: '012', '12' and '12TH JUDICIAL DISTRICT' are all '12'"""
+    return values.fillna('').astype(str).str.extract(r'(\d+)', expand=False).fillna('').str.lstrip('0')
+
+
+def district_keys(district: pd.Series, number: pd.Series) -> pd.Series:
+    _type = _normalize(district)
+    return _type.replace(DISTRICT_TYPES) + ':' + _district_number(number)
+
+
+def endorsement_ids(frame: pd.DataFrame) -> pd.Series:
+    """
+    `CandidateEndorsements.generate_endorsement_id` for every row: SHA-256 of the stripped, upper-cased first
+    name, last name, district type and number joined together, mod 10**8. The number is written as the
+    validator's int is, so '012' and '12' give one id. The strings are built column-wise; only the digests
+    are taken row by row.
+    """
+    _strings = (
+        frame['first_name'].str.strip().str.upper()
+        + frame['last_name'].str.strip().str.upper()
+        + frame['district'].str.strip().str.upper()
+        + frame['district_number'].str.strip().str.replace(r'^0+(?=\d)', '', regex=True)
+    )
+    return pd.Series(
+        [int(hashlib.sha256(x.encode()).hexdigest(), 16) % (10 ** 8) for x in _strings],
+        index=frame.index,
+        dtype='int64'
+    )
+
+
+def read_endorsements(path: Path) -> pd.DataFrame:
+    """
+    The endorsement CSV in one pass, with ids, join keys and one nullable boolean column per endorser.
+    Later rows win when two share a join key.
+    """
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False, usecols=lambda x: x.strip() in COLUMNS)
+    frame = frame.rename(columns=lambda x: COLUMNS[x.strip()])
+    missing = [COLUMNS_BY_NAME[x] for x in REQUIRED if x not in frame.columns]
+    if missing:
+        raise ValueError(f"{path} is missing endorsement columns: {', '.join(missing)}")
+
+    for endorser in ENDORSERS:
+        _values = frame[endorser] if endorser in frame.columns else pd.Series('', index=frame.index)
+        frame[endorser] = _values.str.strip().str.upper().map(_BOOLS).astype('boolean')
+    frame['endorsement_id'] = endorsement_ids(frame)
+    frame['last_key'] = _normalize(frame['last_name'])
+    frame['first_key'] = _normalize(frame['first_name'])
+    frame['district_key'] = district_keys(frame['district'], frame['district_number'])
+
+    _duplicated = frame.duplicated(list(KEY), keep='last')
+    if _duplicated.any():
+        logger.warning("%s: %s endorsement rows repeat a candidate; keeping the last", path, int(_duplicated.sum()))
+    return frame[~_duplicated].reset_index(drop=True)
+
+
+def iter_candidates(version_no: SQLModel) -> Iterator[Tuple]:
+    """One `CANDIDATE_COLUMNS` row plus first and last name for each race and statewide candidate"""
+    for race in version_no.races:
+        for candidate in race.candidates:
+            yield (
+                'race', race.race_id, race.office, race.office_type, race.office_district,
+                candidate.full_name, candidate.party, candidate.first_name, candidate.last_name,
+            )
+    for office in version_no.statewide.values():
+        for candidate in office.candidates:
+            yield (
+                'statewide', office.office_id, office.name, office.office_type, office.office_district,
+                candidate.name, candidate.party, candidate.first_name, candidate.last_name,
+            )
+
+
+def candidate_signature(version_no: SQLModel) -> frozenset:
+    """Which candidates stand in which offices; a version only changes it when the ballot itself changes"""
+    return frozenset(
+        [('race', race.race_id, x.full_name) for race in version_no.races for x in race.candidates]
+        + [('statewide', x.office_id, y.name) for x in version_no.statewide.values() for y in x.candidates]
+    )
+
+
+def candidate_table(version_no: SQLModel) -> pd.DataFrame:
+    candidates = pd.DataFrame(
+        list(iter_candidates(version_no)), columns=list(CANDIDATE_COLUMNS) + ['first_name', 'last_name']
+    )
+    candidates['last_key'] = _normalize(candidates['last_name'])
+    candidates['first_key'] = _normalize(candidates['first_name'])
+    candidates['district_key'] = district_keys(candidates['office_type'], candidates['office_district'])
+    return candidates
+
+
+@dataclass
+class EndorsementIndex:
+    """
+    Endorsements joined to the `CandidateName` and `StatewideCandidateSummary` models of each version.
+
+    The join is a hash join on normalized (last name, first name, district) keys. Candidates do not change
+    between versions of one election, so the joined table is kept and handed back as is until a version
+    brings a different set of candidates; one index serves a whole night of versions.
+    """
+    endorsements: pd.DataFrame
+    signature: Optional[frozenset] = None
+    joined: Optional[pd.DataFrame] = field(default=None, repr=False)
+
+    @classmethod
+    def from_csv(cls, path: Path) -> 'EndorsementIndex':
+        return cls(read_endorsements(path))
+
+    def join(self, version_no: SQLModel) -> pd.DataFrame:
+        """One `JOIN_COLUMNS` row per endorsed candidate of `version_no`"""
+        _signature = candidate_signature(version_no)
+        if self.joined is not None and _signature == self.signature:
+            return self.joined
+        with metrics.span('endorsement_join'):
+            candidates = candidate_table(version_no)
+            joined = candidates.merge(self.endorsements, on=list(KEY), how='inner', suffixes=('', '_endorsed'))
+            self.joined = joined[list(JOIN_COLUMNS)].reset_index(drop=True)
+        self.signature = _signature
+        metrics.count('endorsements_matched', len(self.joined))
+        return self.joined
+
+    def by_candidate(self, version_no: SQLModel) -> Dict[CandidateKey, Dict]:
+        """Endorsement row by (source, office id, candidate name)"""
+        return {
+            (x['source'], x['office_id'], x['candidate']): x
+            for x in self.join(version_no).to_dict('records')
+        }
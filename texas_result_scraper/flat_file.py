@@ -1,15 +1,22 @@
 from pathlib import Path
-from typing import List, ForwardRef, Type
+from typing import List, ForwardRef, Type, Iterable, Iterator, Tuple, Dict, Callable, Optional
 import json
+import csv
 
 from pydantic.dataclasses import dataclass as pydantic_dataclass
 from sqlmodel import Field as SQLModelField
-import pandas as pd
 
 import models.public_models as public
+import models.bases as base
+from texas_result_scraper import columnar, snapshot, indexed_snapshot
+from texas_result_scraper.deltas import DeltaStore
+from texas_result_scraper.manifest import HashedRows, OutputManifest
+from texas_result_scraper.instrumentation import metrics
 from .scraper import ElectionResultTicker
 
 
+DATA_DIR = Path(__file__).parent / 'data'
+
 EXCLUDE = {
         "county_name",
         "county_results", 
@@ -18,6 +25,89 @@ EXCLUDE = {
         "version_number"
         }
 
+STATEWIDE_TOTAL_COLUMNS = (
+    'office', 'candidate', 'party', 'early_votes', 'election_day_votes', 'total_votes', 'percent', 'winner_margin'
+)
+
+# Delta race rows lead with the race id, as two races can share an office name, candidate and county
+DELTA_RACE_COLUMNS = ('race_id',) + base.RACE_COLUMNS
+
+# Columns that identify a row across versions in delta output mode
+DELTA_KEYS = {
+    'race-results': ('race_id', 'candidate', 'party', 'county'),
+    'county-results': ('county_name',),
+    'statewide-results': ('office', 'candidate', 'party'),
+}
+
+
+def write_csv(path: Path, columns: Iterable[str], rows: Iterable[Tuple]) -> Path:
+    """Stream rows to a CSV file without holding them in memory"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    return path
+
+
+# A writer `_write_if_changed` can discard: it gets the rows and a `keep()` to ask once it has consumed them
+KeptWrite = Callable[[Iterator[Tuple], Callable[[], bool]], Optional[Path]]
+
+
+def kept_file(path: Path, write: Callable[[Path, Iterator[Tuple]], Path]) -> KeptWrite:
+    """Write to a temporary file next to `path`, then move it into place if it is kept or delete it if not"""
+    def _write(rows: Iterator[Tuple], keep: Callable[[], bool]) -> Optional[Path]:
+        _temp = path.with_name(f'.{path.name}.tmp')
+        try:
+            write(_temp, rows)
+            if keep():
+                return _temp.replace(path)
+            return None
+        finally:
+            _temp.unlink(missing_ok=True)
+    return _write
+
+
+def race_rows_with_id(races: Iterable) -> Iterator[Tuple]:
+    """`DELTA_RACE_COLUMNS` rows: each race's `RACE_COLUMNS` rows behind its race id"""
+    for race in races:
+        _id = (race.race_id,)
+        for row in race.iter_rows():
+            yield _id + row
+
+
+def statewide_totals(rows: Iterable[Tuple]) -> Iterator[Tuple]:
+    """
+    Roll `STATEWIDE_COLUMNS` rows up to one row per office, candidate and party.
+    Only one running total per candidate is kept, so memory does not grow with the county count.
+    """
+    _idx = {k: i for i, k in enumerate(base.STATEWIDE_COLUMNS)}
+    totals: Dict[Tuple, list] = {}
+    for row in rows:
+        key = (row[_idx['office']], row[_idx['candidate']], row[_idx['party']])
+        if None in key:
+            continue
+        _total = totals.get(key)
+        if _total is None:
+            # early, election day, total, percent sum, county count, winner margin, percent sum compensation
+            totals[key] = [0, 0, 0, 0.0, 0, row[_idx['winner_margin']], 0.0]
+            _total = totals[key]
+        _total[0] += row[_idx['early_votes']]
+        _total[1] += row[_idx['election_day_votes']]
+        _total[2] += row[_idx['total_votes']]
+        # Kahan summation, as pandas' groupby mean sums, so the mean over 254 counties rounds the same way
+        _y = row[_idx['percent']] - _total[6]
+        _t = _total[3] + _y
+        _total[6] = (_t - _total[3]) - _y
+        _total[3] = _t
+        _total[4] += 1
+    # As the pandas groupby this replaced wrote it: a float column once any office has no margin yet
+    _float_margin = any(x[5] is None for x in totals.values())
+    for key in sorted(totals):
+        early, election_day, total, percent, count, margin, _ = totals[key]
+        if _float_margin and margin is not None:
+            margin = float(margin)
+        yield key + (early, election_day, total, percent / count, margin)
+
 
 @pydantic_dataclass(config={"arbitrary_types_allowed": True})
 class GitHubFile:
@@ -26,37 +116,131 @@ class GitHubFile:
     exclude: set = SQLModelField(default=EXCLUDE)
     file_name: str = SQLModelField(default=None)
     written_file_names: List[Path] = SQLModelField(default_factory=list)
+    skipped_file_names: List[str] = SQLModelField(default_factory=list)
+    deltas: DeltaStore = None
+    manifest: OutputManifest = None
+    directory: Path = SQLModelField(default=DATA_DIR)
 
     def __post_init__(self):
         self.ticker.create_file()
+        if self.manifest is None:
+            self.manifest = OutputManifest(self.directory / 'manifest.json')
+
+    @property
+    def changed(self) -> bool:
+        """False when every output of this version matched the manifest and nothing was written"""
+        return bool(self.written_file_names)
+
     def _set_file_name(self, file: str, file_type: str = 'csv') -> Path:
-        _name = Path(__file__).parent / 'data' / f'{self.file_name}-{file}.{file_type}'
-        self.written_file_names.append(_name)
-        return _name
+        return self.directory / f'{self.file_name}-{file}.{file_type}'
+
+    def _outputs(self) -> Dict[str, Tuple[Tuple[str, ...], Callable[[], Iterator[Tuple]]]]:
+        # Writers pull rows as they go; only the pulling is timed, under the same span as `flatten_races` and co.
+        return {
+            'race-results': (
+                base.RACE_COLUMNS, lambda: metrics.timed('flatten', self.data.iter_races(), output='races')
+            ),
+            'county-results': (
+                base.COUNTY_COLUMNS, lambda: metrics.timed('flatten', self.data.iter_counties(), output='counties')
+            ),
+            'statewide-results': (
+                STATEWIDE_TOTAL_COLUMNS,
+                lambda: statewide_totals(metrics.timed('flatten', self.data.iter_statewide(), output='statewide'))
+            ),
+        }
+
+    def _delta_outputs(self) -> Dict[str, Tuple[Tuple[str, ...], Callable[[], Iterator[Tuple]]]]:
+        outputs = self._outputs()
+        outputs['race-results'] = (
+            DELTA_RACE_COLUMNS, lambda: metrics.timed('flatten', race_rows_with_id(self.data.races), output='races')
+        )
+        return outputs
+
+    def _write_if_changed(
+            self,
+            output: str,
+            columns: Tuple[str, ...],
+            rows: Callable[[], Iterator[Tuple]],
+            write: KeptWrite) -> Optional[Path]:
+        """
+        Build the rows once, hashing them as `write` consumes them; it keeps what it wrote only when they
+        differ from the last output in the manifest
+        """
+        hashed = HashedRows(columns, rows())
+
+        def keep() -> bool:
+            return not self.manifest.unchanged(self.ticker.election_id, output, hashed.hexdigest())
+
+        with metrics.span('write', output=output):
+            path = write(iter(hashed), keep)
+        if path is None:
+            self.skipped_file_names.append(output)
+            return None
+        metrics.count('rows_written', hashed.count, output=output)
+        self._count_bytes(output, path)
+        self.manifest.record(self.ticker.election_id, output, hashed.hexdigest(), self.data.version_id, path)
+        self.written_file_names.append(path)
+        return path
+
+    @staticmethod
+    def _count_bytes(output: str, path: Path) -> None:
+        if metrics.enabled and path.is_file():
+            metrics.count('bytes_written', path.stat().st_size, output=output)
 
     def github_flat_file(self):
         ticker = self.ticker
         ticker.pull_data()
         ticker.create_models()
-        self.data = ticker.version_no
-        self.file_name = f'tx-{self.ticker.election_id}-{self.ticker.version_no.version_id}'
+        return self.use(ticker.version_no)
+
+    def use(self, version_no: public.ResultVersionNumberPublic):
+        """Point the writers at an already built version"""
+        self.data = version_no
+        self.file_name = f'tx-{self.ticker.election_id}-{version_no.version_id}'
         return self
 
     def create_csv_files(self):
-        race_data = (pd.DataFrame(self.data.flatten_races())
-                     .to_csv(self._set_file_name('race-results'), index=False))
-        county_data = (pd.DataFrame(self.data.flatten_counties())
-                       .to_csv(self._set_file_name('county-results'), index=False))
-        _state_data = pd.DataFrame(self.data.flatten_statewide())
-        statewide_data = _state_data.groupby(['office', 'candidate', 'party']).agg({
-            'early_votes': 'sum',
-            'election_day_votes': 'sum',
-            'total_votes': 'sum',
-            'percent': 'mean',
-            'winner_margin': 'first'
-        }).reset_index().to_csv(self._set_file_name('statewide-results'), index=False)
+        for name, (columns, rows) in self._outputs().items():
+            self._write_if_changed(
+                f'{name}.csv',
+                columns,
+                rows,
+                kept_file(self._set_file_name(name), lambda _path, _rows: write_csv(_path, columns, _rows))
+            )
         return self
 
+    def create_parquet_files(self, arrow: bool = False):
+        """Typed, compressed columnar copies of the CSV outputs; `arrow=True` writes Arrow IPC instead of Parquet"""
+        _write, _suffix = (columnar.write_arrow, 'arrow') if arrow else (columnar.write_parquet, 'parquet')
+        for name, (columns, rows) in self._outputs().items():
+            self._write_if_changed(
+                f'{name}.{_suffix}',
+                columns,
+                rows,
+                kept_file(
+                    self._set_file_name(name, _suffix), lambda _path, _rows: _write(_path, columnar.SCHEMAS[name], _rows)
+                )
+            )
+        return self
+
+    def create_delta_files(self, checkpoint_every: int = 12):
+        """Write only what changed since the previous version, with a full checkpoint every `checkpoint_every` versions"""
+        if self.deltas is None:
+            self.deltas = DeltaStore(
+                directory=self.directory,
+                election_id=self.ticker.election_id,
+                checkpoint_every=checkpoint_every
+            )
+        for name, (columns, rows) in self._delta_outputs().items():
+            self._write_if_changed(
+                f'{name}.delta',
+                columns,
+                rows,
+                lambda _rows, keep: self.deltas.write(
+                    name, columns, DELTA_KEYS[name], self.data.version_id, _rows, keep=keep
+                )
+            )
+        return self
 
     def dump_model(self):
         return self.data.model_dump()
@@ -94,15 +278,38 @@ class GitHubFile:
         return f"{self.data.__class__.__name__}: {json.dumps(result, indent=2)}"
     
     def write(self) -> None:
-        with open(
-            Path(__file__).parent / 'data'/ self.file_name,
+        with metrics.span('write', output='json'), open(
+            self.directory / self.file_name,
             'w') as f:
             f.write(
                 self.data.model_dump_json(exclude_none=True)
                 )
+        self._count_bytes('json', self.directory / self.file_name)
             
+    def write_snapshot(self) -> Path:
+        """Binary counterpart to `write`: a versioned msgpack snapshot that `read_snapshot` can reload without revalidating"""
+        _path = self._set_file_name('snapshot', 'msgpack')
+        with metrics.span('write', output='snapshot'), open(_path, 'wb') as f:
+            f.write(snapshot.dumps(self.data))
+        self._count_bytes('snapshot', _path)
+        self.written_file_names.append(_path)
+        return _path
+
+    def read_snapshot(self, trusted: bool = True) -> public.ResultVersionNumberPublic:
+        with open(self._set_file_name('snapshot', 'msgpack'), 'rb') as f:
+            return snapshot.loads(f.read(), trusted=trusted)
+
+    def write_indexed_snapshot(self) -> Path:
+        """Snapshot with a race/office/county table of contents, for `IndexedSnapshot` lookups without a full load"""
+        _path = indexed_snapshot.write(
+            self.directory / indexed_snapshot.file_name(self.ticker.election_id, self.data.version_id),
+            self.data
+        )
+        self.written_file_names.append(_path)
+        return _path
+
     def read(self) -> public.ResultVersionNumberPublic:
-        _path = Path(__file__).parent / 'data'/ self.file_name
+        _path = self.directory / self.file_name
         with open(_path, 'r') as f:
             data = json.loads(f.read())
             output = {
@@ -0,0 +1,144 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from collections import defaultdict
+import mmap
+import re
+import struct
+
+import msgpack
+from sqlmodel import SQLModel
+
+from texas_result_scraper import model_groups as model
+from texas_result_scraper.snapshot import Packer, Unpacker, SCHEMA_VERSION, check_header
+
+
+MAGIC = b'TXRI'
+# magic, schema version, offset of the table of contents
+HEADER = struct.Struct('>4sHQ')
+SUFFIX = 'snapshot.idx'
+
+
+def file_name(election_id: int, version_id: int) -> str:
+    return f'tx-{election_id}-{version_id}-{SUFFIX}'
+
+
+def write(path: Path, version_no: SQLModel, models: model.ModelGroup = model.FileModels) -> Path:
+    """
+    Write a snapshot made of independently decodable sections, one per race, county and statewide office,
+    followed by a table of contents of their byte ranges.
+
+    County sections carry that county's slice of every race it votes in, so a county can be shown
+    without touching any race section.
+    """
+    pack = Packer(models)
+    county_races: Dict[str, List[Any]] = defaultdict(list)
+    for race in version_no.races:
+        for county in {x.county for x in race.counties}:
+            county_races[county].append(pack.race(race, county=county))
+
+    toc = {
+        'fields': pack.fields,
+        'version': pack.scalars('ResultVersionNumber', version_no),
+        'races': {},
+        'offices': {},
+        'counties': {},
+        'statewide': {},
+    }
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, SCHEMA_VERSION, 0))
+
+        def section(packed: List[Any]) -> Tuple[int, int]:
+            _start = f.tell()
+            f.write(msgpack.packb(packed, use_bin_type=True))
+            return _start, f.tell() - _start
+
+        for race in version_no.races:
+            toc['races'][race.race_id] = section(pack.race(race))
+            toc['offices'].setdefault(race.office_type or '', {}).setdefault(race.office_district or '', []).append(race.race_id)
+        for name, county in version_no.county.items():
+            toc['counties'][name] = section([pack.county(county), county_races.get(name, [])])
+        for office_id, office in version_no.statewide.items():
+            toc['statewide'][office_id] = section(pack.office(office))
+
+        toc_offset = f.tell()
+        f.write(msgpack.packb(toc, use_bin_type=True))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, SCHEMA_VERSION, toc_offset))
+    return path
+
+
+class IndexedSnapshot:
+    """
+    Read-only, memory-mapped view of a file written by `write`.
+    Only the table of contents is decoded on open; each lookup decodes just the section it needs.
+    """
+
+    def __init__(self, path: Path, models: model.ModelGroup = model.FileModels, trusted: bool = True):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = HEADER.unpack_from(self._mmap)
+            check_header(header, magic=MAGIC)
+            self.toc = msgpack.unpackb(self._mmap[header[2]:], raw=False, strict_map_key=False)
+        except Exception:
+            self.close()
+            raise
+        self._unpack = Unpacker(self.toc['fields'], models, trusted)
+
+    @classmethod
+    def latest(cls, directory: Path, election_id: int, **kwargs) -> 'IndexedSnapshot':
+        """Open the newest indexed snapshot for an election in an output directory such as `data/`"""
+        pattern = re.compile(rf'tx-{election_id}-(\d+)-{re.escape(SUFFIX)}$')
+        versions = {
+            int(m.group(1)): x for x in directory.glob(f'tx-{election_id}-*-{SUFFIX}') if (m := pattern.match(x.name))
+        }
+        if not versions:
+            raise FileNotFoundError(f"No indexed snapshot for election {election_id} in {directory}")
+        return cls(versions[max(versions)], **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def _section(self, offset: int, length: int) -> Any:
+        return msgpack.unpackb(self._mmap[offset:offset + length], raw=False)
+
+    @property
+    def version(self) -> SQLModel:
+        """The version record alone, without its races, counties or statewide offices"""
+        return self._unpack.build('ResultVersionNumber', self.toc['version'])
+
+    @property
+    def race_ids(self) -> List[int]:
+        return list(self.toc['races'])
+
+    @property
+    def county_names(self) -> List[str]:
+        return list(self.toc['counties'])
+
+    def race(self, race_id: int) -> SQLModel:
+        return self._unpack.race(self._section(*self.toc['races'][race_id]))
+
+    def races(self, office_type: str, office_district: Optional[str] = None) -> List[SQLModel]:
+        """Races by `office_type`, e.g. `races('HD', '23')`; every district of the type when `office_district` is None"""
+        districts = self.toc['offices'].get(office_type, {})
+        if office_district is not None:
+            race_ids = districts.get(str(office_district), [])
+        else:
+            race_ids = [x for ids in districts.values() for x in ids]
+        return [self.race(x) for x in race_ids]
+
+    def county(self, name: str) -> Tuple[SQLModel, List[SQLModel]]:
+        """A county and its slice of each race it votes in: only that county's candidate results and details"""
+        _county, _races = self._section(*self.toc['counties'][name.upper()])
+        return self._unpack.county(_county), [self._unpack.race(x) for x in _races]
+
+    def office(self, office_id: int) -> SQLModel:
+        return self._unpack.office(self._section(*self.toc['statewide'][office_id]))
@@ -0,0 +1,251 @@
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+from dataclasses import dataclass, field
+from contextlib import ExitStack, contextmanager, nullcontext
+from datetime import datetime, timezone
+from threading import Lock, get_ident
+from time import perf_counter
+import json
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_PREFIX = 'tx_results'
+
+Labels = Tuple[Tuple[str, str], ...]
+Report = Dict[str, Any]
+MetricsSink = Callable[[Report], Any]
+# Called with a span's name and labels; the context manager it returns is entered for the span
+SpanHook = Callable[[str, Dict[str, str]], ContextManager]
+
+_DISABLED = nullcontext()
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+@dataclass
+class SpanStats:
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+@dataclass
+class Metrics:
+    """
+    Stage timings and processed counts, reported to pluggable sinks.
+
+    Disabled by default: `span` then hands back one shared no-op context manager and `count` returns at
+    once, so instrumented code pays an attribute check per call. `enable` turns collection on and
+    `flush` sends the totals so far to every sink. Totals are cumulative until `reset`. `hooks` wrap every
+    span, for tools that need the same stage boundaries, such as `memory.MemoryProfiler`.
+    """
+    enabled: bool = False
+    sinks: List[MetricsSink] = field(default_factory=list)
+    hooks: List[SpanHook] = field(default_factory=list)
+    spans: Dict[Tuple[str, Labels], SpanStats] = field(default_factory=dict)
+    counters: Dict[Tuple[str, Labels], int] = field(default_factory=dict)
+    _lock: Lock = field(default_factory=Lock, repr=False)
+
+    def enable(self, *sinks: MetricsSink) -> 'Metrics':
+        self.sinks.extend(sinks)
+        self.enabled = True
+        return self
+
+    def disable(self) -> 'Metrics':
+        self.enabled = False
+        return self
+
+    def reset(self) -> 'Metrics':
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+        return self
+
+    @contextmanager
+    def isolated(self) -> Iterator['Metrics']:
+        """
+        Collect into a private, enabled `Metrics` for the block, e.g. to profile one version, then put this
+        instance back as it was. Instrumented code reports to this instance, so its sinks, hooks and totals
+        stay untouched; whatever other threads record during the block goes to the private one too.
+        """
+        private = Metrics(enabled=True)
+        _saved = (self.enabled, self.sinks, self.hooks, self.spans, self.counters)
+        self.enabled, self.sinks, self.hooks, self.spans, self.counters = (
+            True, private.sinks, private.hooks, private.spans, private.counters
+        )
+        try:
+            yield private
+        finally:
+            self.enabled, self.sinks, self.hooks, self.spans, self.counters = _saved
+
+    def span(self, name: str, **labels) -> ContextManager:
+        """Time the block as stage `name`, e.g. `with metrics.span('write', output='race-results.csv'):`"""
+        if not self.enabled:
+            return _DISABLED
+        return self._span((name, _labels(labels)))
+
+    @contextmanager
+    def _span(self, key: Tuple[str, Labels]) -> Iterator[None]:
+        with ExitStack() as hooks:
+            for hook in self.hooks:
+                hooks.enter_context(hook(key[0], dict(key[1])))
+            _start = perf_counter()
+            try:
+                yield
+            finally:
+                _seconds = perf_counter() - _start
+                with self._lock:
+                    self.spans.setdefault(key, SpanStats()).add(_seconds)
+
+    def count(self, name: str, value: int = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def counted(self, name: str, rows: Iterable, **labels) -> Iterable:
+        """`rows` unchanged, adding each row to counter `name` as it is consumed"""
+        if not self.enabled:
+            return rows
+        return self._counted(name, rows, labels)
+
+    def _counted(self, name: str, rows: Iterable, labels: Dict[str, Any]) -> Iterator:
+        _count = 0
+        try:
+            for row in rows:
+                _count += 1
+                yield row
+        finally:
+            self.count(name, _count, **labels)
+
+    def timed(self, name: str, rows: Iterable, **labels) -> Iterable:
+        """
+        `rows` unchanged, timed as span `name` once consumed. Only the time spent producing rows is counted, not
+        the consumer's time between them, so a generator feeding a writer is timed apart from the write.
+        Span hooks are not run for it.
+        """
+        if not self.enabled:
+            return rows
+        return self._timed(iter(rows), (name, _labels(labels)))
+
+    def _timed(self, rows: Iterator, key: Tuple[str, Labels]) -> Iterator:
+        _seconds = 0.0
+        try:
+            while True:
+                _start = perf_counter()
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    return
+                finally:
+                    _seconds += perf_counter() - _start
+                yield row
+        finally:
+            with self._lock:
+                self.spans.setdefault(key, SpanStats()).add(_seconds)
+
+    def report(self) -> Report:
+        with self._lock:
+            return {
+                'time': datetime.now(timezone.utc).isoformat(),
+                'spans': [
+                    {'name': name, 'labels': dict(labels), **vars(stats)}
+                    for (name, labels), stats in sorted(self.spans.items())
+                ],
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+            }
+
+    def flush(self) -> Optional[Report]:
+        """Send the current totals to every sink; a failing sink is logged and does not stop the others"""
+        if not self.enabled:
+            return None
+        report = self.report()
+        for sink in self.sinks:
+            try:
+                sink(report)
+            except Exception as e:
+                logger.warning("Metrics sink %r failed: %s", sink, e)
+        return report
+
+
+def _write_atomic(path: Path, text: str) -> Path:
+    # Readers such as a Prometheus textfile collector never see a half-written file
+    _tmp = path.with_name(f'.{path.name}.{os.getpid()}.{get_ident()}.tmp')
+    _tmp.write_text(text)
+    os.replace(_tmp, path)
+    return path
+
+
+def log_sink(log: logging.Logger = logger, level: int = logging.INFO) -> MetricsSink:
+    """One structured JSON log line per flush"""
+    def write(report: Report) -> None:
+        log.log(level, 'metrics %s', json.dumps(report, sort_keys=True))
+    return write
+
+
+def json_sink(path: Path) -> MetricsSink:
+    """The latest report as a JSON file"""
+    def write(report: Report) -> Path:
+        return _write_atomic(Path(path), json.dumps(report, indent=2))
+    return write
+
+
+def _prometheus_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    _escaped = (
+        '{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels.items()
+    )
+    return '{' + ','.join(_escaped) + '}'
+
+
+def prometheus_text(report: Report, prefix: str = PROMETHEUS_PREFIX, labels: Optional[Dict[str, str]] = None) -> str:
+    """
+    Prometheus text exposition format: span count, seconds and max seconds by stage, and each counter.
+    `labels` are added to every series, e.g. to tell apart the files of several processes.
+    """
+    labels = labels or {}
+    lines = []
+    _families = (
+        ('span_count', 'counter', 'Times the stage ran', 'count'),
+        ('span_seconds_total', 'counter', 'Seconds spent in the stage', 'seconds'),
+        ('span_seconds_max', 'gauge', 'Longest single run of the stage', 'max_seconds'),
+    )
+    for suffix, kind, description, key in _families:
+        lines += [f'# HELP {prefix}_{suffix} {description}', f'# TYPE {prefix}_{suffix} {kind}']
+        lines += [
+            f'{prefix}_{suffix}{_prometheus_labels({**labels, "stage": x["name"], **x["labels"]})} {x[key]}'
+            for x in report['spans']
+        ]
+    for name in dict.fromkeys(x['name'] for x in report['counters']):
+        lines += [f'# HELP {prefix}_{name}_total Number of {name} processed', f'# TYPE {prefix}_{name}_total counter']
+        lines += [
+            f'{prefix}_{name}_total{_prometheus_labels({**labels, **x["labels"]})} {x["value"]}'
+            for x in report['counters'] if x['name'] == name
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def prometheus_sink(path: Path, prefix: str = PROMETHEUS_PREFIX, labels: Optional[Dict[str, str]] = None) -> MetricsSink:
+    """A text-format file for the node exporter's textfile collector"""
+    def write(report: Report) -> Path:
+        return _write_atomic(Path(path), prometheus_text(report, prefix, labels))
+    return write
+
+
+metrics = Metrics()
@@ -0,0 +1,68 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+from dataclasses import dataclass, field
+import hashlib
+import json
+
+from texas_result_scraper.deltas import as_text
+
+
+class HashedRows:
+    """Rows passed through unchanged while their `hash_rows` digest is taken, so a writer can hash what it writes"""
+
+    def __init__(self, columns: Sequence[str], rows: Iterable[Sequence]):
+        self._digest = hashlib.sha256('\x1f'.join(columns).encode())
+        self._rows = rows
+        self.count = 0
+
+    def __iter__(self) -> Iterator[Sequence]:
+        for row in self._rows:
+            self._digest.update(b'\n')
+            self._digest.update('\x1f'.join(as_text(row)).encode())
+            self.count += 1
+            yield row
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def hash_rows(columns: Sequence[str], rows: Iterable[Sequence]) -> str:
+    """SHA-256 of the header and rows as they would be rendered to CSV"""
+    hashed = HashedRows(columns, rows)
+    for _ in hashed:
+        pass
+    return hashed.hexdigest()
+
+
+@dataclass
+class OutputManifest:
+    """
+    Content hashes of the last outputs written for each election, stored as JSON next to the outputs.
+    Writers check it before writing so a version whose rows did not change produces no new files.
+    """
+    path: Path
+    entries: Dict[str, Dict[str, Dict]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+
+    def last(self, election_id: int, output: str) -> Optional[Dict]:
+        return self.entries.get(str(election_id), {}).get(output)
+
+    def unchanged(self, election_id: int, output: str, digest: str) -> bool:
+        """True when the last `output` written had these rows and its file is still next to the manifest"""
+        _last = self.last(election_id, output)
+        if _last is None or _last['sha256'] != digest:
+            return False
+        return (self.path.parent / _last['file']).is_file()
+
+    def record(self, election_id: int, output: str, digest: str, version_id: int, file: Path) -> None:
+        self.entries.setdefault(str(election_id), {})[output] = {
+            'sha256': digest,
+            'version_id': version_id,
+            'file': file.name,
+        }
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
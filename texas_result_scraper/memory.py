@@ -0,0 +1,185 @@
+from typing import Any, Dict, Iterator, List, Optional
+from pathlib import Path
+from dataclasses import dataclass, field
+from contextlib import contextmanager, nullcontext
+import json
+import linecache
+import os
+import re
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from texas_result_scraper.scraper import ElectionResultTicker
+from texas_result_scraper.flat_file import GitHubFile
+from texas_result_scraper.pipeline import Payload
+from texas_result_scraper.instrumentation import metrics
+
+
+PACKAGE_DIR = str(Path(__file__).parent)
+# Frames of the profiler and instrumentation themselves are never the allocation site
+_SKIP = {__file__, str(Path(__file__).parent / 'instrumentation.py')}
+
+MODEL_NAMES = {
+    'ResultVersionNumber',
+    'CandidateName',
+    'CandidateCountyResults',
+    'RaceDetails',
+    'CountyRaceDetails',
+    'CountySummary',
+    'County',
+    'StatewideCandidateSummary',
+    'StatewideOfficeSummary',
+}
+_CALL = re.compile(r'([A-Z]\w*)\(')
+_SUFFIX = re.compile(r'(Public|DB|Base)$')
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, where /proc is available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def max_rss_bytes() -> Optional[int]:
+    """Peak resident set size of the process so far"""
+    if resource is None:
+        return None
+    _max = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return _max if os.uname().sysname == 'Darwin' else _max * 1024
+
+
+def allocation_site(traceback: tracemalloc.Traceback) -> tuple:
+    """(file:line, model class) of the innermost frame in this package; the class is read off the source line"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(PACKAGE_DIR) and frame.filename not in _SKIP:
+            _line = linecache.getline(frame.filename, frame.lineno)
+            _models = [x for x in (_SUFFIX.sub('', y) for y in _CALL.findall(_line)) if x in MODEL_NAMES]
+            _site = f'{os.path.relpath(frame.filename, PACKAGE_DIR)}:{frame.lineno}'
+            return _site, _models[0] if _models else None
+    return f'{traceback[-1].filename}:{traceback[-1].lineno}', None
+
+
+@dataclass
+class MemoryProfiler:
+    """
+    tracemalloc snapshots and RSS at each stage boundary of a version build.
+
+    Each stage records the traced and resident peak while it ran and what it left allocated, as the
+    `top` allocation sites it added and their total by model class, e.g. `CandidateCountyResults`.
+    Stages are the instrumentation spans (fetch, decode, county_build, statewide_build, flatten, write),
+    so the profiler is installed as a `metrics` hook. A stage's traced peak includes those of the stages
+    nested in it.
+    """
+    top: int = 10
+    frames: int = 8
+    stages: List[Dict[str, Any]] = field(default_factory=list)
+    _snapshot: Optional[tracemalloc.Snapshot] = field(default=None, repr=False)
+    _started: bool = field(default=False, repr=False)
+    # Traced peak seen so far by each stage still open, outermost first
+    _peaks: List[int] = field(default_factory=list, repr=False)
+
+    def __enter__(self) -> 'MemoryProfiler':
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+        self._snapshot = tracemalloc.take_snapshot()
+        metrics.hooks.append(self.stage)
+        return self
+
+    def __exit__(self, *_) -> None:
+        metrics.hooks.remove(self.stage)
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def _stage_name(self, name: str, labels: Dict[str, str]) -> str:
+        return ':'.join([name, *labels.values()])
+
+    def _fold_peak(self) -> None:
+        """Carry the peak since the last reset into every open stage, before it is reset or read"""
+        _, _peak = tracemalloc.get_traced_memory()
+        self._peaks[:] = [max(x, _peak) for x in self._peaks]
+
+    @contextmanager
+    def stage(self, name: str, labels: Optional[Dict[str, str]] = None) -> Iterator[None]:
+        _rss = rss_bytes()
+        # A nested stage resets the peak; what the enclosing stages reached so far is kept first
+        self._fold_peak()
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+        try:
+            yield
+        finally:
+            self._fold_peak()
+            _peak = self._peaks.pop()
+            _current, _ = tracemalloc.get_traced_memory()
+            _snapshot = tracemalloc.take_snapshot()
+            by_model: Dict[str, int] = {}
+            sites: Dict[str, Dict[str, Any]] = {}
+            for stat in _snapshot.compare_to(self._snapshot, 'traceback'):
+                if stat.size_diff <= 0:
+                    continue
+                _site, _model = allocation_site(stat.traceback)
+                _model = _model or 'other'
+                by_model[_model] = by_model.get(_model, 0) + stat.size_diff
+                _entry = sites.setdefault(_site, {'site': _site, 'model': _model, 'size': 0, 'count': 0})
+                _entry['size'] += stat.size_diff
+                _entry['count'] += stat.count_diff
+            self._snapshot = _snapshot
+            self.stages.append({
+                'stage': self._stage_name(name, labels or {}),
+                'traced_peak': _peak,
+                'traced_current': _current,
+                'rss_start': _rss,
+                'rss_end': rss_bytes(),
+                'max_rss': max_rss_bytes(),
+                'by_model': dict(sorted(by_model.items(), key=lambda x: -x[1])),
+                'top_sites': sorted(sites.values(), key=lambda x: -x['size'])[:self.top],
+            })
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'peak_stage': max(self.stages, key=lambda x: x['traced_peak'])['stage'] if self.stages else None,
+            'max_rss': max_rss_bytes(),
+            'stages': self.stages,
+        }
+
+    def write(self, path: Path) -> Path:
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+def profiling_spans():
+    """The enabled `metrics` as they are, or a private collection for the block when they are disabled"""
+    return nullcontext(metrics) if metrics.enabled else metrics.isolated()
+
+
+def profile_version(
+        ticker: ElectionResultTicker,
+        payload: Optional[Payload] = None,
+        directory: Optional[Path] = None,
+        top: int = 10) -> Path:
+    """
+    Fetch (unless a `payload` is given), build and write one version under a `MemoryProfiler`, and save
+    its report as `tx-<election_id>-<version_id>-memory.json` beside the version's CSV outputs.
+    """
+    output = GitHubFile(ticker) if directory is None else GitHubFile(ticker, directory=directory)
+    # Stages need spans; when metrics are off they are collected privately instead of switching them on
+    with profiling_spans(), MemoryProfiler(top=top) as profiler:
+        # One file at a time, so each fetch is its own stage
+        if payload is None:
+            ticker.pull_data()
+        else:
+            ticker.load_raw(payload['version'], payload['county'], payload['statewide'])
+        ticker.create_models()
+        output.use(ticker.version_no).create_csv_files()
+    return profiler.write(output._set_file_name('memory', 'json'))
@@ -1,5 +1,5 @@
 import abc
-from typing import  Optional, Annotated,  ClassVar, List, TypeVar, Union, Protocol, Type, Any
+from typing import  Optional, Annotated,  ClassVar, List, TypeVar, Union, Protocol, Type, Any, Iterator, Tuple
 from pathlib import Path
 import csv
 from datetime import datetime, date
@@ -20,11 +20,13 @@ from sqlmodel import (
 )
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.orm import declared_attr
-from pydantic import model_validator, ConfigDict, field_validator, BaseModel, computed_field
+from pydantic import model_validator, ConfigDict, field_validator, BaseModel, computed_field, PrivateAttr
 from pydantic_extra_types.color import Color
 from nameparser import HumanName
 
 import texas_result_scraper.funcs as funcs
+from texas_result_scraper.query import ResultIndex
+from texas_result_scraper.instrumentation import metrics
 
 
 T = TypeVar('T')
@@ -35,6 +37,20 @@ class RelationshipProtocol(Protocol[T]):
     
 RelationshipOrList = Union[RelationshipProtocol[T], List[T], List[RelationshipProtocol[T]]]
 
+# Column headers for the fixed-width rows yielded by the `iter_*` methods
+RACE_COLUMNS = (
+    'office', 'office_type', 'office_district', 'candidate', 'party',
+    'county', 'early_votes', 'election_day_votes', 'total_votes', 'percent_votes'
+)
+COUNTY_COLUMNS = (
+    'county_name', 'precincts_reporting', 'total_precincts', 'percent_reporting', 'registered_voters',
+    'voted_counted', 'turnout_percent', 'poll_locations', 'poll_locations_reporting', 'poll_locations_percent'
+)
+STATEWIDE_COLUMNS = (
+    'version', 'office', 'office_type', 'office_district', 'winner', 'winner_party', 'winner_margin',
+    'winner_percent', 'candidate', 'party', 'county', 'early_votes', 'election_day_votes', 'total_votes', 'percent'
+)
+
 
 class ElectionResultValidator(SQLModel, abc.ABC):
     model_config = ConfigDict(
@@ -59,11 +75,23 @@ class ResultVersionNumberBase(ElectionResultValidator):
     election_date: date = SQLModelField(alias='elecDate')
     # statewide: list[ElectionResultValidator] = SQLModelField(default_factory=list)
     # county: list[ElectionResultValidator] = SQLModelField(default_factory=list)
+    _index: Optional[ResultIndex] = PrivateAttr(default=None)
 
 
     
     def __repr__(cls) -> str:
         return f"{cls.__class__.__name__}({cls.election_date}-{cls.version_id})"
+
+    @property
+    def query(self) -> ResultIndex:
+        """Indexed lookups over this version, rebuilt when its races, counties or statewide offices are replaced"""
+        if self._index is None or not self._index.is_current(self):
+            self._index = ResultIndex(self)
+        return self._index
+
+    def invalidate_query(self) -> None:
+        """Rebuild the indexes on the next `query`, after changes `ResultIndex.is_current` does not see"""
+        self._index = None
     
     @field_validator('election_date', mode='before')
     @classmethod
@@ -74,17 +102,29 @@ class ResultVersionNumberBase(ElectionResultValidator):
             except ValueError:
                 pass
             
+    def iter_races(self) -> Iterator[Tuple]:
+        for race in self.races:
+            yield from race.iter_rows()
+
+    def iter_counties(self) -> Iterator[Tuple]:
+        for county in self.county.values():
+            yield tuple(getattr(county.summary, column) for column in COUNTY_COLUMNS)
+
+    def iter_statewide(self) -> Iterator[Tuple]:
+        for office in self.statewide.values():
+            yield from office.iter_rows()
+
     def flatten_races(self):
-        return [x.flatten() for x in self.races]
+        with metrics.span('flatten', output='races'):
+            return [dict(zip(RACE_COLUMNS, x)) for x in self.iter_races()]
     
     def flatten_counties(self):
-        return [x.summary.model_dump() for x in self.county.values()]
+        with metrics.span('flatten', output='counties'):
+            return [dict(zip(COUNTY_COLUMNS, x)) for x in self.iter_counties()]
 
     def flatten_statewide(self):
-        data = []
-        for office in self.statewide.values():
-            data.extend(office.flatten())
-        return data
+        with metrics.span('flatten', output='statewide'):
+            return [dict(zip(STATEWIDE_COLUMNS, x)) for x in self.iter_statewide()]
     
 
 class CandidateNameBase(ElectionResultValidator):
@@ -214,24 +254,25 @@ class RaceDetailsBase(ElectionResultValidator):
             # raise ValueError(f"Office: {self.office} Candidate vote totals are not complete - found zero values")
         return self
     
-    def flatten(self):
-        races = []
+    def iter_rows(self) -> Iterator[Tuple]:
+        """Yield one `RACE_COLUMNS` row per candidate per county"""
         for candidate in self.candidates:
-            race_details = {
-                'office': self.office,
-                'office_type': self.office_type,
-                'office_district': self.office_district,
-                'candidate': candidate.full_name,
-                'party': candidate.party
-            }
             for county in candidate.county_results:
-                race_details['county'] = county.county
-                race_details['early_votes'] = county.early_votes
-                race_details['election_day_votes'] = county.election_day_votes
-                race_details['total_votes'] = county.total_votes
-                race_details['percent_votes'] = county.percent
-                races.append(race_details)
-        return races
+                yield (
+                    self.office,
+                    self.office_type,
+                    self.office_district,
+                    candidate.full_name,
+                    candidate.party,
+                    county.county,
+                    county.early_votes,
+                    county.total_votes - county.early_votes,
+                    county.total_votes,
+                    county.percent,
+                )
+
+    def flatten(self):
+        return [dict(zip(RACE_COLUMNS, x)) for x in self.iter_rows()]
     
     _set_office_type = model_validator(mode='before')(funcs.set_office_type)
 
@@ -370,49 +411,42 @@ class StatewideOfficeSummaryBase(ElectionResultValidator):
     def check_for_winner(self):
         if self.candidates:
             _vote_totals = sorted([x.total_votes for x in self.candidates])
-            _winner = next(x for x in self.candidates if x.total_votes == max(x.total_votes for x in self.candidates))
+            _winner = next(x for x in self.candidates if x.total_votes == _vote_totals[-1])
             self.winner = _winner.name
             self.winner_party = _winner.party
             if len(_vote_totals) > 1:
-                if sum(_vote_totals) != 0:
+                _vote_sum = sum(_vote_totals)
+                if _vote_sum != 0:
                     self.winner_margin = _vote_totals[-1] - _vote_totals[-2]
-                    self.winner_percent = _winner.total_votes / sum(x.total_votes for x in self.candidates)
+                    self.winner_percent = _winner.total_votes / _vote_sum
             else:
                 self.winner_margin = 0
                 self.winner_percent = 100
         return self
 
-    def flatten(self):
-        """Convert office data to hashable format for deduplication"""
-        all_office_data = set()
-
-        base_data = {
-            'version': self.version_id,
-            'office': self.name,
-            'office_type': self.office_type,
-            'office_district': self.office_district,
-            'winner': self.winner,
-            'winner_party': self.winner_party,
-            'winner_margin': self.winner_margin,
-            'winner_percent': self.winner_percent,
-        }
-
+    def iter_rows(self) -> Iterator[Tuple]:
+        """Yield one `STATEWIDE_COLUMNS` row per candidate per county"""
+        base_data = (
+            self.version_id,
+            self.name,
+            self.office_type,
+            self.office_district,
+            self.winner,
+            self.winner_party,
+            self.winner_margin,
+            self.winner_percent,
+        )
         for candidate in self.candidates:
             for county in candidate.county_results:
-                # Create new dict for each county result
-                row_data = {
-                    **base_data,
-                    'candidate': candidate.name,
-                    'party': candidate.party,
-                    'county': county.county,
-                    'early_votes': county.early_votes,
-                    'election_day_votes': county.election_day_votes,
-                    'total_votes': county.total_votes,
-                    'percent': county.percent
-                }
-                # Convert to hashable tuple of key-value pairs
-                hashable_data = frozenset(row_data.items())
-                all_office_data.add(hashable_data)
-
-        # Convert back to list of dicts
-        return [dict(data) for data in all_office_data]
\ No newline at end of file
+                yield base_data + (
+                    candidate.name,
+                    candidate.party,
+                    county.county,
+                    county.early_votes,
+                    county.total_votes - county.early_votes,
+                    county.total_votes,
+                    county.percent,
+                )
+
+    def flatten(self):
+        return [dict(zip(STATEWIDE_COLUMNS, x)) for x in self.iter_rows()]
\ No newline at end of file
@@ -0,0 +1,282 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from pathlib import Path
+import multiprocessing as mp
+
+from sqlmodel import SQLModel
+
+from texas_result_scraper.scraper import ElectionResultTicker, db
+from texas_result_scraper.flat_file import DATA_DIR, GitHubFile
+from texas_result_scraper.db_writer import BulkWriter
+from texas_result_scraper.timeseries import ResultTimeSeries
+from texas_result_scraper import snapshot
+from texas_result_scraper.instrumentation import metrics
+
+
+# Raw responses for one version: {'version': Version.json, 'county': County.json values, 'statewide': OfficeSummary OS}
+Payload = Dict[str, Any]
+Sink = Callable[[SQLModel], Any]
+# Builds a sink for a ticker; module-level functions (or partials of them) so they can be sent to worker processes
+SinkFactory = Callable[[ElectionResultTicker], Sink]
+# Told once a version has been built and every sink is done with it: (version id, errors of the build and sinks)
+VersionDone = Callable[[int, List[str]], None]
+
+_DONE = object()
+# Seconds a put to a sink process's queue waits before checking that the process is still alive
+PUT_TIMEOUT = 1.0
+
+
+def fetch_payload(ticker: ElectionResultTicker, version: Optional[Dict] = None) -> Payload:
+    """Fetch the newest version, unless already known, then its county and statewide files side by side"""
+    version = version or ticker.fetch_version()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        county = pool.submit(ticker.fetch_county_data, version['___versionNo'])
+        statewide = pool.submit(ticker.fetch_statewide_data, version['___versionNo'])
+        return {'version': version, 'county': county.result(), 'statewide': statewide.result()}
+
+
+def file_sink(ticker: ElectionResultTicker, csv: bool = True, parquet: bool = True) -> Sink:
+    """CSV and/or Parquet outputs through one `GitHubFile`, so a single writer owns the manifest"""
+    output = GitHubFile(ticker)
+
+    def write(version_no: SQLModel) -> GitHubFile:
+        output.use(version_no)
+        if csv:
+            output.create_csv_files()
+        if parquet:
+            output.create_parquet_files()
+        return output
+    return write
+
+
+def db_sink(ticker: ElectionResultTicker, url: Optional[str] = None) -> Sink:
+    """Incremental result table writes, to `url` or the configured engine"""
+    engine = db.create_db_engine(db.DBSettings.load()) if url is None else db.create_db_engine(db.DBSettings(url=url))
+    writer = BulkWriter(engine)
+    writer.create_tables()
+    return writer.refresh
+
+
+def timeseries_sink(ticker: ElectionResultTicker, directory: Path = DATA_DIR) -> Sink:
+    """Each version's changed vote counts appended to the election's `ResultTimeSeries` in `directory`"""
+    return ResultTimeSeries.for_election(Path(directory), ticker.election_id).append
+
+
+def _error(e: BaseException) -> str:
+    return f'{type(e).__name__}: {e}'
+
+
+def _sink_process(election_id: int, name: str, factory: SinkFactory, inbox: mp.Queue, results: mp.Queue) -> None:
+    """Worker process: rebuild each version from its trusted snapshot and hand it to the sink"""
+    sink = factory(ElectionResultTicker(election_id=election_id).create_file())
+    for seq, packed in iter(inbox.get, None):
+        _start = perf_counter()
+        try:
+            sink(snapshot.loads(packed))
+            results.put((name, seq, perf_counter() - _start, None))
+        except Exception as e:
+            results.put((name, seq, perf_counter() - _start, _error(e)))
+    results.put((name, None, None, None))
+
+
+@dataclass
+class ResultPipeline:
+    """
+    Fetch, build and write as concurrent stages joined by bounded queues.
+
+    One thread fetches payloads, one builds them into models with the ticker and each sink writes on its own
+    thread. A full queue blocks the stage feeding it, so a slow writer holds back building instead of letting
+    built versions pile up.
+
+    Building and writing are pure Python, so threads only overlap them with network and disk waits. With
+    `processes=True` each sink runs in its own process and receives versions as msgpack snapshots, and on a
+    multi-core runner the time per version approaches that of the slowest stage.
+
+    `on_version` hears of each version as soon as its build and every sink are done with it, with any errors,
+    while errors are otherwise only raised once the whole run has stopped.
+    """
+    ticker: ElectionResultTicker
+    sinks: Dict[str, SinkFactory]
+    maxsize: int = 2
+    processes: bool = False
+    on_version: Optional[VersionDone] = field(default=None, repr=False)
+    timings: Dict[str, List[float]] = field(default_factory=dict)
+    errors: List[BaseException] = field(default_factory=list)
+    # Build sequence number -> [sinks still writing, errors, version id]
+    _pending: Dict[int, List] = field(default_factory=dict, repr=False)
+    _lock: Lock = field(default_factory=Lock, repr=False)
+
+    def _record(self, stage: str, seconds: float) -> None:
+        self.timings.setdefault(stage, []).append(seconds)
+
+    def _timed(self, stage: str, func: Callable, *args) -> Any:
+        _start = perf_counter()
+        result = func(*args)
+        self._record(stage, perf_counter() - _start)
+        return result
+
+    def _fetch(self, payloads: Iterator[Payload], out: Queue) -> None:
+        try:
+            while True:
+                try:
+                    payload = self._timed('fetch', next, payloads)
+                except StopIteration:
+                    break
+                out.put(payload)
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            out.put(_DONE)
+
+    def _report(self, version_id: int, errors: List[str]) -> None:
+        if self.on_version is not None:
+            self.on_version(version_id, errors)
+
+    def _finish(self, seq: int, error: Optional[str] = None) -> None:
+        """One sink is done with the version built as `seq`; report the version once all of them are"""
+        with self._lock:
+            entry = self._pending[seq]
+            entry[0] -= 1
+            if error is not None:
+                entry[1].append(error)
+            if entry[0]:
+                return
+            del self._pending[seq]
+        self._report(entry[2], entry[1])
+
+    @staticmethod
+    def _put(out: Any, item: Any, worker: Optional[mp.Process]) -> None:
+        """Put `item` on a sink's queue, failing instead of blocking for good once its process has died"""
+        if worker is None:
+            return out.put(item)
+        while True:
+            try:
+                return out.put(item, timeout=PUT_TIMEOUT)
+            except Full:
+                if not worker.is_alive():
+                    # Nothing will read what is already queued; do not wait on flushing it at exit either
+                    out.cancel_join_thread()
+                    raise RuntimeError(f'{worker.name} sink process exited with code {worker.exitcode}')
+
+    def _build(self, inbox: Queue, outs: List[Any], built: List[int], done: Any, workers: Sequence = ()) -> None:
+        _workers = list(workers) or [None] * len(outs)
+        for seq, payload in enumerate(iter(inbox.get, _DONE)):
+            try:
+                self._timed(
+                    'build',
+                    lambda: self.ticker.load_raw(payload['version'], payload['county'], payload['statewide']).create_models()
+                )
+                version_no = self.ticker.version_no
+                if self.processes:
+                    version_no = self._timed('pack', snapshot.dumps, version_no)
+            except Exception as e:
+                # Keep draining so the fetch stage never blocks on a full queue
+                self.errors.append(e)
+                self._report(payload['version']['___versionNo'], [_error(e)])
+                continue
+            built.append(self.ticker.version_no.version_id)
+            self._pending[seq] = [len(outs) + 1, [], self.ticker.version_no.version_id]
+            for i, out in enumerate(outs):
+                if out is None:
+                    self._finish(seq, f'{_workers[i].name} sink process is gone')
+                    continue
+                try:
+                    self._put(out, (seq, version_no), _workers[i])
+                except RuntimeError as e:
+                    # Stop feeding a dead sink; the others keep receiving versions
+                    self.errors.append(e)
+                    outs[i] = None
+                    self._finish(seq, _error(e))
+            # The build's own share, so a version with no sinks is reported too
+            self._finish(seq)
+            # Report each version as it is built; writes still in flight are in the next report
+            metrics.flush()
+        for out, worker in zip(outs, _workers):
+            if out is None:
+                continue
+            try:
+                self._put(out, done, worker)
+            except RuntimeError as e:
+                self.errors.append(e)
+
+    def _write(self, name: str, sink: Sink, inbox: Queue) -> None:
+        for seq, version_no in iter(inbox.get, _DONE):
+            try:
+                self._timed(name, sink, version_no)
+            except Exception as e:
+                self.errors.append(e)
+                self._finish(seq, f'{name}: {_error(e)}')
+            else:
+                self._finish(seq)
+
+    def _poll(self, polls: int, interval: float) -> Iterator[Payload]:
+        for i in range(polls):
+            if i:
+                sleep(interval)
+            yield fetch_payload(self.ticker)
+
+    def run(self, payloads: Optional[Iterable[Payload]] = None, polls: int = 1, interval: float = 60.0) -> List[int]:
+        """
+        Process recorded `payloads` in order, or fetch `polls` live versions `interval` seconds apart, and return
+        the version ids built. The first error raised in any stage is re-raised once every stage has stopped.
+        """
+        source = iter(payloads) if payloads is not None else self._poll(polls, interval)
+        fetched = Queue(maxsize=self.maxsize)
+        built: List[int] = []
+        threads = [Thread(target=self._fetch, args=(source, fetched), name='fetch')]
+        workers = []
+        if self.processes:
+            results = mp.Queue()
+            outboxes = [mp.Queue(maxsize=self.maxsize) for _ in self.sinks]
+            workers = [
+                mp.Process(
+                    target=_sink_process,
+                    args=(self.ticker.election_id, name, factory, outbox, results),
+                    name=name,
+                    daemon=True
+                )
+                for (name, factory), outbox in zip(self.sinks.items(), outboxes)
+            ]
+            threads.append(Thread(target=self._build, args=(fetched, outboxes, built, None, workers), name='build'))
+        else:
+            outboxes = [Queue(maxsize=self.maxsize) for _ in self.sinks]
+            threads.append(Thread(target=self._build, args=(fetched, outboxes, built, _DONE), name='build'))
+            threads.extend(
+                Thread(target=self._write, args=(name, factory(self.ticker), outbox), name=name)
+                for (name, factory), outbox in zip(self.sinks.items(), outboxes)
+            )
+        for worker in workers:
+            worker.start()
+        for thread in threads:
+            thread.start()
+        # Drain worker results before joining them; a process cannot exit with unread queue data
+        running = len(workers)
+        while running:
+            try:
+                name, seq, seconds, error = results.get(timeout=1)
+            except Empty:
+                if not any(x.is_alive() for x in workers):
+                    self.errors.append(RuntimeError("A sink process exited without finishing"))
+                    break
+                continue
+            if seconds is None:
+                running -= 1
+                continue
+            if error is not None:
+                self.errors.append(RuntimeError(f'{name} sink failed: {error}'))
+                self._finish(seq, f'{name}: {error}')
+            else:
+                self._record(name, seconds)
+                self._finish(seq)
+        for thread in threads:
+            thread.join()
+        for worker in workers:
+            worker.join()
+        metrics.flush()
+        if self.errors:
+            raise self.errors[0]
+        return built
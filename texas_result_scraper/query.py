@@ -0,0 +1,115 @@
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+import re
+
+from sqlmodel import SQLModel
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Candidate name key: upper-case, no incumbent marker or punctuation, single spaces"""
+    if not name:
+        return ''
+    _name = re.sub(r'[^\w\s/]', ' ', name.upper().replace('(I)', ''))
+    return ' '.join(_name.split())
+
+
+def _key(value: Optional[str]) -> str:
+    return (value or '').upper()
+
+
+def _containers(version_no: SQLModel) -> Tuple:
+    return version_no.races, version_no.county, version_no.statewide
+
+
+class ResultIndex:
+    """
+    Secondary indexes over one `ResultVersionNumberPublic`, built in a single pass.
+
+    Lookups return the model objects held by the version itself. Race filters are answered by
+    intersecting the index entries for each criterion, starting from the smallest.
+    """
+
+    def __init__(self, version_no: SQLModel):
+        self.version_no = version_no
+        self.version_id = version_no.version_id
+        # The containers themselves rather than their ids, so a freed one cannot pass for a new one
+        self._containers = _containers(version_no)
+        self._sizes = tuple(len(x) for x in self._containers)
+        self.race_by_id: Dict[int, SQLModel] = {}
+        self.by_office_type: Dict[str, List[SQLModel]] = defaultdict(list)
+        self.by_district: Dict[Tuple[str, str], List[SQLModel]] = defaultdict(list)
+        self.by_county: Dict[str, List[SQLModel]] = defaultdict(list)
+        self.candidate_by_id: Dict[int, Tuple[SQLModel, SQLModel]] = {}
+        self.by_candidate_name: Dict[str, List[Tuple[SQLModel, SQLModel]]] = defaultdict(list)
+        self.statewide_by_office_type: Dict[str, List[SQLModel]] = defaultdict(list)
+
+        for race in version_no.races:
+            self.race_by_id[race.race_id] = race
+            self.by_office_type[_key(race.office_type)].append(race)
+            self.by_district[(_key(race.office_type), _key(race.office_district))].append(race)
+            for county in dict.fromkeys(x.county for x in race.counties):
+                self.by_county[county].append(race)
+            for candidate in race.candidates:
+                self.candidate_by_id[candidate.candidate_id] = (race, candidate)
+                self.by_candidate_name[normalize_name(candidate.full_name)].append((race, candidate))
+        for office in version_no.statewide.values():
+            self.statewide_by_office_type[_key(office.office_type)].append(office)
+
+    def is_current(self, version_no: SQLModel) -> bool:
+        """
+        Whether the indexes still describe `version_no`, in constant time: the same version id and the same
+        races, county and statewide containers at the sizes they were indexed at. Models changed or replaced
+        in place are not seen; `create_models` drops the index after each build, as `invalidate_query` does.
+        """
+        return self.version_id == version_no.version_id and all(
+            x is y and len(y) == n for x, y, n in zip(self._containers, _containers(version_no), self._sizes)
+        )
+
+    def races(
+            self,
+            office_type: Optional[str] = None,
+            district: Optional[str] = None,
+            county: Optional[str] = None) -> List[SQLModel]:
+        """Races matching every criterion given, e.g. `races('HD', county='HARRIS')`, in version order"""
+        if district is not None and office_type is None:
+            raise ValueError("A district lookup needs an office_type")
+        candidates = []
+        if office_type is not None:
+            if district is not None:
+                candidates.append(self.by_district.get((_key(office_type), _key(str(district))), []))
+            else:
+                candidates.append(self.by_office_type.get(_key(office_type), []))
+        if county is not None:
+            candidates.append(self.by_county.get(_key(county), []))
+        if not candidates:
+            return list(self.race_by_id.values())
+        candidates.sort(key=len)
+        _first, *_rest = candidates
+        if not _rest:
+            return list(_first)
+        _ids = set.intersection(*({x.race_id for x in _races} for _races in _rest))
+        return [x for x in _first if x.race_id in _ids]
+
+    def race(self, race_id: int) -> Optional[SQLModel]:
+        return self.race_by_id.get(race_id)
+
+    def candidate(self, candidate_id: int) -> Optional[Tuple[SQLModel, SQLModel]]:
+        """(race, candidate) for a candidate id"""
+        return self.candidate_by_id.get(candidate_id)
+
+    def candidates(self, name: str) -> List[Tuple[SQLModel, SQLModel]]:
+        """(race, candidate) pairs whose normalized full name matches `name`"""
+        return list(self.by_candidate_name.get(normalize_name(name), []))
+
+    def statewide(self, office_type: str) -> List[SQLModel]:
+        return list(self.statewide_by_office_type.get(_key(office_type), []))
+
+    def county_results(self, county: str, office_type: Optional[str] = None) -> List[Tuple[SQLModel, SQLModel, SQLModel]]:
+        """(race, candidate, county result) for every candidate result reported by one county"""
+        _county = _key(county)
+        return [
+            (race, candidate, result)
+            for race in self.races(office_type=office_type, county=_county)
+            for candidate in race.candidates
+            for result in candidate.county_results if result.county == _county
+        ]
@@ -0,0 +1,102 @@
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from pathlib import Path
+import gzip
+import json
+import re
+
+
+# Response files of one version, as served under `.../<electionId>/<versionNo>/`
+FILES = ('Version', 'County', 'OfficeSummary')
+
+_DIR_NAME = re.compile(r'tx-(\d+)-(\d+)$')
+
+
+def recording_dir(directory: Path, election_id: int, version_id: int) -> Path:
+    return Path(directory) / f'tx-{election_id}-{version_id}'
+
+
+def ids(directory: Path) -> Optional[Tuple[int, int]]:
+    """(election id, version id) from a `tx-<election_id>-<version_id>` directory name"""
+    match = _DIR_NAME.match(Path(directory).name)
+    return (int(match[1]), int(match[2])) if match else None
+
+
+def save(directory: Path, responses: Dict[str, Dict]) -> Path:
+    """Write each response as gzipped JSON, e.g. `County.json.gz`"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in FILES:
+        with gzip.open(directory / f'{name}.json.gz', 'wt', encoding='utf-8') as f:
+            json.dump(responses[name], f, separators=(',', ':'))
+    return directory
+
+
+def load(directory: Path) -> Dict[str, Dict]:
+    """Responses keyed by file name, from `<name>.json.gz` or plain `<name>.json` files"""
+    directory = Path(directory)
+    responses = {}
+    for name in FILES:
+        _gz = directory / f'{name}.json.gz'
+        with (gzip.open(_gz, 'rt', encoding='utf-8') if _gz.exists() else open(directory / f'{name}.json')) as f:
+            responses[name] = json.load(f)
+    return responses
+
+
+def is_recording(directory: Path) -> bool:
+    directory = Path(directory)
+    return all((directory / f'{x}.json.gz').exists() or (directory / f'{x}.json').exists() for x in FILES)
+
+
+def find(
+        directory: Path,
+        election_ids: Optional[Iterable[int]] = None,
+        version_ids: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, int, Path]]:
+    """(election id, version id, path) of each `tx-<election_id>-<version_id>` recording, oldest version first"""
+    _elections = set(election_ids) if election_ids else None
+    _versions = set(version_ids) if version_ids else None
+    found = []
+    for path in Path(directory).iterdir():
+        _ids = ids(path)
+        if _ids is None or not is_recording(path):
+            continue
+        election_id, version_id = _ids
+        if (_elections is None or election_id in _elections) and (_versions is None or version_id in _versions):
+            found.append((election_id, version_id, path))
+    yield from sorted(found)
+
+
+def payload(responses: Dict[str, Dict]) -> Dict:
+    """The `pipeline.Payload` form of the responses, as the ticker's `fetch_*` methods return them"""
+    return {
+        'version': responses['Version'],
+        'county': list(responses['County'].values()),
+        'statewide': responses['OfficeSummary']['OS'],
+    }
+
+
+def responses(payload: Dict) -> Dict[str, Dict]:
+    """The served form of a `pipeline.Payload`, for `save`"""
+    return {
+        'Version': payload['version'],
+        'County': {x['N']: x for x in payload['county']},
+        'OfficeSummary': {'OS': payload['statewide']},
+    }
+
+
+class _Response:
+    def __init__(self, data: Dict):
+        self.data = data
+        self.content = json.dumps(data).encode()
+
+    def json(self) -> Dict:
+        return self.data
+
+
+class ReplayScraper:
+    """Stands in for the ticker's `scraper`, serving recorded responses by file name instead of fetching"""
+
+    def __init__(self, responses: Dict[str, Dict]):
+        self.responses = responses
+
+    def get(self, url: str) -> _Response:
+        return _Response(self.responses[url.rsplit('/', 1)[-1].removesuffix('.json')])
@@ -12,6 +12,9 @@ import cfscrape
 from utils import db, TomlReader
 import model_groups as model
 import models.bases as base
+from texas_result_scraper.winners import WinnerCalculator
+from texas_result_scraper.db_writer import BulkWriter
+from texas_result_scraper.instrumentation import metrics
 
 EXAMPLES = (47009, 242), (47010, 278), (49681, 665), (49666, 661)
 
@@ -52,44 +55,62 @@ class TickerFuncs(TickerVars, abc.ABC):
         self.models = model.FileModels
         return self
     
-    def _get_newest_version(self):
-        _version = self.scraper.get(
+    def _get(self, url: str) -> Any:
+        _file = url.rsplit('/', 1)[-1]
+        with metrics.span('fetch', file=_file):
+            response = self.scraper.get(url)
+        if metrics.enabled:
+            metrics.count('bytes_fetched', len(response.content), file=_file)
+        with metrics.span('decode', file=_file):
+            return response.json()
+
+    def fetch_version(self) -> Dict:
+        return self._get(
             self.url_file['result_version_url'].format(
                 electionId=self.election_id
             )
-        ).json()
-        self.version_no = self.models.ResultVersionNumber(
-            version_id=_version['___versionNo'],
-            election_date=_version['elecDate'],
-            election_id=self.election_id,
         )
-        return self
-    
-    def _get_county_data(self):
-        _county_data = list(self.scraper.get(
+
+    def fetch_county_data(self, version_id: int) -> List[Dict]:
+        return list(self._get(
             self.url_file[
                 'county_url'
             ]
             .format(
                 electionId=self.election_id,
-                versionNo=self.version_no.version_id
+                versionNo=version_id
             )
-        ).json().values())
-        self.county_raw = _county_data
-        return self.county_raw
-    
-    
-    def _get_statewide_data(self):
-        _statewide_data = self.scraper.get(
+        ).values())
+
+    def fetch_statewide_data(self, version_id: int) -> List[Dict]:
+        return self._get(
             self.url_file[
                 'office_url'
             ]
             .format(
                 electionId=self.election_id,
-                versionNo=self.version_no.version_id
+                versionNo=version_id
             )
-        ).json()['OS']
-        self.state_raw = _statewide_data
+        )['OS']
+
+    def _set_version(self, _version: Dict):
+        self.version_no = self.models.ResultVersionNumber(
+            version_id=_version['___versionNo'],
+            election_date=_version['elecDate'],
+            election_id=self.election_id,
+        )
+        return self
+
+    def _get_newest_version(self):
+        return self._set_version(self.fetch_version())
+    
+    def _get_county_data(self):
+        self.county_raw = self.fetch_county_data(self.version_no.version_id)
+        return self.county_raw
+    
+    
+    def _get_statewide_data(self):
+        self.state_raw = self.fetch_statewide_data(self.version_no.version_id)
         return self.state_raw
         
     def pull_data(self):
@@ -97,11 +118,36 @@ class TickerFuncs(TickerVars, abc.ABC):
         self._get_county_data()
         self._get_statewide_data()
         return self
+
+    def load_raw(self, version: Dict, county: List[Dict], statewide: List[Dict]):
+        """Use already fetched payloads, e.g. from a separate fetch stage or a recording, in place of `pull_data`"""
+        self._set_version(version)
+        self.county_raw = county
+        self.state_raw = statewide
+        return self
     
     def create_models(self):
-        self._setup_county_data()
-        self._setup_statewide_data()
+        with metrics.span('county_build'):
+            self._setup_county_data()
+        with metrics.span('statewide_build'):
+            self._setup_statewide_data()
+        self.version_no.invalidate_query()
+        if metrics.enabled:
+            self._count_models()
         return self
+
+    def _count_models(self):
+        """Counties, races and candidates in the raw version just built"""
+        _races = {race['OID'] for county in self.county_raw for race in county['Races'].values()}
+        _candidates = {
+            candidate['id']
+            for county in self.county_raw
+            for race in county['Races'].values()
+            for candidate in race['C'].values()
+        }
+        metrics.count('counties', len(self.county_raw))
+        metrics.count('races', len(_races))
+        metrics.count('candidates', len(_candidates))
     
     @abc.abstractmethod
     def _setup_county_data(self):
@@ -217,13 +263,20 @@ class FileTickerFuncs(TickerFuncs):
     counties: Dict[str, Any] = field(default_factory=dict)
     races: dict[str, Any] = field(default_factory=dict)
     candidates: dict[str, Any] = field(default_factory=dict)
+    winners: WinnerCalculator = field(default_factory=WinnerCalculator)
     
     def __init__(self, **data):
         super().__init__(**data)
         self.models = model.FileModels
+
+    def create_models(self):
+        # Races and counties belong to one version; start each build empty so the last version's objects are not reused
+        self.counties = {}
+        self.races = {}
+        return super().create_models()
         
     def _setup_county_data(self):
-        for _county in self._get_county_data():
+        for _county in self.county_raw or self._get_county_data():
             c = self.models.County(
                 name=_county['N'],
                 registered_voters=_county['TV'],
@@ -259,6 +312,7 @@ class FileTickerFuncs(TickerFuncs):
                         office=race['ON'],
                     )
                     self.races[race_id] = _state_race_data
+                    self.version_no.races.append(_state_race_data)
                     
                 _county_race_data = next((x for x in _state_race_data.counties if x.county == c.name), None)
                 if not _county_race_data:
@@ -303,7 +357,6 @@ class FileTickerFuncs(TickerFuncs):
                     # self.candidates.update({_candidate_id: _candidate_name})
                     _state_race_data.candidates.append(_candidate_name)              
                 self.races[race_id] = _state_race_data
-                self.version_no.races.append(_state_race_data)
             # self.county_data.append(c)
         self.version_no.county = self.counties
         # self.version_no.races.append()
@@ -313,14 +366,14 @@ class FileTickerFuncs(TickerFuncs):
     def _setup_statewide_data(self):
         _offices = {}
         _candidates = {}
-        for office in self._get_statewide_data():
+        for office in self.state_raw or self._get_statewide_data():
             office_summary = self.models.StatewideOfficeSummary(
                 office_id=office['OID'],
                 name=office['ON'],
                 version_id=self.version_no.version_id,
             )
             for x in office['C']:
-                _office_data = next((x for x in self.version_no.races if x.race_id == office['OID']), None)
+                _office_data = self.races.get(office['OID'])
                 if _office_data:
                     for _candidate_data in _office_data.candidates:
                         if _candidate_data.full_name == x['N']:
@@ -339,7 +392,6 @@ class FileTickerFuncs(TickerFuncs):
                             _candidate.county_results = _candidate_data.county_results
                             _candidates[_candidate_data.candidate_id] = _candidate
                             office_summary.candidates.append(_candidate)
-            office_summary.check_for_winner()
             _offices[office_summary.office_id] = office_summary
             # for candidate in office_summary.candidates:
             #     for county in self.counties:
@@ -350,18 +402,31 @@ class FileTickerFuncs(TickerFuncs):
             #                     # candidate.candidate_id = each_candidate.id
             #                     candidate.candidate_data.append(each_candidate)
             # self.statewide_data = offices.values()
+        self.winners.update(_offices.values())
         self.version_no.statewide = _offices
         return self
 
 
 @dataclass
 class ElectionResultTicker(FileTickerFuncs):
-    
+    db_writer: Optional[BulkWriter] = field(default=None, repr=False)
     
     def _update_data(self):
         self.get_newest_version()
         sleep(5)
         return self
+
+    def write_db(self, engine: Optional[Engine] = None, incremental: bool = True) -> Dict[str, int]:
+        """
+        Write the current version to the result tables, creating them if needed.
+        With `incremental` only the rows that changed since the last write are sent.
+        """
+        if self.db_writer is None or (engine is not None and engine is not self.db_writer.engine):
+            self.db_writer = BulkWriter(engine or db.engine)
+            self.db_writer.create_tables()
+        if incremental:
+            return self.db_writer.refresh(self.version_no)
+        return self.db_writer.write(self.version_no)
     
     
     # def initial_setup(self):
@@ -0,0 +1,214 @@
+from typing import Any, Dict, List, Optional, Tuple, Type
+from datetime import date
+import struct
+from operator import attrgetter
+
+import msgpack
+from sqlmodel import SQLModel
+from pydantic.fields import FieldInfo
+from pydantic_extra_types.color import Color
+
+from texas_result_scraper import model_groups as model
+
+
+MAGIC = b'TXRS'
+SCHEMA_VERSION = 1
+HEADER = struct.Struct('>4sH')
+
+# Fields holding nested models; everything else on a model is packed as a plain scalar
+NESTED = {
+    'ResultVersionNumber': {'statewide', 'county', 'races'},
+    'County': {'summary'},
+    'CountySummary': set(),
+    'RaceDetails': {'candidates', 'counties'},
+    'CountyRaceDetails': {'office_summary'},
+    'CandidateName': {'county_results'},
+    'CandidateCountyResults': set(),
+    'StatewideOfficeSummary': {'candidates', 'race_data', 'version_number'},
+    'StatewideCandidateSummary': {'county_results'},
+}
+# Scalars stored as strings in the snapshot and turned back into their field types on load
+CONVERTED = ('color', 'election_date')
+
+
+def _scalar_fields(models: model.ModelGroup) -> Dict[str, List[str]]:
+    return {
+        name: [x for x in getattr(models, name).model_fields if x not in nested]
+        for name, nested in NESTED.items()
+    }
+
+
+def _pack_value(value: Any) -> Any:
+    if isinstance(value, Color):
+        return value.as_hex()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class Packer:
+    """Packs models into positional scalar lists; each `race`/`county`/`office` section stands on its own"""
+
+    def __init__(self, models: model.ModelGroup = model.FileModels):
+        self.fields = _scalar_fields(models)
+        self._getters = {name: attrgetter(*x) for name, x in self.fields.items()}
+        self._converted = {name: [i for i, k in enumerate(x) if k in CONVERTED] for name, x in self.fields.items()}
+
+    def scalars(self, name: str, obj: SQLModel) -> List[Any]:
+        values = list(self._getters[name](obj))
+        for i in self._converted[name]:
+            values[i] = _pack_value(values[i])
+        return values
+
+    def results(self, results: List[SQLModel]) -> List[List[Any]]:
+        return [self.scalars('CandidateCountyResults', x) for x in results]
+
+    def race(self, race: SQLModel, county: str = None) -> List[Any]:
+        """A race with its candidates and county details, optionally narrowed to the rows of one county"""
+        # The race totals are only summed from its counties on demand; pack the summed ones, not the 0 defaults
+        race.update_counts()
+        if county is None:
+            candidates = [[self.scalars('CandidateName', x), self.results(x.county_results)] for x in race.candidates]
+            counties = race.counties
+        else:
+            candidates = []
+            for x in race.candidates:
+                if _results := [r for r in x.county_results if r.county == county]:
+                    candidates.append([self.scalars('CandidateName', x), self.results(_results)])
+            counties = [x for x in race.counties if x.county == county]
+        return [
+            self.scalars('RaceDetails', race),
+            candidates,
+            [self.scalars('CountyRaceDetails', x) for x in counties],
+        ]
+
+    def county(self, county: SQLModel) -> List[Any]:
+        return [
+            self.scalars('County', county),
+            self.scalars('CountySummary', county.summary) if county.summary else None,
+        ]
+
+    def office(self, office: SQLModel) -> List[Any]:
+        return [
+            self.scalars('StatewideOfficeSummary', office),
+            [[self.scalars('StatewideCandidateSummary', x), self.results(x.county_results)] for x in office.candidates],
+        ]
+
+
+class Unpacker:
+    """Rebuilds models from `Packer` sections, skipping validation when the snapshot is trusted"""
+
+    def __init__(self, fields: Dict[str, List[str]], models: model.ModelGroup = model.FileModels, trusted: bool = True):
+        self.models = models
+        self.fields = fields
+        self.trusted = trusted
+        self._colors: Dict[str, Color] = {}
+        self._layouts: Dict[str, Tuple[Type[SQLModel], List[Tuple[str, Optional[int], FieldInfo]]]] = {}
+
+    def _layout(self, name: str) -> Tuple[Type[SQLModel], List[Tuple[str, Optional[int], FieldInfo]]]:
+        """Model class and, in field order, each field's position in the packed values (None if not packed)"""
+        if name not in self._layouts:
+            cls: Type[SQLModel] = getattr(self.models, name)
+            _positions = {x: i for i, x in enumerate(self.fields[name])}
+            self._layouts[name] = cls, [(k, _positions.get(k), v) for k, v in cls.model_fields.items()]
+        return self._layouts[name]
+
+    def _value(self, field: str, value: Any) -> Any:
+        if value is None:
+            return value
+        if field == 'color':
+            if value not in self._colors:
+                self._colors[value] = Color(value)
+            return self._colors[value]
+        if field == 'election_date':
+            return date.fromisoformat(value)
+        return value
+
+    def build(self, name: str, values: List[Any], **nested) -> SQLModel:
+        cls, layout = self._layout(name)
+        if self.trusted:
+            # Same end state as `model_construct`, without re-inspecting the model fields for every instance
+            _data = {}
+            for k, i, info in layout:
+                if k in nested:
+                    _data[k] = nested[k]
+                elif i is not None:
+                    _data[k] = self._value(k, values[i])
+                else:
+                    _data[k] = info.get_default(call_default_factory=True)
+            obj = cls.__new__(cls)
+            object.__setattr__(obj, '__dict__', _data)
+            object.__setattr__(obj, '__pydantic_fields_set__', set(_data))
+            object.__setattr__(obj, '__pydantic_extra__', None)
+            object.__setattr__(obj, '__pydantic_private__', {
+                k: v.get_default() for k, v in cls.__private_attributes__.items()
+            } or None)
+            return obj
+        # Like the JSON snapshot written with `exclude_none`, leave unset values to the field defaults
+        kwargs = {k: values[i] for k, i, _ in layout if i is not None and values[i] is not None}
+        return cls(**kwargs, **nested)
+
+    def results(self, rows: List[List[Any]]) -> List[SQLModel]:
+        return [self.build('CandidateCountyResults', x) for x in rows]
+
+    def race(self, packed: List[Any]) -> SQLModel:
+        _race, _candidates, _counties = packed
+        return self.build(
+            'RaceDetails',
+            _race,
+            candidates=[self.build('CandidateName', x, county_results=self.results(r)) for x, r in _candidates],
+            counties=[self.build('CountyRaceDetails', x) for x in _counties],
+        )
+
+    def county(self, packed: List[Any]) -> SQLModel:
+        _county, _summary = packed
+        return self.build(
+            'County',
+            _county,
+            summary=self.build('CountySummary', _summary) if _summary is not None else None
+        )
+
+    def office(self, packed: List[Any]) -> SQLModel:
+        _office, _candidates = packed
+        return self.build(
+            'StatewideOfficeSummary',
+            _office,
+            candidates=[
+                self.build('StatewideCandidateSummary', x, county_results=self.results(r)) for x, r in _candidates
+            ],
+        )
+
+
+def check_header(header: Tuple[bytes, int], magic: bytes = MAGIC) -> None:
+    _magic, schema_version = header[:2]
+    if _magic != magic:
+        raise ValueError("Not a result snapshot")
+    if schema_version > SCHEMA_VERSION:
+        raise ValueError(f"Snapshot schema version {schema_version} is newer than supported version {SCHEMA_VERSION}")
+
+
+def dumps(version_no: SQLModel, models: model.ModelGroup = model.FileModels) -> bytes:
+    """Pack a `ResultVersionNumberPublic` tree into a versioned msgpack snapshot"""
+    pack = Packer(models)
+    body = {
+        'fields': pack.fields,
+        'version': pack.scalars('ResultVersionNumber', version_no),
+        'county': [pack.county(x) for x in version_no.county.values()],
+        'races': [pack.race(x) for x in version_no.races],
+        'statewide': [pack.office(x) for x in version_no.statewide.values()],
+    }
+    return HEADER.pack(MAGIC, SCHEMA_VERSION) + msgpack.packb(body, use_bin_type=True)
+
+
+def loads(data: bytes, models: model.ModelGroup = model.FileModels, trusted: bool = True) -> SQLModel:
+    """
+    Rebuild a `ResultVersionNumberPublic` tree from `dumps` output.
+    With `trusted=True` models are assembled directly from the packed values and no validators run.
+    """
+    check_header(HEADER.unpack_from(data))
+    body = msgpack.unpackb(data[HEADER.size:], raw=False, use_list=True)
+    unpack = Unpacker(body['fields'], models, trusted)
+    county = {x.name: x for x in map(unpack.county, body['county'])}
+    races = [unpack.race(x) for x in body['races']]
+    statewide = {x.office_id: x for x in map(unpack.office, body['statewide'])}
+    return unpack.build('ResultVersionNumber', body['version'], statewide=statewide, county=county, races=races)
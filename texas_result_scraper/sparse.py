@@ -0,0 +1,117 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from texas_result_scraper.cube import INDEX, Row, ResultCube
+
+
+@dataclass
+class SparseResultMatrix:
+    """
+    Candidate x county total votes in compressed sparse row form.
+
+    `rows` are (office_type, office, candidate, party) keys and `counties` is the county dictionary that the
+    column numbers in `indices` point into. Row `i` keeps its counties in `indices[indptr[i]:indptr[i + 1]]`
+    and their votes at the same positions in `data`. Only counties a candidate appears in are stored.
+    """
+    rows: List[Row]
+    counties: List[str]
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+
+    @classmethod
+    def from_cells(cls, by_county: Dict[str, Dict[Row, int]]) -> 'SparseResultMatrix':
+        """Build from `{county: {row: votes}}`, the layout `ResultCube.by_county` keeps"""
+        counties = sorted(by_county)
+        by_row: Dict[Row, List[Tuple[int, int]]] = {}
+        for j, county in enumerate(counties):
+            for row, votes in by_county[county].items():
+                by_row.setdefault(row, []).append((j, votes))
+        rows = sorted(by_row)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indices, data = [], []
+        for i, row in enumerate(rows):
+            _cells = by_row[row]
+            indices.extend(j for j, _ in _cells)
+            data.extend(v for _, v in _cells)
+            indptr[i + 1] = indptr[i] + len(_cells)
+        return cls(
+            rows=rows,
+            counties=counties,
+            indptr=indptr,
+            indices=np.asarray(indices, dtype=np.int16),
+            data=np.asarray(data, dtype=np.int32),
+        )
+
+    @classmethod
+    def from_cube(cls, cube: ResultCube) -> 'SparseResultMatrix':
+        return cls.from_cells(cube.by_county)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.rows), len(self.counties)
+
+    @property
+    def density(self) -> float:
+        _rows, _cols = self.shape
+        return len(self.data) / (_rows * _cols) if _rows and _cols else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def row(self, key: Row) -> Dict[str, int]:
+        """Votes by county for one (office_type, office, candidate, party) row"""
+        i = self.rows.index(key)
+        _start, _end = self.indptr[i], self.indptr[i + 1]
+        return {self.counties[j]: int(v) for j, v in zip(self.indices[_start:_end], self.data[_start:_end])}
+
+    def to_long(self) -> pd.DataFrame:
+        """One record per stored cell, with `county` as a categorical over the county dictionary"""
+        _rows = np.repeat(np.arange(len(self.rows)), np.diff(self.indptr))
+        frame = pd.DataFrame(
+            [self.rows[i] for i in _rows] if len(_rows) else None,
+            columns=list(INDEX),
+        )
+        frame['county'] = pd.Categorical.from_codes(self.indices, categories=self.counties)
+        frame['total_votes'] = self.data
+        return frame
+
+    def to_dense(self) -> pd.DataFrame:
+        """The dense crosstab view without margins; counties a candidate is not on are NaN"""
+        values = np.full(self.shape, np.nan)
+        _rows = np.repeat(np.arange(len(self.rows)), np.diff(self.indptr))
+        values[_rows, self.indices] = self.data
+        return pd.DataFrame(
+            values,
+            index=pd.MultiIndex.from_tuples(self.rows, names=INDEX),
+            columns=pd.Index(self.counties, name='county'),
+        )
+
+    def save(self, path: Path) -> Path:
+        """Write to a compressed `.npz`, with the row keys and county dictionary stored as string arrays"""
+        _keys = np.array(self.rows, dtype=str).reshape(-1, len(INDEX))
+        np.savez_compressed(
+            path,
+            rows=_keys,
+            counties=np.array(self.counties, dtype=str),
+            indptr=self.indptr,
+            indices=self.indices,
+            data=self.data,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> 'SparseResultMatrix':
+        with np.load(path) as f:
+            return cls(
+                rows=[tuple(x) for x in f['rows'].tolist()],
+                counties=f['counties'].tolist(),
+                indptr=f['indptr'],
+                indices=f['indices'],
+                data=f['data'],
+            )
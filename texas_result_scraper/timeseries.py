@@ -0,0 +1,173 @@
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import logging
+import sqlite3
+
+from sqlmodel import SQLModel
+
+
+# Cells are only stored for versions where their counts changed, as the change since the previous value
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    version_id INTEGER PRIMARY KEY,
+    recorded_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    cell_id INTEGER PRIMARY KEY,
+    race_id INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL,
+    county TEXT NOT NULL,
+    UNIQUE (race_id, candidate_id, county)
+);
+CREATE INDEX IF NOT EXISTS cells_candidate ON cells (candidate_id, race_id);
+CREATE TABLE IF NOT EXISTS changes (
+    cell_id INTEGER NOT NULL,
+    version_id INTEGER NOT NULL,
+    early_delta INTEGER NOT NULL,
+    total_delta INTEGER NOT NULL,
+    PRIMARY KEY (cell_id, version_id)
+) WITHOUT ROWID;
+"""
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int, str]
+
+
+def iter_cells(version_no: SQLModel) -> Iterator[Tuple[Cell, int, int]]:
+    """((race_id, candidate_id, county), early_votes, total_votes) for every candidate result in a version"""
+    for race in version_no.races:
+        for candidate in race.candidates:
+            for result in candidate.county_results:
+                yield (race.race_id, candidate.candidate_id, result.county), result.early_votes, result.total_votes
+
+
+@dataclass
+class ResultTimeSeries:
+    """
+    Local history of every processed version's vote counts per race, candidate and county.
+
+    Only cells whose counts moved are written for a version, and only as the change from the previous
+    value, so a night of five-minute versions costs roughly one row per county update rather than one
+    row per cell per version.
+
+    Each change is taken against the newest version recorded, so versions must arrive in order; one older
+    than the newest is skipped. The connection may be used from a thread other than the one that opened it,
+    as a pipeline sink does, but only from one at a time.
+    """
+    path: Path
+    _cell_ids: Dict[Cell, int] = field(default_factory=dict, repr=False)
+    _last: Dict[int, Tuple[int, int]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        for cell_id, race_id, candidate_id, county in self.conn.execute(
+                "SELECT cell_id, race_id, candidate_id, county FROM cells"):
+            self._cell_ids[(race_id, candidate_id, county)] = cell_id
+        for cell_id, early, total in self.conn.execute(
+                "SELECT cell_id, SUM(early_delta), SUM(total_delta) FROM changes GROUP BY cell_id"):
+            self._last[cell_id] = (early, total)
+
+    @classmethod
+    def for_election(cls, directory: Path, election_id: int) -> 'ResultTimeSeries':
+        return cls(directory / f'tx-{election_id}-timeseries.db')
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def versions(self) -> List[Tuple[int, datetime]]:
+        return [
+            (version_id, datetime.fromtimestamp(ts, tz=timezone.utc))
+            for version_id, ts in self.conn.execute("SELECT version_id, recorded_at FROM versions ORDER BY version_id")
+        ]
+
+    def append(self, version_no: SQLModel, recorded_at: Optional[datetime] = None) -> int:
+        """Record a version and return how many cells changed; a version already recorded or older is skipped"""
+        version_id = version_no.version_id
+        (latest,) = self.conn.execute("SELECT MAX(version_id) FROM versions").fetchone()
+        if latest is not None and version_id <= latest:
+            if version_id < latest:
+                logger.warning("Version %s is older than the newest recorded, %s; not recorded", version_id, latest)
+            return 0
+        recorded_at = recorded_at or datetime.now(timezone.utc)
+        changes = []
+        # New cell ids and counts are kept aside until the transaction commits; after a rollback the next
+        # version must be diffed against what is stored, not against what this one tried to store
+        cell_ids: Dict[Cell, int] = {}
+        last: Dict[int, Tuple[int, int]] = {}
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO versions (version_id, recorded_at) VALUES (?, ?)",
+                (version_id, int(recorded_at.timestamp()))
+            )
+            reported = set()
+            for cell, early, total in iter_cells(version_no):
+                cell_id = self._cell_ids.get(cell) or cell_ids.get(cell)
+                if cell_id is None:
+                    cell_id = self.conn.execute(
+                        "INSERT INTO cells (race_id, candidate_id, county) VALUES (?, ?, ?)", cell
+                    ).lastrowid
+                    cell_ids[cell] = cell_id
+                reported.add(cell_id)
+                last_early, last_total = self._last.get(cell_id, (0, 0))
+                if (early, total) != (last_early, last_total):
+                    changes.append((cell_id, version_id, early - last_early, total - last_total))
+                    last[cell_id] = (early, total)
+            # A cell missing from this version no longer counts toward the totals
+            for cell_id in self._last.keys() - reported:
+                last_early, last_total = self._last[cell_id]
+                if (last_early, last_total) != (0, 0):
+                    changes.append((cell_id, version_id, -last_early, -last_total))
+                    last[cell_id] = (0, 0)
+            self.conn.executemany(
+                "INSERT INTO changes (cell_id, version_id, early_delta, total_delta) VALUES (?, ?, ?, ?)",
+                changes
+            )
+        self._cell_ids.update(cell_ids)
+        self._last.update(last)
+        return len(changes)
+
+    def candidate_totals(
+            self,
+            candidate_id: int,
+            race_id: Optional[int] = None,
+            county: Optional[str] = None,
+            start_version: Optional[int] = None,
+            end_version: Optional[int] = None) -> List[Tuple[int, datetime, int, int]]:
+        """
+        (version_id, recorded_at, early_votes, total_votes) for a candidate at every recorded version in range,
+        summed over counties unless `county` is given.
+        """
+        _filters, _params = ["c.candidate_id = ?"], [candidate_id]
+        if race_id is not None:
+            _filters.append("c.race_id = ?")
+            _params.append(race_id)
+        if county is not None:
+            _filters.append("c.county = ?")
+            _params.append(county.upper())
+        if end_version is not None:
+            _filters.append("ch.version_id <= ?")
+            _params.append(end_version)
+        moves = {
+            version_id: (early, total) for version_id, early, total in self.conn.execute(
+                f"""
+                SELECT ch.version_id, SUM(ch.early_delta), SUM(ch.total_delta)
+                FROM changes ch JOIN cells c ON c.cell_id = ch.cell_id
+                WHERE {' AND '.join(_filters)}
+                GROUP BY ch.version_id
+                """,
+                _params
+            )
+        }
+        totals, early, total = [], 0, 0
+        for version_id, recorded_at in self.versions():
+            if end_version is not None and version_id > end_version:
+                break
+            _early, _total = moves.get(version_id, (0, 0))
+            early, total = early + _early, total + _total
+            if start_version is None or version_id >= start_version:
+                totals.append((version_id, recorded_at, early, total))
+        return totals
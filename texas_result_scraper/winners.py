@@ -0,0 +1,103 @@
+from typing import Dict, Iterable, Set, Tuple, Any
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from texas_result_scraper.models import bases as base
+
+
+VOTE_COLUMNS = ['office_id', 'position', 'name', 'party', 'total_votes']
+WINNER_COLUMNS = ['winner', 'winner_party', 'winner_margin', 'winner_percent']
+
+
+def votes_table(offices: Iterable[base.StatewideOfficeSummaryBase]) -> pd.DataFrame:
+    """One row per office candidate, in the order the candidates appear on the office."""
+    return pd.DataFrame(
+        [
+            (office.office_id, position, candidate.name, candidate.party, candidate.total_votes)
+            for office in offices
+            for position, candidate in enumerate(office.candidates)
+        ],
+        columns=VOTE_COLUMNS
+    )
+
+
+def compute_winners(votes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute winner, party, margin and percent for every office in a votes table in one pass.
+
+    Mirrors `StatewideOfficeSummaryBase.check_for_winner`: ties go to the candidate listed first,
+    a single candidate wins with a margin of 0 and a percent of 100, and a multi-candidate office
+    with no votes counted yet has no margin or percent.
+    """
+    if votes.empty:
+        return pd.DataFrame(columns=WINNER_COLUMNS, index=pd.Index([], name='office_id'))
+
+    ordered = votes.sort_values(
+        ['office_id', 'total_votes', 'position'],
+        ascending=[True, False, True],
+        kind='mergesort'
+    )
+    grouped = ordered.groupby('office_id', sort=False)
+    rank = grouped.cumcount()
+    top = ordered[rank == 0].set_index('office_id')
+    runner_up = ordered[rank == 1].set_index('office_id')['total_votes'].reindex(top.index)
+    candidate_count = grouped.size().reindex(top.index)
+    vote_sum = grouped['total_votes'].sum().reindex(top.index)
+
+    results = pd.DataFrame({
+        'winner': top['name'],
+        'winner_party': top['party'],
+        'winner_margin': (top['total_votes'] - runner_up).where(vote_sum != 0),
+        'winner_percent': (top['total_votes'] / vote_sum).where(vote_sum != 0),
+    })
+    single = candidate_count == 1
+    results.loc[single, 'winner_margin'] = 0
+    results.loc[single, 'winner_percent'] = 100
+    return results
+
+
+def _as_python(column: str, value: Any) -> Any:
+    if pd.isna(value):
+        return None
+    if column == 'winner_margin':
+        return int(value)
+    if column == 'winner_percent':
+        return float(value)
+    return value
+
+
+@dataclass
+class WinnerCalculator:
+    """
+    Batch replacement for calling `check_for_winner` office by office.
+
+    Keeps the candidate vote totals each office was last computed from, so on the next version
+    only offices whose inputs changed go back through `compute_winners`.
+    """
+    inputs: Dict[int, Tuple] = field(default_factory=dict)
+    results: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    @staticmethod
+    def _office_inputs(office: base.StatewideOfficeSummaryBase) -> Tuple:
+        return tuple((x.name, x.party, x.total_votes) for x in office.candidates)
+
+    def update(self, offices: Iterable[base.StatewideOfficeSummaryBase]) -> Set[int]:
+        """Set the winner fields on every office and return the ids that had to be recomputed."""
+        offices = [x for x in offices if x.candidates]
+        changed = []
+        for office in offices:
+            _inputs = self._office_inputs(office)
+            if self.inputs.get(office.office_id) != _inputs:
+                self.inputs[office.office_id] = _inputs
+                changed.append(office)
+
+        if changed:
+            _results = compute_winners(votes_table(changed))
+            for office_id, row in _results.iterrows():
+                self.results[office_id] = {k: _as_python(k, v) for k, v in row.items()}
+
+        for office in offices:
+            for k, v in self.results[office.office_id].items():
+                setattr(office, k, v)
+        return {x.office_id for x in changed}